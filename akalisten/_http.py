@@ -0,0 +1,227 @@
+"""Minimal asyncio based HTTP/1.1 server, shared by the local stand-in for the NextCloud APIs and
+the webhook receiver.
+
+Only what these servers need is supported: keep-alive connections, request bodies with a
+``Content-Length`` and JSON responses. The server is meant to listen on ``localhost`` or behind
+a reverse proxy, not to be exposed to the internet directly.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from types import TracebackType
+from typing import Any, ClassVar, Self
+
+from pydantic import BaseModel
+
+_LOGGER = logging.getLogger(__name__)
+
+REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Content Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+HTTPResponse = tuple[int, dict[str, str], bytes]
+"""Status code, additional headers and JSON body of a response."""
+
+
+class HTTPRequest(BaseModel):
+    method: str
+    target: str
+    headers: dict[str, str]
+    """The request headers with lower case names."""
+    body: bytes = b""
+
+
+class _BadRequestError(Exception):
+    """The request can't be read. It is answered with :attr:`status` and the connection is
+    closed, since the start of the next request is unknown.
+    """
+
+    def __init__(self, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def json_response(
+    status: int, data: Any, headers: Mapping[str, str] | None = None
+) -> HTTPResponse:
+    return status, dict(headers or {}), json.dumps(data).encode()
+
+
+class HTTPServer(ABC):
+    """Base class for the servers. Subclasses answer the requests in :meth:`handle`.
+
+    Args:
+        host: The host to listen on.
+        port: The port to listen on. ``0`` selects a free port.
+    """
+
+    MAX_BODY_SIZE: ClassVar[int] = 2**20
+    """Requests with larger bodies are answered with ``413 Content Too Large``."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.host = host
+        self.port = port
+        self._server: asyncio.Server | None = None
+        self._connections: set[asyncio.Task] = set()
+
+    @property
+    def url(self) -> str:
+        """The base URL of the server."""
+        return f"http://{self.host}:{self.port}"
+
+    @abstractmethod
+    async def handle(self, request: HTTPRequest) -> HTTPResponse:
+        """Answer a request."""
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        _LOGGER.info("%s listening on %s", type(self).__name__, self.url)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Before Python 3.12, waiting for the server to close doesn't wait for the open
+            # connections, e.g. requests to which the clients stopped waiting for a response
+            for task in self._connections:
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> Self:
+        await self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()  # type: ignore[union-attr]
+
+    @contextmanager
+    def run_in_thread(self) -> Iterator[str]:
+        """Context manager that runs the server in a separate thread with its own event loop,
+        such that the server doesn't compete with the clients for the event loop.
+
+        Returns:
+            The :attr:`url` of the server.
+        """
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(self.start())
+        thread = threading.Thread(target=loop.run_forever, name=type(self).__name__, daemon=True)
+        thread.start()
+        try:
+            yield self.url
+        finally:
+            asyncio.run_coroutine_threadsafe(self.close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        if task := asyncio.current_task():
+            self._connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except _BadRequestError as exc:
+                    self._write_response(writer, *json_response(exc.status, {"error": str(exc)}))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                try:
+                    response = await self.handle(request)
+                except Exception:
+                    _LOGGER.exception("Handling %s %s failed", request.method, request.target)
+                    response = json_response(500, {"error": "Internal server error"})
+                self._write_response(writer, *response)
+                await writer.drain()
+                if request.headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Cancelled by close(). Not re-raised, since the stream protocol of Python 3.11 logs
+            # cancelled connection handlers as errors
+            pass
+        finally:
+            self._connections.discard(task)  # type: ignore[arg-type]
+            writer.close()
+
+    @staticmethod
+    async def _read_line(reader: asyncio.StreamReader) -> bytes:
+        try:
+            return await reader.readline()
+        except ValueError as exc:
+            # Raised if the line exceeds the buffer limit of the reader
+            raise _BadRequestError("Line too long") from exc
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> HTTPRequest | None:
+        """Read the next request of the connection. Returns :obj:`None` if the client closed
+        the connection.
+
+        Raises:
+            _BadRequestError: If the request is malformed or its body is too large.
+        """
+        request_line = await self._read_line(reader)
+        if not request_line.strip():
+            return None
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/"):  # noqa: PLR2004
+            raise _BadRequestError("Malformed request line")
+        method, target, _ = parts
+        headers = {}
+        while (line := await self._read_line(reader)) not in (b"\r\n", b"\n", b""):
+            name, colon, value = line.decode("latin-1").partition(":")
+            if not colon or not name.strip():
+                raise _BadRequestError("Malformed header")
+            headers[name.strip().lower()] = value.strip()
+        content_length = headers.get("content-length", "0")
+        if not (content_length.isascii() and content_length.isdigit()):
+            raise _BadRequestError("Invalid Content-Length")
+        body = b""
+        if length := int(content_length):
+            if length > self.MAX_BODY_SIZE:
+                raise _BadRequestError("Too large", status=413)
+            body = await reader.readexactly(length)
+        return HTTPRequest(method=method, target=target, headers=headers, body=body)
+
+    @staticmethod
+    def _write_response(
+        writer: asyncio.StreamWriter, status: int, headers: Mapping[str, str], body: bytes
+    ) -> None:
+        lines = [
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            *(f"{name}: {value}" for name, value in headers.items()),
+            "",
+            "",
+        ]
+        writer.write("\r\n".join(lines).encode("latin-1") + body)
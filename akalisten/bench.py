@@ -0,0 +1,125 @@
+"""Offline benchmark of the rendering, replaying a stored snapshot.
+
+Every iteration runs through the same steps as rendering a snapshot with ``main.py render`` and
+times each phase separately:
+
+* ``load``: reading the snapshot file
+* ``validate``: validating the snapshot into the models and adding the local data
+* ``sanitize``: sanitizing the votes of all polls. In contrast to loading a snapshot normally,
+  the sanitized votes are recomputed, such that changes to the models show up.
+* ``markdown``: rendering all markdown texts used by the templates
+* ``render``: compiling and rendering the templates
+* ``write``: minifying, compressing and writing the pages to disk
+
+No requests are sent, so the effect of template and model changes can be measured without
+touching NextCloud.
+"""
+
+import math
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+from akalisten.crawl import add_local_data
+from akalisten.markdown import render_markdown
+from akalisten.models.template import TemplateData
+from akalisten.output import write_pages
+from akalisten.render import create_environment, render_pages
+from akalisten.snapshot import parse_snapshot, read_snapshot
+
+PHASES = ("load", "validate", "sanitize", "markdown", "render", "write")
+_PERCENTILES = (50, 90, 99)
+
+
+class BenchmarkResult(BaseModel):
+    timings: dict[str, list[float]] = Field(
+        default_factory=lambda: {phase: [] for phase in PHASES}
+    )
+    """The durations of the phases in seconds, one entry per iteration."""
+
+    @property
+    def iterations(self) -> int:
+        return len(self.timings["load"])
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[phase].append(time.perf_counter() - start)
+
+    @staticmethod
+    def percentile(values: list[float], percentile: float) -> float:
+        ordered = sorted(values)
+        return ordered[max(0, math.ceil(percentile / 100 * len(ordered)) - 1)]
+
+    def format_table(self) -> str:
+        """Format the timings as a table with the mean, percentiles and maximum in milliseconds
+        per phase.
+        """
+        columns = ["mean", *(f"p{percentile}" for percentile in _PERCENTILES), "max"]
+        lines = [f"{'phase':<10}" + "".join(f"{column:>10}" for column in columns)]
+        totals = [sum(values) for values in zip(*self.timings.values(), strict=True)]
+        for phase, values in [*self.timings.items(), ("total", totals)]:
+            statistics = [
+                sum(values) / len(values),
+                *(self.percentile(values, percentile) for percentile in _PERCENTILES),
+                max(values),
+            ]
+            lines.append(f"{phase:<10}" + "".join(f"{1000 * v:>10.2f}" for v in statistics))
+        return "\n".join(lines)
+
+
+def render_all_markdown(template_data: TemplateData) -> None:
+    """Render all markdown texts used by the templates."""
+    polls = [*template_data.mucken_listen.polls.values(), *template_data.polls]
+    for poll in polls:
+        render_markdown(poll.poll.descriptionSafe)
+        render_markdown(poll.mucken_info.additional)
+    for form in template_data.forms:
+        render_markdown(form.form.description)
+    for link in template_data.links:
+        render_markdown(link.description)
+
+
+def run_benchmark(  # noqa: PLR0913
+    snapshot_path: Path,
+    iterations: int,
+    links_path: Path | str,
+    lists_path: Path | str,
+    chat_groups_path: Path | str,
+    output_dir: Path | None = None,
+) -> BenchmarkResult:
+    """Render the snapshot at :paramref:`snapshot_path` :paramref:`iterations` times. The pages
+    are written to :paramref:`output_dir` or to a temporary directory.
+    """
+    result = BenchmarkResult()
+    environment = create_environment()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for _ in range(iterations):
+            # Start every iteration from scratch
+            render_markdown.cache_clear()
+            environment.cache.clear()  # type: ignore[union-attr]
+
+            with result.measure("load"):
+                content = read_snapshot(snapshot_path)
+            with result.measure("validate"):
+                template_data = add_local_data(
+                    parse_snapshot(content).data, links_path, lists_path, chat_groups_path
+                )
+            with result.measure("sanitize"):
+                for poll_votes in template_data.mucken_listen.poll_votes.values():
+                    poll_votes.sanitize_votes()
+            with result.measure("markdown"):
+                render_all_markdown(template_data)
+            with result.measure("render"):
+                pages = render_pages(environment, template_data)
+            with result.measure("write"):
+                write_pages(pages.items(), output_dir or Path(temp_dir))
+
+    return result
@@ -0,0 +1,72 @@
+"""Single-flight coalescing of identical requests."""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import httpx
+
+    from akalisten.clients._statistics import RequestStatistics
+
+
+class RequestCoalescer:
+    """Makes concurrent identical requests share a single in-flight response.
+
+    Requests are identified by an arbitrary hashable key, usually consisting of the HTTP method,
+    the URL and the credentials used. While a request for a key is in flight, further requests
+    for the same key wait for that response instead of issuing a new one.
+
+    Args:
+        memoize: Whether to additionally keep completed responses for the lifetime of this
+            instance. Only use this if the data is not expected to change during the run.
+    """
+
+    def __init__(self, memoize: bool = False) -> None:
+        self.memoize = memoize
+        self._in_flight: dict[Hashable, asyncio.Task[httpx.Response]] = {}
+        self._memo: dict[Hashable, httpx.Response] = {}
+        self._waiters: dict[Hashable, int] = {}
+
+    async def run(
+        self,
+        key: Hashable,
+        send: Callable[[], Awaitable["httpx.Response"]],
+        statistics: "RequestStatistics",
+    ) -> "httpx.Response":
+        if (response := self._memo.get(key)) is not None:
+            statistics.memoized += 1
+            return response
+
+        if (task := self._in_flight.get(key)) is not None:
+            statistics.deduplicated += 1
+        else:
+            task = asyncio.ensure_future(send())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+
+        # Shield the shared task such that a cancelled caller does not cancel the request for
+        # all other callers waiting for the same response. Once all callers are cancelled,
+        # e.g. because their deadline passed, the request is cancelled as well instead of
+        # running on after its client was closed.
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[key] == 1:
+                task.cancel()
+            raise
+        finally:
+            if (waiters := self._waiters[key] - 1) > 0:
+                self._waiters[key] = waiters
+            else:
+                del self._waiters[key]
+
+    def _on_done(self, key: Hashable, task: "asyncio.Task[httpx.Response]") -> None:
+        self._in_flight.pop(key, None)
+        if self.memoize and not task.cancelled() and task.exception() is None:
+            self._memo[key] = task.result()
+
+    def clear(self) -> None:
+        """Forget all memoized responses."""
+        self._memo.clear()
@@ -0,0 +1,53 @@
+"""State that is shared between all API clients over the course of a single run."""
+
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+from akalisten.clients._coalescing import RequestCoalescer
+from akalisten.clients._hedging import HedgingSettings, LatencyTracker
+from akalisten.clients._metrics import MetricsRecorder
+from akalisten.clients._statistics import RequestStatistics
+
+if TYPE_CHECKING:
+    from akalisten.clients._limiting import TrafficController, TrafficSettings
+
+
+class ClientContext:
+    """Per-run state that can be shared by several :class:`~akalisten.clients._utils.BaseAPI`
+    instances. Pass the same instance to all clients that are used within one run to get
+    aggregated statistics, to share in-flight requests between them and to make them respect
+    a common concurrency limit per host.
+
+    Args:
+        memoize: Whether identical ``GET`` requests should be served from memory for the
+            remainder of the run once they have completed. See :class:`RequestCoalescer`.
+        traffic_settings: Settings for the adaptive concurrency limit and circuit breaker of
+            each host. See :class:`TrafficController`.
+        hedging_settings: Settings for hedged ``GET`` requests. Hedging is disabled by default.
+        strict_models: Whether the clients should validate the responses into the full models
+            instead of the lean projections. Useful for debugging, see
+            :mod:`akalisten.models.raw_api_models`.
+    """
+
+    def __init__(
+        self,
+        memoize: bool = False,
+        traffic_settings: "TrafficSettings | None" = None,
+        hedging_settings: HedgingSettings | None = None,
+        strict_models: bool = False,
+    ) -> None:
+        self.statistics = RequestStatistics()
+        self.strict_models = strict_models
+        self.coalescer = RequestCoalescer(memoize=memoize)
+        self._traffic_settings = traffic_settings
+        self.hedging = hedging_settings or HedgingSettings()
+        self.latencies = LatencyTracker()
+        self.metrics = MetricsRecorder(self.statistics)
+
+    @cached_property
+    def traffic(self) -> "TrafficController":
+        # Created on first use, since the limiting depends on httpx, which does not need to be
+        # imported when no requests are sent, e.g. when rendering cached data in debug mode.
+        from akalisten.clients._limiting import TrafficController, TrafficSettings
+
+        return TrafficController(self.statistics, self._traffic_settings or TrafficSettings())
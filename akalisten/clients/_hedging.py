@@ -0,0 +1,50 @@
+"""Hedged requests to cut the tail latency of slow endpoints.
+
+If a request has not been answered after a certain percentile of the latencies observed so far
+for the same endpoint, a second, identical request is sent and whichever response arrives first
+is used. This is only safe for idempotent requests.
+"""
+
+import math
+from collections import defaultdict, deque
+
+from pydantic import BaseModel
+
+
+class HedgingSettings(BaseModel):
+    enabled: bool = False
+    percentile: float = 0.95
+    """The percentile of the observed latencies after which a hedge request is sent."""
+    min_samples: int = 5
+    """Number of latencies that must have been observed for an endpoint before hedging."""
+    budget_ratio: float = 0.05
+    """Maximum number of hedge requests per run relative to the number of sent requests."""
+    min_budget: int = 2
+    """Number of hedge requests that are allowed regardless of :attr:`budget_ratio`."""
+
+    def allows_hedge(self, hedges_fired: int, requests: int) -> bool:
+        return hedges_fired < max(self.min_budget, math.floor(self.budget_ratio * requests))
+
+
+class LatencyTracker:
+    """Keeps the most recent latencies per endpoint label.
+
+    Args:
+        window: Number of latencies to keep per endpoint.
+    """
+
+    def __init__(self, window: int = 100) -> None:
+        self._samples: defaultdict[str, deque[float]] = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, label: str, latency: float) -> None:
+        self._samples[label].append(latency)
+
+    def percentile(self, label: str, percentile: float, min_samples: int = 1) -> float | None:
+        """Get the given percentile of the latencies of the endpoint or :obj:`None` if fewer
+        than :paramref:`min_samples` latencies were recorded.
+        """
+        samples = self._samples.get(label)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, math.ceil(percentile * len(ordered)) - 1)]
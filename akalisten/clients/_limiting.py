@@ -0,0 +1,278 @@
+"""Adaptive load control for the requests sent to a host.
+
+All clients of a run share a single :class:`TrafficController` (via the
+:class:`~akalisten.clients._context.ClientContext`). Every single attempt, including retries,
+passes through the :class:`LimitedTransport`, which
+
+* waits for a slot of the host's :class:`AdaptiveLimiter`. The limiter adjusts the number of
+  concurrent requests in an AIMD fashion: it grows additively while responses are fast and
+  shrinks multiplicatively when responses get slow or the server answers with ``429``/``503``.
+  ``Retry-After`` headers pause all requests to the host.
+* consults the host's :class:`CircuitBreaker`, which fails fast after a series of server errors
+  instead of piling more requests onto a struggling server.
+"""
+
+import asyncio
+import datetime as dtm
+import email.utils
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from enum import StrEnum
+from typing import TYPE_CHECKING
+
+import httpx
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from akalisten.clients._metrics import MetricsRecorder
+    from akalisten.clients._statistics import RequestStatistics
+
+_LOGGER = logging.getLogger(__name__)
+
+ENDPOINT_EXTENSION = "akalisten_endpoint"
+"""Key of the request extension holding the endpoint label used for the metrics."""
+_THROTTLE_STATUS_CODES = frozenset({429, 503})
+_SERVER_ERROR = 500
+
+
+class TrafficSettings(BaseModel):
+    """Settings for the :class:`AdaptiveLimiter` and :class:`CircuitBreaker` of each host."""
+
+    initial_concurrency: float = 4
+    min_concurrency: float = 1
+    max_concurrency: float = 16
+    latency_target: float = 2.0
+    """Responses slower than this (in seconds) are treated as a sign of congestion."""
+    decrease_factor: float = 0.5
+    """Factor by which the concurrency limit is multiplied on congestion."""
+    max_retry_after: float = 120.0
+    """Upper bound for pauses requested by the server via ``Retry-After``."""
+    failure_threshold: int = 5
+    """Number of consecutive server errors after which the circuit breaker opens."""
+    reset_timeout: float = 30.0
+    """Time in seconds after which an open circuit breaker lets a trial request through."""
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse the value of a ``Retry-After`` header into a number of seconds."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((date - dtm.datetime.now(dtm.UTC)).total_seconds(), 0.0)
+
+
+class AdaptiveLimiter:
+    """Limits the number of concurrent requests to a host and adapts that limit to the observed
+    latency and throttling responses (additive increase, multiplicative decrease).
+    """
+
+    def __init__(self, settings: TrafficSettings) -> None:
+        self.settings = settings
+        self.limit: float = settings.initial_concurrency
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        while True:
+            if (delay := self._blocked_until - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+            async with self._condition:
+                await self._condition.wait_for(lambda: self._in_flight < int(self.limit))
+                # Another response may have requested a pause while waiting for the slot
+                if self._blocked_until <= time.monotonic():
+                    self._in_flight += 1
+                    break
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def record(self, latency: float, status_code: int | None, retry_after: float | None) -> None:
+        """Adapt the limit to the outcome of a request.
+
+        Args:
+            latency: Time in seconds until the response headers were received.
+            status_code: The status code of the response or :obj:`None` if the request failed.
+            retry_after: The delay requested by the server, if any.
+        """
+        now = time.monotonic()
+        if retry_after:
+            self._blocked_until = max(
+                self._blocked_until, now + min(retry_after, self.settings.max_retry_after)
+            )
+
+        if status_code in _THROTTLE_STATUS_CODES or latency > self.settings.latency_target:
+            # Decrease at most once per latency window. Otherwise, all requests that were in
+            # flight when the server got congested would reduce the limit one after another.
+            if now - self._last_decrease < self.settings.latency_target:
+                return
+            self._last_decrease = now
+            self.limit = max(
+                self.settings.min_concurrency, self.limit * self.settings.decrease_factor
+            )
+            _LOGGER.info("Decreased concurrency limit to %.2f", self.limit)
+        elif status_code is not None:
+            self.limit = min(self.settings.max_concurrency, self.limit + 1 / self.limit)
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of sending a request to a host whose circuit breaker is open."""
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """Stops sending requests to a host after :attr:`TrafficSettings.failure_threshold`
+    consecutive server errors. After :attr:`TrafficSettings.reset_timeout` seconds, a single
+    trial request is let through. If it succeeds, the circuit is closed again. If it fails or
+    ends without a response, e.g. because it was cancelled, the circuit is opened again.
+    """
+
+    def __init__(self, host: str, settings: TrafficSettings) -> None:
+        self.host = host
+        self.settings = settings
+        self.state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def check(self) -> bool:
+        """Check whether a request may currently be sent.
+
+        Returns:
+            Whether the request is the trial request of a half-open circuit. The outcome of a
+            trial request must be passed to :meth:`record` or :meth:`abandon_trial`.
+
+        Raises:
+            CircuitOpenError: If no request may currently be sent.
+        """
+        if self.state == CircuitState.CLOSED:
+            return False
+        if (
+            self.state == CircuitState.OPEN
+            and time.monotonic() - self._opened_at >= self.settings.reset_timeout
+        ):
+            self.state = CircuitState.HALF_OPEN
+            return True
+        raise CircuitOpenError(f"Circuit breaker for host {self.host} is {self.state}.")
+
+    def abandon_trial(self) -> None:
+        """Open the circuit again after the trial request ended without an outcome. Otherwise,
+        the circuit would stay half-open and reject all further requests.
+        """
+        if self.state == CircuitState.HALF_OPEN:
+            _LOGGER.info("Trial request to host %s was abandoned", self.host)
+            self.state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+
+    def record(self, success: bool) -> None:
+        if success:
+            self._failures = 0
+            self.state = CircuitState.CLOSED
+            return
+
+        self._failures += 1
+        if self.state == CircuitState.HALF_OPEN or (
+            self._failures >= self.settings.failure_threshold
+        ):
+            if self.state != CircuitState.OPEN:
+                _LOGGER.warning("Opening circuit breaker for host %s", self.host)
+            self.state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+
+
+class TrafficController:
+    """Holds one :class:`AdaptiveLimiter` and one :class:`CircuitBreaker` per host."""
+
+    def __init__(self, statistics: "RequestStatistics", settings: TrafficSettings) -> None:
+        self.statistics = statistics
+        self.settings = settings
+        self._limiters: dict[str, AdaptiveLimiter] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def limiter(self, host: str) -> AdaptiveLimiter:
+        if host not in self._limiters:
+            self._limiters[host] = AdaptiveLimiter(self.settings)
+        return self._limiters[host]
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(host, self.settings)
+        return self._breakers[host]
+
+
+class LimitedTransport(httpx.AsyncBaseTransport):
+    """Transport that sends every request through the limiter and circuit breaker of the
+    requested host. Also records every attempt in the metrics.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        traffic: TrafficController,
+        metrics: "MetricsRecorder",
+    ) -> None:
+        self._transport = transport
+        self._traffic = traffic
+        self._metrics = metrics
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        label = request.extensions.get(ENDPOINT_EXTENSION, request.url.path)
+        breaker = self._traffic.breaker(host)
+        limiter = self._traffic.limiter(host)
+
+        trial = breaker.check()
+        recorded = False
+        try:
+            async with limiter.slot():
+                start = time.monotonic()
+                try:
+                    response = await self._transport.handle_async_request(request)
+                except httpx.TransportError:
+                    self._metrics.record_attempt(label, status_code=None)
+                    breaker.record(success=False)
+                    recorded = True
+                    limiter.record(time.monotonic() - start, status_code=None, retry_after=None)
+                    raise
+                except asyncio.CancelledError:
+                    # Says nothing about the health of the host, so only the metrics count it
+                    self._metrics.record_attempt(label, status_code=None)
+                    raise
+
+            status_code = response.status_code
+            self._metrics.record_attempt(label, status_code=status_code)
+            if status_code in _THROTTLE_STATUS_CODES:
+                self._traffic.statistics.throttled += 1
+            breaker.record(success=status_code < _SERVER_ERROR)
+            recorded = True
+            limiter.record(
+                time.monotonic() - start,
+                status_code=status_code,
+                retry_after=parse_retry_after(response.headers.get("Retry-After")),
+            )
+            return response
+        finally:
+            # E.g. cancelled by a deadline or because a hedged request won
+            if trial and not recorded:
+                breaker.abandon_trial()
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
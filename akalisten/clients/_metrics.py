@@ -0,0 +1,191 @@
+"""Per-endpoint request metrics and their export as Prometheus textfile and JSON summary.
+
+The Prometheus file is meant to be picked up by the textfile collector of the node exporter,
+such that no additional service is needed to monitor the crawl.
+"""
+
+import bisect
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from pydantic import BaseModel, Field, computed_field
+
+from akalisten.clients._statistics import RequestStatistics
+
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7)
+_PREFIX = "akalisten"
+
+
+def peak_rss() -> int | None:
+    """Get the peak resident set size of the process in bytes or :obj:`None` if the platform
+    does not provide it.
+    """
+    try:
+        import resource  # not available on Windows
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Histogram(BaseModel):
+    """Cumulative histogram as used by Prometheus."""
+
+    buckets: tuple[float, ...]
+    counts: list[int] = Field(default_factory=list)
+    sum: float = 0
+    count: int = 0
+
+    def observe(self, value: float) -> None:
+        if not self.counts:
+            self.counts = [0] * len(self.buckets)
+        for index in range(bisect.bisect_left(self.buckets, value), len(self.buckets)):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class EndpointMetrics(BaseModel):
+    requests: int = 0
+    """Number of logical requests, i.e. not counting retries."""
+    failed_requests: int = 0
+    """Number of logical requests without a successful response, i.e. with an error status, a
+    transport error or a timeout, or that were cancelled, e.g. by a deadline."""
+    attempts: int = 0
+    """Number of requests actually sent, including retries."""
+    status_codes: dict[int, int] = Field(default_factory=dict)
+    """Number of attempts per status code. Failed and cancelled attempts are counted with code
+    0."""
+    latency_seconds: Histogram = Field(default_factory=lambda: Histogram(buckets=_LATENCY_BUCKETS))
+    response_bytes: Histogram = Field(default_factory=lambda: Histogram(buckets=_SIZE_BUCKETS))
+    decode_seconds: float = 0
+    """Time spent decoding the JSON responses."""
+    validation_seconds: float = 0
+    """Time spent processing the decoded JSON, mostly validating it into models."""
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def retries(self) -> int:
+        return max(self.attempts - self.requests, 0)
+
+
+class MetricsSummary(BaseModel):
+    timestamp: float
+    duration_seconds: float
+    peak_rss_bytes: int | None
+    statistics: RequestStatistics
+    endpoints: dict[str, EndpointMetrics]
+
+
+class MetricsRecorder:
+    """Collects :class:`EndpointMetrics` per logical endpoint, see
+    :func:`~akalisten.clients._utils.endpoint_label`.
+    """
+
+    def __init__(self, statistics: RequestStatistics) -> None:
+        self.statistics = statistics
+        self.started = time.time()
+        self.endpoints: defaultdict[str, EndpointMetrics] = defaultdict(EndpointMetrics)
+
+    def record_request(self, label: str, latency: float, size: int, failed: bool = False) -> None:
+        metrics = self.endpoints[label]
+        metrics.requests += 1
+        metrics.failed_requests += failed
+        metrics.latency_seconds.observe(latency)
+        metrics.response_bytes.observe(size)
+
+    def record_attempt(self, label: str, status_code: int | None) -> None:
+        metrics = self.endpoints[label]
+        metrics.attempts += 1
+        code = status_code or 0
+        metrics.status_codes[code] = metrics.status_codes.get(code, 0) + 1
+
+    def record_processing(self, label: str, decode: float, validation: float) -> None:
+        metrics = self.endpoints[label]
+        metrics.decode_seconds += decode
+        metrics.validation_seconds += validation
+
+    def summary(self) -> MetricsSummary:
+        now = time.time()
+        return MetricsSummary(
+            timestamp=now,
+            duration_seconds=now - self.started,
+            peak_rss_bytes=peak_rss(),
+            statistics=self.statistics,
+            endpoints=dict(self.endpoints),
+        )
+
+    def to_prometheus(self) -> str:
+        summary = self.summary()
+        lines: list[str] = []
+
+        def header(name: str, kind: str, description: str) -> str:
+            lines.append(f"# HELP {_PREFIX}_{name} {description}")
+            lines.append(f"# TYPE {_PREFIX}_{name} {kind}")
+            return f"{_PREFIX}_{name}"
+
+        def histogram(name: str, description: str, attribute: str) -> None:
+            metric = header(name, "histogram", description)
+            for label, metrics in summary.endpoints.items():
+                hist: Histogram = getattr(metrics, attribute)
+                for bound, count in zip(
+                    hist.buckets, hist.counts or [0] * len(hist.buckets), strict=True
+                ):
+                    lines.append(f'{metric}_bucket{{endpoint="{label}",le="{bound:g}"}} {count}')
+                lines.append(f'{metric}_bucket{{endpoint="{label}",le="+Inf"}} {hist.count}')
+                lines.append(f'{metric}_sum{{endpoint="{label}"}} {hist.sum:.6f}')
+                lines.append(f'{metric}_count{{endpoint="{label}"}} {hist.count}')
+
+        histogram(
+            "request_duration_seconds", "Duration of requests incl. retries.", "latency_seconds"
+        )
+        histogram("response_size_bytes", "Size of response bodies.", "response_bytes")
+
+        metric = header("responses_total", "counter", "Attempts per status code (0: failed).")
+        for label, metrics in summary.endpoints.items():
+            for code, count in sorted(metrics.status_codes.items()):
+                lines.append(f'{metric}{{endpoint="{label}",code="{code}"}} {count}')
+
+        for name, attribute, description in (
+            (
+                "requests_failed_total",
+                "failed_requests",
+                "Requests without a successful response.",
+            ),
+            ("request_retries_total", "retries", "Retried attempts."),
+            ("decode_seconds_total", "decode_seconds", "Time spent decoding JSON."),
+            ("validation_seconds_total", "validation_seconds", "Time spent validating models."),
+        ):
+            metric = header(name, "counter", description)
+            for label, metrics in summary.endpoints.items():
+                lines.append(f'{metric}{{endpoint="{label}"}} {getattr(metrics, attribute)}')
+
+        for name, value in summary.statistics.model_dump().items():
+            metric = header(f"run_{name}", "gauge", f"Run statistic '{name}'.")
+            lines.append(f"{metric} {value}")
+
+        metric = header("run_duration_seconds", "gauge", "Duration of the last run.")
+        lines.append(f"{metric} {summary.duration_seconds:.3f}")
+        if summary.peak_rss_bytes is not None:
+            metric = header("run_peak_rss_bytes", "gauge", "Peak resident set size of the run.")
+            lines.append(f"{metric} {summary.peak_rss_bytes}")
+        metric = header("run_timestamp_seconds", "gauge", "Time the last run finished.")
+        lines.append(f"{metric} {summary.timestamp:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: Path) -> None:
+        """Write ``akalisten.prom`` and ``metrics.json`` to the given directory. Files are
+        replaced atomically such that the node exporter never reads partial files.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, content in (
+            ("akalisten.prom", self.to_prometheus()),
+            ("metrics.json", self.summary().model_dump_json(indent=2)),
+        ):
+            temp_path = directory / f".{name}.tmp"
+            temp_path.write_text(content, encoding="utf-8")
+            temp_path.replace(directory / name)
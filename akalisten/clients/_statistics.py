@@ -0,0 +1,24 @@
+"""Counters that are collected by the API clients."""
+
+from pydantic import BaseModel
+
+
+class RequestStatistics(BaseModel):
+    """Counters collected by the API clients over the course of a run."""
+
+    requests: int = 0
+    """Number of HTTP requests that were actually sent."""
+    cache_hits: int = 0
+    """Number of resources that were served from a persistent cache instead of fetched."""
+    skipped: int = 0
+    """Number of resources that were not fetched because they could not be relevant."""
+    deduplicated: int = 0
+    """Number of requests that were served by an identical request already in flight."""
+    memoized: int = 0
+    """Number of requests that were served from the per-run memo."""
+    throttled: int = 0
+    """Number of responses with status ``429`` or ``503``."""
+    hedges_fired: int = 0
+    """Number of additional requests sent because the original request was slow."""
+    hedges_won: int = 0
+    """Number of additional requests that were answered before the original request."""
@@ -0,0 +1,184 @@
+"""Incremental extraction of the elements of a JSON array from a streamed response body.
+
+For large responses, e.g. the votes of a busy poll, decoding the complete body with
+:func:`json.loads` builds the whole Python tree at once. :class:`JSONArrayStream` instead
+decodes the body chunk by chunk and hands out one array element at a time, such that only the
+elements currently being processed have to be kept in memory.
+"""
+
+import codecs
+import json
+import re
+from collections.abc import Iterator, Sequence
+from typing import Any
+
+_STRUCTURE_PATTERN = re.compile(rb'[{}\[\]",:]')
+_STRING_PATTERN = re.compile(rb'["\\]')
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+_DELIMITERS = frozenset(",] \t\r\n")
+_OBJECT = 0
+_ARRAY = 1
+
+
+class JSONArrayStream:
+    """Scans a JSON document fed in chunks and yields the decoded elements of the array at the
+    given path. Only objects are traversed, i.e. the path consists of object keys.
+
+    Up to the array, the document is only scanned for the structure and the keys. Each element
+    of the array is decoded with :meth:`json.JSONDecoder.raw_decode` as soon as it is complete.
+    Everything after the array is ignored.
+
+    Note:
+        This is not a validating parser. For malformed documents, the array may not be found or
+        :meth:`close` raises an exception.
+
+    Example:
+        .. code-block:: python
+
+            stream = JSONArrayStream(("ocs", "data", "votes"))
+            async for chunk in response.aiter_bytes():
+                for element in stream.feed(chunk):
+                    vote = PollVote(**element)
+            stream.close()
+
+    Args:
+        path: The keys leading to the array.
+    """
+
+    def __init__(self, path: Sequence[str]) -> None:
+        self._path = [key.encode() for key in path]
+        # For each open container its type and, for objects, the key of the current value
+        self._stack: list[tuple[int, bytes | None]] = []
+        self._expect_key = False
+        self._in_string = False
+        self._escaped = False
+        self._key = bytearray()
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self.found = False
+        """Whether the array was found in the scanned part of the document."""
+        self.done = False
+        """Whether the end of the array was reached."""
+
+    @property
+    def _in_target(self) -> bool:
+        if len(self._stack) != len(self._path) + 1 or self._stack[-1][0] != _ARRAY:
+            return False
+        return all(
+            kind == _OBJECT and key == expected
+            for (kind, key), expected in zip(self._stack, self._path, strict=False)
+        )
+
+    def feed(self, chunk: bytes) -> Iterator[Any]:
+        """Process the next chunk of the document and yield all array elements completed by
+        it.
+        """
+        if self.done:
+            return
+        if not self.found:
+            position = self._scan(chunk)
+            if not self.found:
+                return
+            chunk = chunk[position:]
+        self._buffer += self._text_decoder.decode(chunk)
+        yield from self._decode_elements()
+
+    def close(self) -> None:
+        """Signal the end of the document.
+
+        Raises:
+            ValueError: If the array was found but did not end properly.
+        """
+        if self.found and not self.done:
+            raise ValueError(f"Incomplete or malformed array element: {self._buffer[:100]!r}")
+
+    def _decode_elements(self) -> Iterator[Any]:
+        position = 0
+        buffer = self._buffer
+        while True:
+            position = _WHITESPACE.match(buffer, position).end()  # type: ignore[union-attr]
+            if position >= len(buffer):
+                break
+            if buffer[position] == "]":
+                self.done = True
+                break
+            if buffer[position] == ",":
+                position += 1
+                continue
+            try:
+                element, end = self._decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The element is not complete yet
+                break
+            if isinstance(element, int | float) and buffer[end : end + 1] not in _DELIMITERS:
+                # The number may continue in the next chunk
+                break
+            position = end
+            yield element
+        self._buffer = "" if self.done else buffer[position:]
+
+    def _scan(self, chunk: bytes) -> int:
+        """Scan the chunk for the beginning of the array. Returns the position after the opening
+        bracket if the array was found.
+        """
+        position = 0
+        while position < len(chunk) and not self.found:
+            if self._in_string:
+                position = self._scan_string(chunk, position)
+                continue
+            match = _STRUCTURE_PATTERN.search(chunk, position)
+            if match is None:
+                return len(chunk)
+            position = match.end()
+            self._handle_token(match.group())
+        return position
+
+    def _scan_string(self, chunk: bytes, position: int) -> int:
+        """Scan the remainder of a string starting at :paramref:`position`. Returns the position
+        after the closing quote or the length of the chunk if the string continues.
+        """
+        while position < len(chunk):
+            if self._escaped:
+                if self._expect_key:
+                    self._key += chunk[position : position + 1]
+                self._escaped = False
+                position += 1
+                continue
+            match = _STRING_PATTERN.search(chunk, position)
+            end = match.start() if match else len(chunk)
+            if self._expect_key:
+                self._key += chunk[position:end]
+            if match is None:
+                return end
+            position = match.end()
+            if match.group() == b"\\":
+                # Keys with escape sequences are stored verbatim and never match the path
+                if self._expect_key:
+                    self._key += b"\\"
+                self._escaped = True
+                continue
+            self._in_string = False
+            if self._expect_key:
+                self._stack[-1] = (_OBJECT, bytes(self._key))
+                self._key.clear()
+            break
+        return position
+
+    def _handle_token(self, token: bytes) -> None:
+        if token == b'"':
+            self._in_string = True
+        elif token == b"{":
+            self._stack.append((_OBJECT, None))
+            self._expect_key = True
+        elif token == b"[":
+            self._stack.append((_ARRAY, None))
+            self._expect_key = False
+            self.found = self._in_target
+        elif token in b"}]":
+            self._stack.pop()
+            self._expect_key = False
+        elif token == b":":
+            self._expect_key = False
+        elif token == b",":
+            self._expect_key = bool(self._stack) and self._stack[-1][0] == _OBJECT
@@ -1,41 +1,76 @@
+import asyncio
+import os
+import re
+import time
 from abc import ABC
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Callable, Coroutine, Mapping, Sequence
 from contextlib import AbstractAsyncContextManager, asynccontextmanager
 from types import TracebackType
-from typing import Annotated, Any, Self
+from typing import Any, ClassVar, Self, TypeVar
 from urllib.parse import urlencode
 
 import httpx
 import httpx_retries
-from pydantic import AwareDatetime, BeforeValidator
+from pydantic import BaseModel
 
+from akalisten.clients._context import ClientContext
+from akalisten.clients._limiting import ENDPOINT_EXTENSION, LimitedTransport
+from akalisten.clients._streaming import JSONArrayStream
+from akalisten.tracing import trace_span
 
-def _parse_datetime(value: str | int) -> str | int | None:
-    if value in [0, "0"]:
-        return None
-    return value
+_ModelT = TypeVar("_ModelT", bound=BaseModel)
+_USER_AGENT = "AkalistenClient/1.0 (+htttps://github.com/akablas/akalisten)"
+_ID_SEGMENT_PATTERN = re.compile(r"(?<![^/])[^/]*\d[^/]*")
+DEFAULT_NEXTCLOUD_URL = "https://cloud.akablas.de"
 
 
-OptionalDateTimeField = Annotated[AwareDatetime | None, BeforeValidator(_parse_datetime)]
-RequiredDateTimeField = Annotated[AwareDatetime, BeforeValidator(_parse_datetime)]
+def nextcloud_url() -> str:
+    """Get the base URL of the NextCloud instance. Defaults to :data:`DEFAULT_NEXTCLOUD_URL` and
+    can be overridden with the ``NC_BASE_URL`` environment variable, e.g. to crawl the local
+    stand-in server from :mod:`akalisten.fake_ocs`.
+    """
+    return os.getenv("NC_BASE_URL", DEFAULT_NEXTCLOUD_URL).rstrip("/")
 
-_USER_AGENT = "AkalistenClient/1.0 (+htttps://github.com/akablas/akalisten)"
+
+def endpoint_label(endpoint: str) -> str:
+    """Get the logical name of an endpoint by replacing all path segments containing digits
+    (i.e. IDs) with ``{id}``, e.g. ``poll/123/votes`` becomes ``poll/{id}/votes``.
+    """
+    return _ID_SEGMENT_PATTERN.sub("{id}", endpoint.strip("/"))
 
 
 class BaseAPI(AbstractAsyncContextManager, ABC):
     """Simple base class for API clients using the `httpx` library."""
 
-    def __init__(self, base_url: str, httpx_kwargs: dict[str, Any] | None = None) -> None:
+    DEFAULT_TIMEOUT: ClassVar[float] = 30
+    ENDPOINT_TIMEOUTS: ClassVar[Mapping[str, float]] = {}
+    """Timeouts in seconds for specific endpoints, keyed by :func:`endpoint_label`."""
+
+    def __init__(
+        self,
+        base_url: str,
+        httpx_kwargs: dict[str, Any] | None = None,
+        context: ClientContext | None = None,
+    ) -> None:
         headers = httpx_kwargs.pop("headers", {}) if httpx_kwargs else {}
         headers.setdefault("User-Agent", _USER_AGENT)
 
+        self.context: ClientContext = context or ClientContext()
         self._client = httpx.AsyncClient(
-            timeout=30,
-            transport=httpx_retries.RetryTransport(retry=httpx_retries.Retry(total=5)),
+            timeout=self.DEFAULT_TIMEOUT,
+            transport=httpx_retries.RetryTransport(
+                transport=LimitedTransport(
+                    httpx.AsyncHTTPTransport(), self.context.traffic, self.context.metrics
+                ),
+                retry=httpx_retries.Retry(total=5, backoff_factor=0.5, max_backoff_wait=30),
+            ),
             headers=headers,
             **(httpx_kwargs or {}),
         )
         self._base_url: str = base_url
+        # Used to distinguish otherwise identical requests with different credentials when
+        # coalescing requests across clients
+        self._auth_key = hash(repr((httpx_kwargs or {}).get("auth")))
 
     async def __aenter__(self) -> Self:
         return self
@@ -56,26 +91,127 @@ class BaseAPI(AbstractAsyncContextManager, ABC):
             url += f"?{urlencode(params)}"
         return url
 
-    async def request(
+    def select_model(self, projection: type[_ModelT], full: type[_ModelT]) -> type[_ModelT]:
+        """Select the model to validate a response into, depending on
+        :attr:`ClientContext.strict_models`.
+        """
+        return full if self.context.strict_models else projection
+
+    def timeout_for(self, endpoint: str) -> float:
+        return self.ENDPOINT_TIMEOUTS.get(endpoint_label(endpoint), self.DEFAULT_TIMEOUT)
+
+    async def _send(
         self,
         method: str,
         endpoint: str,
         params: dict[str, str] | None = None,
         httpx_kwargs: dict[str, Any] | None = None,
     ) -> httpx.Response:
-        response = await self._client.request(
-            method, self.build_url(endpoint, params), **(httpx_kwargs or {})
-        )
+        self.context.statistics.requests += 1
+        label = endpoint_label(endpoint)
+        kwargs: dict[str, Any] = {
+            "timeout": self.timeout_for(endpoint),
+            "extensions": {ENDPOINT_EXTENSION: label},
+        } | (httpx_kwargs or {})
+        with trace_span(f"{method} {label}", "http", endpoint=endpoint) as span:
+            start = time.monotonic()
+            response: httpx.Response | None = None
+            try:
+                response = await self._client.request(
+                    method, self.build_url(endpoint, params), **kwargs
+                )
+            finally:
+                # Failed and cancelled requests are recorded as well, they tend to be the slowest
+                latency = time.monotonic() - start
+                self.context.metrics.record_request(
+                    label,
+                    latency,
+                    len(response.content) if response is not None else 0,
+                    failed=response is None or not response.is_success,
+                )
+            span.update(status=response.status_code, size=len(response.content))
         response.raise_for_status()
+        self.context.latencies.record(label, latency)
         return response
 
+    async def _hedged(
+        self, label: str, send: Callable[[], Coroutine[Any, Any, httpx.Response]]
+    ) -> httpx.Response:
+        """Await :paramref:`send` and call it a second time if the first call takes longer than
+        usual for the endpoint. The first successful response is returned, the other one is
+        closed.
+        """
+        settings = self.context.hedging
+        statistics = self.context.statistics
+        delay = self.context.latencies.percentile(label, settings.percentile, settings.min_samples)
+        if delay is None:
+            return await send()
+
+        tasks = [asyncio.create_task(send())]
+        winner: httpx.Response | None = None
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=delay)
+            if done or not settings.allows_hedge(statistics.hedges_fired, statistics.requests):
+                winner = await tasks[0]
+            else:
+                statistics.hedges_fired += 1
+                tasks.append(asyncio.create_task(send()))
+                pending = set(tasks)
+                while winner is None and pending:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    successful = [task for task in tasks if task in done and not task.exception()]
+                    if successful:
+                        winner = successful[0].result()
+                        if successful[0] is tasks[1]:
+                            statistics.hedges_won += 1
+                if winner is None:
+                    # Both requests failed
+                    winner = tasks[0].result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            # The response of the other request may be streamed, i.e. hold a connection
+            for result in await asyncio.gather(*tasks, return_exceptions=True):
+                if isinstance(result, httpx.Response) and result is not winner:
+                    await result.aclose()
+        return winner
+
+    async def request(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict[str, str] | None = None,
+        httpx_kwargs: dict[str, Any] | None = None,
+    ) -> httpx.Response:
+        """Send a request. If hedging is enabled in the :class:`ClientContext`, ``GET``
+        requests that take longer than usual for the endpoint are duplicated and the first
+        response is used. See :class:`~akalisten.clients._hedging.HedgingSettings`.
+        """
+        if method == "GET" and self.context.hedging.enabled:
+            return await self._hedged(
+                endpoint_label(endpoint), lambda: self._send("GET", endpoint, params, httpx_kwargs)
+            )
+        return await self._send(method, endpoint, params, httpx_kwargs)
+
     async def get(
         self,
         endpoint: str,
         params: dict[str, str] | None = None,
         httpx_kwargs: dict[str, Any] | None = None,
     ) -> httpx.Response:
-        return await self.request("GET", endpoint, params, httpx_kwargs)
+        """Send a ``GET`` request. Concurrent identical requests, i.e. requests with the same URL
+        and credentials across all clients sharing the same :class:`ClientContext`, are coalesced
+        into a single request. Requests with custom :paramref:`httpx_kwargs` are never coalesced.
+        """
+        if httpx_kwargs:
+            return await self.request("GET", endpoint, params, httpx_kwargs)
+        return await self.context.coalescer.run(
+            key=("GET", self.build_url(endpoint, params), self._auth_key),
+            send=lambda: self.request("GET", endpoint, params),
+            statistics=self.context.statistics,
+        )
 
     @asynccontextmanager
     async def json_content(
@@ -102,10 +238,122 @@ class BaseAPI(AbstractAsyncContextManager, ABC):
             The JSON content of the API response.
         """
         response = await self.get(endpoint, params, httpx_kwargs)
+        label = endpoint_label(endpoint)
+        with trace_span(f"parse {label}", "parse", endpoint=endpoint) as span:
+            start = time.perf_counter()
+            decoded = start
+            try:
+                json = response.json()
+                decoded = time.perf_counter()
+                yield json
+            except Exception as exc:
+                raise RuntimeError(
+                    f"Failed to parse API response `{response.content!r}` with status "
+                    f"`{response.status_code}`."
+                ) from exc
+            finally:
+                validated = time.perf_counter()
+                span.update(decode=decoded - start, validation=validated - decoded)
+                self.context.metrics.record_processing(
+                    label, decode=decoded - start, validation=validated - decoded
+                )
+
+    async def _open_stream(
+        self, endpoint: str, params: dict[str, str] | None = None
+    ) -> httpx.Response:
+        """Send a ``GET`` request and return the response as soon as its headers are received.
+        The time until then is recorded as latency of the endpoint, which is what hedging
+        streamed requests is based on. The caller must close the response.
+        """
+        self.context.statistics.requests += 1
+        label = endpoint_label(endpoint)
+        request = self._client.build_request(
+            "GET",
+            self.build_url(endpoint, params),
+            timeout=self.timeout_for(endpoint),
+            extensions={ENDPOINT_EXTENSION: label},
+        )
+        start = time.monotonic()
         try:
-            yield response.json()
-        except Exception as exc:
-            raise RuntimeError(
-                f"Failed to parse API response `{response.content!r}` with status "
-                f"`{response.status_code}`."
-            ) from exc
+            response = await self._client.send(request, stream=True)
+        except BaseException:
+            self.context.metrics.record_request(label, time.monotonic() - start, 0, failed=True)
+            raise
+        latency = time.monotonic() - start
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError:
+            self.context.metrics.record_request(label, latency, 0, failed=True)
+            await response.aclose()
+            raise
+        self.context.latencies.record(label, latency)
+        return response
+
+    @asynccontextmanager
+    async def json_array_stream(
+        self, endpoint: str, path: Sequence[str], params: dict[str, str] | None = None
+    ) -> AsyncIterator[AsyncIterator[Any]]:
+        """Context manager that streams the response of a ``GET`` request and yields the decoded
+        elements of the array at :paramref:`path` one by one while the response is being
+        received. Use this instead of :meth:`json_content` for responses with large arrays, such
+        that the complete response never has to be held in memory.
+
+        The request is sent when entering the context. In contrast to :meth:`get`, streamed
+        requests are not coalesced. If hedging is enabled, a second request is sent if the
+        headers of the response take longer than usual, see :meth:`request`.
+
+        Example:
+            .. code-block:: python
+
+                async with self.json_array_stream("votes", ("ocs", "data", "votes")) as votes:
+                    async for vote in votes:
+                        print(PollVote(**vote))
+
+        Args:
+            endpoint: The endpoint to request.
+            path: The keys of the nested objects leading to the array.
+            params: Query parameters of the request.
+        """
+        label = endpoint_label(endpoint)
+        size = 0
+        decode_time = 0.0
+
+        async def elements(response: httpx.Response) -> AsyncIterator[Any]:
+            nonlocal size, decode_time
+            stream = JSONArrayStream(path)
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                start = time.perf_counter()
+                completed = list(stream.feed(chunk))
+                decode_time += time.perf_counter() - start
+                for element in completed:
+                    yield element
+            try:
+                stream.close()
+            except ValueError as exc:
+                raise RuntimeError(f"Failed to parse API response of `{endpoint}`.") from exc
+            if not stream.found:
+                raise RuntimeError(
+                    f"Array `{'.'.join(path)}` not found in the API response of `{endpoint}`."
+                )
+
+        start = time.monotonic()
+        # The span covers receiving, decoding and validating the elements, which are interleaved
+        with trace_span(f"GET {label} (streamed)", "http", endpoint=endpoint) as span:
+            if self.context.hedging.enabled:
+                response = await self._hedged(label, lambda: self._open_stream(endpoint, params))
+            else:
+                response = await self._open_stream(endpoint, params)
+            span.update(status=response.status_code, headers=time.monotonic() - start)
+            failed = True
+            try:
+                yield elements(response)
+                failed = False
+            finally:
+                await response.aclose()
+                # The time spent validating the elements is included in the request duration
+                self.context.metrics.record_request(
+                    label, time.monotonic() - start, size, failed=failed
+                )
+                self.context.metrics.record_processing(label, decode=decode_time, validation=0)
+                span.update(size=size, decode=decode_time)
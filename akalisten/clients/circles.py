@@ -1,44 +1,59 @@
 import asyncio
 import os
-from collections.abc import Sequence
+from collections.abc import Mapping, Sequence
+from typing import ClassVar
 
-from akalisten.clients._utils import BaseAPI
+from akalisten.clients._context import ClientContext
+from akalisten.clients._utils import BaseAPI, nextcloud_url
 from akalisten.models.general import User
 from akalisten.models.raw_api_models.circles import (
     Circle,
     CircleMember,
+    CircleMemberProjection,
+    CircleProjection,
     MemberLevel,
     MemberStatus,
     UserType,
 )
 from akalisten.models.register import RegisterCircle, Registers
+from akalisten.tracing import traced
 
 
 class CirclesAPI(BaseAPI):
-    def __init__(self) -> None:
+    ENDPOINT_TIMEOUTS: ClassVar[Mapping[str, float]] = {"circles/{id}/members": 60}
+
+    def __init__(self, context: ClientContext | None = None) -> None:
         super().__init__(
-            base_url="https://cloud.akablas.de/ocs/v2.php/apps/circles",
+            base_url=f"{nextcloud_url()}/ocs/v2.php/apps/circles",
             httpx_kwargs={
                 "auth": (os.environ["NC_USERNAME"], os.environ["NC_PASSWORD"]),
                 "headers": {"OCS-APIRequest": "true"},
             },
+            context=context,
         )
 
     def build_url(self, endpoint: str, params: dict[str, str] | None = None) -> str:
         return super().build_url(endpoint=endpoint, params=(params or {}) | {"format": "json"})
 
-    async def get_circles(self) -> Sequence[Circle]:
+    @traced
+    async def get_circles(self) -> Sequence[CircleProjection]:
+        model = self.select_model(CircleProjection, Circle)
         async with self.json_content("circles") as json:
-            return [Circle(**data) for data in json["ocs"]["data"]]
+            return [model(**data) for data in json["ocs"]["data"]]
 
-    async def get_circle_details(self, circle_id: str) -> Circle:
+    @traced
+    async def get_circle_details(self, circle_id: str) -> CircleProjection:
+        model = self.select_model(CircleProjection, Circle)
         async with self.json_content(f"circles/{circle_id}") as json:
-            return Circle(**json["ocs"]["data"])
+            return model(**json["ocs"]["data"])
 
-    async def get_circle_members(self, circle_id: str) -> Sequence[CircleMember]:
+    @traced
+    async def get_circle_members(self, circle_id: str) -> Sequence[CircleMemberProjection]:
+        model = self.select_model(CircleMemberProjection, CircleMember)
         async with self.json_content(f"circles/{circle_id}/members") as json:
-            return [CircleMember(**data) for data in json["ocs"]["data"]]
+            return [model(**data) for data in json["ocs"]["data"]]
 
+    @traced
     async def aggregate_registers(self) -> Registers:
         circles = await self.get_circles()
         relevant_circles = {
@@ -46,7 +61,9 @@ class CirclesAPI(BaseAPI):
         }
         async with asyncio.TaskGroup() as group:
             members = {
-                circle_id: group.create_task(self.get_circle_members(circle_id))
+                circle_id: group.create_task(
+                    self.get_circle_members(circle_id), name=f"circle {circle_id} members"
+                )
                 for circle_id in relevant_circles
             }
 
@@ -1,39 +1,125 @@
 import asyncio
+import logging
 import os
-from collections.abc import Sequence
-from typing import Literal
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import ClassVar, Literal
 
-from akalisten.clients._utils import BaseAPI
+from pydantic import Field, RootModel
+
+from akalisten.clients._context import ClientContext
+from akalisten.clients._utils import BaseAPI, nextcloud_url
 from akalisten.models.forms import FormInfo
-from akalisten.models.raw_api_models.forms import CondensedForm, FullForm
+from akalisten.models.raw_api_models.forms import CondensedForm, FormProjection, FullForm
+from akalisten.tracing import traced
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class FormCache(RootModel):
+    """Persistent cache of full forms, keyed by :meth:`key`."""
+
+    root: dict[str, FormProjection] = Field(default_factory=dict)
+
+    @staticmethod
+    def key(form: CondensedForm) -> str | None:
+        """The key changes whenever the form, its questions or its shares are edited. Returns
+        :obj:`None` if the server doesn't report when the form was last updated. Such forms must
+        not be cached, since their access and shares could change unnoticed.
+        """
+        if form.lastUpdated is None:
+            return None
+        return f"{form.hash}-{form.state.value}-{int(form.lastUpdated.timestamp())}"
+
+    @classmethod
+    def load(cls, path: Path | None) -> "FormCache":
+        if path is None or not path.exists():
+            return cls()
+        try:
+            return cls.model_validate_json(path.read_text(encoding="utf-8"))
+        except ValueError:
+            _LOGGER.warning("Ignoring invalid form cache at %s", path)
+            return cls()
+
+    def save(self, path: Path | None) -> None:
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.model_dump_json(), encoding="utf-8")
 
 
 class FormsAPI(BaseAPI):
-    def __init__(self) -> None:
+    ENDPOINT_TIMEOUTS: ClassVar[Mapping[str, float]] = {"forms/{id}": 60}
+
+    def __init__(
+        self,
+        context: ClientContext | None = None,
+        cache_path: Path | None = None,
+        max_concurrency: int = 4,
+    ) -> None:
         super().__init__(
-            base_url="https://cloud.akablas.de/ocs/v2.php/apps/forms/api/v3/forms",
+            base_url=f"{nextcloud_url()}/ocs/v2.php/apps/forms/api/v3",
             httpx_kwargs={
                 "auth": (os.environ["NC_USERNAME"], os.environ["NC_PASSWORD"]),
                 "headers": {"OCS-APIRequest": "true", "Accept": "application/json"},
             },
+            context=context,
         )
+        self._cache_path = cache_path
+        self._max_concurrency = max_concurrency
 
+    @traced
     async def get_forms(self, form_type: Literal["owned", "shared"]) -> Sequence[CondensedForm]:
-        async with self.json_content("", params={"type": form_type}) as json:
+        async with self.json_content("forms", params={"type": form_type}) as json:
             return [CondensedForm(**data) for data in json["ocs"]["data"]]
 
-    async def get_form(self, form_id: int) -> FullForm:
-        async with self.json_content(str(form_id)) as json:
-            return FullForm(**json["ocs"]["data"])
+    @traced
+    async def get_form(self, form_id: int) -> FormProjection:
+        model = self.select_model(FormProjection, FullForm)
+        async with self.json_content(f"forms/{form_id}") as json:
+            return model(**json["ocs"]["data"])
 
+    @traced
     async def get_all_forms(self) -> Sequence[FormInfo]:
+        """Get all forms that are shared with or owned by the user.
+
+        Forms that show up in both lists are fetched only once and forms that are closed or
+        expired are not fetched at all. Full forms are cached in :paramref:`cache_path` (if
+        given) such that they are only fetched again when they were updated, see
+        :meth:`FormCache.key`.
+        """
         async with asyncio.TaskGroup() as group:
             shared_task = group.create_task(self.get_forms("shared"))
             owned_task = group.create_task(self.get_forms("owned"))
 
-            all_forms = [
-                group.create_task(self.get_form(form.id))
-                for form in list(await shared_task) + list(await owned_task)
-            ]
+        condensed_forms = {form.id: form for form in [*shared_task.result(), *owned_task.result()]}
+        open_forms = [form for form in condensed_forms.values() if FormInfo.is_open_form(form)]
+        self.context.statistics.skipped += len(condensed_forms) - len(open_forms)
+
+        old_cache = FormCache.load(self._cache_path)
+        new_cache = FormCache()
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def fetch(form: CondensedForm) -> FormProjection:
+            key = FormCache.key(form)
+            if key is None or (full_form := old_cache.root.get(key)) is None:
+                async with semaphore:
+                    full_form = await self.get_form(form.id)
+            else:
+                self.context.statistics.cache_hits += 1
+                # The condensed data was just fetched and is thus up to date in any case
+                full_form = full_form.model_copy(
+                    update={name: getattr(form, name) for name in CondensedForm.model_fields}
+                )
+            if key is not None:
+                new_cache.root[key] = full_form
+            return full_form
 
-        return [FormInfo(form=form) for form in await asyncio.gather(*all_forms)]
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(fetch(form), name=f"form {form.id}") for form in open_forms]
+
+        new_cache.save(self._cache_path)
+        _LOGGER.info(
+            "Found %d distinct forms, %d of which are open.", len(condensed_forms), len(open_forms)
+        )
+        return [FormInfo(form=task.result()) for task in tasks]
@@ -1,62 +1,107 @@
+import asyncio
 import os
-from collections.abc import Sequence
+from collections.abc import Mapping, Sequence
+from typing import ClassVar
 
-from akalisten.clients._utils import BaseAPI
+from akalisten.clients._context import ClientContext
+from akalisten.clients._utils import BaseAPI, nextcloud_url
 from akalisten.models.polls import PollInfo, PollVotes
-from akalisten.models.raw_api_models.polls import Poll, PollOption, PollShare, PollVote
+from akalisten.models.raw_api_models.polls import (
+    Poll,
+    PollOption,
+    PollOptionProjection,
+    PollProjection,
+    PollShare,
+    PollShareProjection,
+    PollVote,
+    PollVoteProjection,
+)
+from akalisten.tracing import traced
 
 
 class PollAPI(BaseAPI):
-    def __init__(self) -> None:
+    ENDPOINT_TIMEOUTS: ClassVar[Mapping[str, float]] = {
+        "poll/{id}/votes": 60,
+        "poll/{id}/options": 20,
+        "poll/{id}/shares": 20,
+    }
+
+    def __init__(self, context: ClientContext | None = None) -> None:
         super().__init__(
-            base_url="https://cloud.akablas.de/ocs/v2.php/apps/polls/api/v1.0/",
+            base_url=f"{nextcloud_url()}/ocs/v2.php/apps/polls/api/v1.0",
             httpx_kwargs={
                 "auth": (os.environ["NC_USERNAME"], os.environ["NC_PASSWORD"]),
                 "headers": {"OCS-APIRequest": "true", "Accept": "application/json"},
             },
+            context=context,
         )
 
-    async def get_polls(self) -> Sequence[Poll]:
+    @traced
+    async def get_polls(self) -> Sequence[PollProjection]:
+        model = self.select_model(PollProjection, Poll)
         async with self.json_content("polls") as json:
-            return [Poll(**poll) for poll in json["ocs"]["data"]["polls"]]
+            return [model(**poll) for poll in json["ocs"]["data"]["polls"]]
 
+    @traced
     async def get_polls_info(self) -> Sequence[PollInfo]:
         return [PollInfo(poll=poll) for poll in await self.get_polls()]
 
-    async def get_poll(self, poll_id: int) -> Poll:
+    @traced
+    async def get_poll(self, poll_id: int) -> PollProjection:
+        model = self.select_model(PollProjection, Poll)
         async with self.json_content(f"poll/{poll_id}") as json:
-            return Poll(**json["ocs"]["data"])
+            return model(**json["ocs"]["data"])
 
+    @traced
     async def get_poll_info(self, poll_id: int) -> PollInfo:
         return PollInfo(poll=await self.get_poll(poll_id))
 
-    async def get_poll_options(self, poll_id: int) -> Sequence[PollOption]:
+    @traced
+    async def get_poll_options(self, poll_id: int) -> Sequence[PollOptionProjection]:
+        model = self.select_model(PollOptionProjection, PollOption)
         async with self.json_content(f"poll/{poll_id}/options") as json:
-            return [PollOption(**option) for option in json["ocs"]["data"]["options"]]
+            return [model(**option) for option in json["ocs"]["data"]["options"]]
 
-    async def get_poll_votes(self, poll_id: int) -> Sequence[PollVote]:
+    @traced
+    async def get_poll_votes(self, poll_id: int) -> Sequence[PollVoteProjection]:
+        model = self.select_model(PollVoteProjection, PollVote)
         async with self.json_content(f"poll/{poll_id}/votes") as json:
-            return [PollVote(**vote) for vote in json["ocs"]["data"]["votes"]]
+            return [model(**vote) for vote in json["ocs"]["data"]["votes"]]
 
-    async def get_poll_shares(self, poll_id: int) -> Sequence[PollShare]:
+    @traced
+    async def get_poll_shares(self, poll_id: int) -> Sequence[PollShareProjection]:
+        model = self.select_model(PollShareProjection, PollShare)
         async with self.json_content(f"poll/{poll_id}/shares") as json:
-            return [PollShare(**share) for share in json["ocs"]["data"]["shares"]]
+            return [model(**share) for share in json["ocs"]["data"]["shares"]]
 
+    @traced
     async def get_public_share_token(self, poll_id: int) -> set[str]:
         shares = await self.get_poll_shares(poll_id)
         return {share.token for share in shares if share.type == "public"}
 
+    @traced
     async def aggregate_poll_votes(self, poll_id: int) -> PollVotes:
-        votes = await self.get_poll_votes(poll_id)
-        options = await self.get_poll_options(poll_id)
+        model = self.select_model(PollVoteProjection, PollVote)
         poll_votes = PollVotes(poll_id=poll_id)
 
-        # Adding Options first is important! Python dicts are ordered since 3.7, so this makes
-        # sure that the options are added in the order reported by the API. We assume that this
-        # is the order displayed to the user on NextCloud.
-        for option in options:
-            poll_votes.add_option(option)
-        for vote in votes:
-            poll_votes.add_vote(vote)
+        # The votes of busy polls make up by far the largest responses. They are therefore
+        # processed one by one while the response is received instead of decoding the whole
+        # response first. The options are requested concurrently.
+        options_task = asyncio.create_task(
+            self.get_poll_options(poll_id), name=f"poll {poll_id} options"
+        )
+        try:
+            async with self.json_array_stream(
+                f"poll/{poll_id}/votes", ("ocs", "data", "votes")
+            ) as votes:
+                # Adding Options first is important! Python dicts are ordered since 3.7, so this
+                # makes sure that the options are added in the order reported by the API. We
+                # assume that this is the order displayed to the user on NextCloud.
+                for option in await options_task:
+                    poll_votes.add_option(option)
+                async for vote in votes:
+                    poll_votes.add_vote(model(**vote))
+        finally:
+            options_task.cancel()
 
         return poll_votes
@@ -2,20 +2,24 @@ import os
 from collections.abc import Sequence
 from typing import Literal
 
-from akalisten.clients._utils import BaseAPI
+from akalisten.clients._context import ClientContext
+from akalisten.clients._utils import BaseAPI, nextcloud_url
 from akalisten.models.setlists import Setlist
+from akalisten.tracing import traced
 
 
 class SetlistAPI(BaseAPI):
-    def __init__(self) -> None:
+    def __init__(self, context: ClientContext | None = None) -> None:
         super().__init__(
-            base_url="https://cloud.akablas.de/ocs/v2.php/apps/orchestrascoresmanager",
+            base_url=f"{nextcloud_url()}/ocs/v2.php/apps/orchestrascoresmanager",
             httpx_kwargs={
                 "auth": (os.environ["NC_USERNAME"], os.environ["NC_PASSWORD"]),
                 "headers": {"OCS-APIRequest": "true", "Accept": "application/json"},
             },
+            context=context,
         )
 
+    @traced
     async def get_setlists(
         self, query_filter: Literal["all", "future", "past"] = "future"
     ) -> Sequence[Setlist]:
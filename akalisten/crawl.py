@@ -2,37 +2,35 @@
 format that can be used by the Jinja2 template
 """
 
+import asyncio
 import datetime as dtm
+import logging
+from collections.abc import Awaitable, Mapping
 from pathlib import Path
+from typing import TYPE_CHECKING, TypeVar
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel
 
-from .clients.circles import CirclesAPI
-from .clients.forms import FormsAPI
-from .clients.polls import PollAPI
-from .clients.setlists import SetlistAPI
+from .clients._context import ClientContext
 from .datetime import TZ_INFO
 from .models.chatgroups import ChatGroup, ChatGroups
-from .models.forms import FormInfo
 from .models.links import Link, Links
 from .models.lists import List, Lists
-from .models.polls import PollInfo, PollVotes
 from .models.register import Registers
+from .models.template import MuckenListenData, Source, TemplateData
+from .profiling import profile_phase
+from .snapshot import load_snapshot, save_snapshot
+from .tracing import traced
 
+if TYPE_CHECKING:
+    from collections.abc import Sequence
 
-class MuckenListenData(BaseModel):
-    polls: dict[int, PollInfo]
-    poll_votes: dict[int, PollVotes]
-    registers: Registers
+    from .models.forms import FormInfo
+    from .models.polls import PollInfo, PollVotes
+    from .models.setlists import Setlist
 
-
-class TemplateData(BaseModel):
-    mucken_listen: MuckenListenData
-    polls: list[PollInfo]
-    forms: list[FormInfo]
-    links: list[Link] = Field(default_factory=list)
-    lists: list[List] = Field(default_factory=list)
-    chat_groups: list[ChatGroup] = Field(default_factory=list)
+_LOGGER = logging.getLogger(__name__)
+_T = TypeVar("_T")
 
 
 def get_links(path: Path | str) -> list[Link]:
@@ -52,11 +50,7 @@ def get_lists(path: Path | str) -> list[List]:
     else:
         lists = Lists.model_validate_json(effective_path.read_text(encoding="utf-8"))
 
-    return [
-        list_
-        for list_ in lists.root
-        if list_.expire_date is None or list_.expire_date >= dtm.datetime.now(tz=TZ_INFO)
-    ]
+    return lists.active_lists
 
 
 def get_chat_groups(path: Path | str) -> list[ChatGroup]:
@@ -69,59 +63,426 @@ def get_chat_groups(path: Path | str) -> list[ChatGroup]:
     return chatgroups.active_groups
 
 
-async def get_template_data(
-    debug: bool,
-    dummy_data_path: Path,
-    links_path: Path | str,
-    lists_path: Path | str,
-    chat_groups_path: Path | str,
-) -> TemplateData:
-    if debug and dummy_data_path.exists():
-        template_data = TemplateData.model_validate_json(
-            dummy_data_path.read_text(encoding="utf-8")
+class SourceDeadlines(BaseModel):
+    """Time budgets in seconds for fetching the data of each :class:`Source`. The budgets of
+    registers and setlists run in parallel, as do those of votes and forms. If a source misses
+    its deadline or fails, the data of the last crawl is used instead and marked as stale.
+    """
+
+    registers: float = 120
+    setlists: float = 60
+    polls: float = 60
+    """Budget for the list of polls and the share tokens of the polls together."""
+    votes: float = 180
+    """Budget for the votes of all polls, which are fetched concurrently."""
+    forms: float = 120
+
+    def for_source(self, source: Source) -> float:
+        return getattr(self, source.value)
+
+    def deadline_for(self, source: Source, start: float | None = None) -> float:
+        """Get the deadline of :paramref:`source` in terms of :meth:`asyncio.loop.time`.
+
+        Args:
+            source: The source.
+            start: The loop time at which fetching the source started. Defaults to now.
+        """
+        if start is None:
+            start = asyncio.get_running_loop().time()
+        return start + self.for_source(source)
+
+
+class SourcesUnavailableError(Exception):
+    """Raised by :func:`crawl` if sources could neither be fetched nor be taken from the
+    fallback. Rendering without their data would replace the last published pages with empty
+    sections, so the run must fail instead.
+    """
+
+    def __init__(self, sources: set[Source]) -> None:
+        self.sources = sources
+        super().__init__(f"No data available for: {', '.join(sorted(sources))}")
+
+
+class _Freshness:
+    """Keeps track of which sources were fetched successfully in the current crawl."""
+
+    def __init__(self, fallback: TemplateData | None) -> None:
+        self.fallback = fallback
+        self.fetched: dict[Source, dtm.datetime] = {}
+        self.stale: set[Source] = set()
+        self.unavailable: set[Source] = set()
+        """Stale sources without data in the fallback."""
+        self._now = dtm.datetime.now(TZ_INFO)
+
+    def mark_fresh(self, source: Source) -> None:
+        if source not in self.stale:
+            self.fetched[source] = self._now
+
+    def mark_stale(self, source: Source) -> None:
+        if source in self.stale:
+            return
+        self.stale.add(source)
+        self.fetched.pop(source, None)
+        if self.fallback is not None and (fetched := self.fallback.fetched.get(source)):
+            self.fetched[source] = fetched
+        else:
+            _LOGGER.warning("No earlier data available for %s", source)
+            self.unavailable.add(source)
+
+
+async def _with_deadline(
+    source: Source,
+    deadlines: SourceDeadlines,
+    awaitable: Awaitable[_T],
+    start: float | None = None,
+) -> _T | None:
+    """Await :paramref:`awaitable` within the deadline of :paramref:`source`, measured from
+    :paramref:`start`. Returns :obj:`None` if the deadline is missed or an error occurs.
+    """
+    try:
+        async with asyncio.timeout_at(deadlines.deadline_for(source, start)):
+            return await awaitable
+    except TimeoutError:
+        _LOGGER.warning("Fetching %s missed its deadline", source)
+    except Exception:
+        _LOGGER.warning("Fetching %s failed", source, exc_info=True)
+    return None
+
+
+async def _wait_with_deadline(
+    source: Source,
+    deadlines: SourceDeadlines,
+    tasks: Mapping[int, asyncio.Task[_T]],
+    start: float | None = None,
+) -> dict[int, _T]:
+    """Wait for the tasks until the deadline of :paramref:`source`, measured from
+    :paramref:`start`, and cancel the remaining ones. Returns the results of the tasks that
+    completed successfully.
+    """
+    if not tasks:
+        return {}
+    loop = asyncio.get_running_loop()
+    timeout = max(0, deadlines.deadline_for(source, start) - loop.time())
+    _, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    results: dict[int, _T] = {}
+    for key, task in tasks.items():
+        if task.cancelled():
+            _LOGGER.warning("Fetching %s of %s missed its deadline", source, key)
+        elif (exc := task.exception()) is not None:
+            _LOGGER.warning("Fetching %s of %s failed", source, key, exc_info=exc)
+        else:
+            results[key] = task.result()
+    return results
+
+
+async def _crawl_registers_and_setlists(
+    context: ClientContext, deadlines: SourceDeadlines, freshness: _Freshness
+) -> tuple[Registers, "Sequence[Setlist] | None"]:
+    from .clients.circles import CirclesAPI
+    from .clients.setlists import SetlistAPI
+
+    async with (
+        CirclesAPI(context=context) as circles_client,
+        SetlistAPI(context=context) as setlist_client,
+        asyncio.TaskGroup() as group,
+    ):
+        registers_task = group.create_task(
+            _with_deadline(Source.REGISTERS, deadlines, circles_client.aggregate_registers()),
+            name="registers",
         )
-        for poll_votes in template_data.mucken_listen.poll_votes.values():
-            poll_votes.sanitize_votes()
+        setlists_task = group.create_task(
+            _with_deadline(Source.SETLISTS, deadlines, setlist_client.get_setlists()),
+            name="setlists",
+        )
+
+    if (registers := registers_task.result()) is not None:
+        freshness.mark_fresh(Source.REGISTERS)
     else:
-        async with CirclesAPI() as circles_client, SetlistAPI() as setlist_client:
-            mucken_listen_data = MuckenListenData(
-                polls={}, poll_votes={}, registers=await circles_client.aggregate_registers()
+        freshness.mark_stale(Source.REGISTERS)
+        fallback = freshness.fallback
+        registers = fallback.mucken_listen.registers if fallback else Registers(registers=[])
+    if (setlists := setlists_task.result()) is not None:
+        freshness.mark_fresh(Source.SETLISTS)
+    else:
+        freshness.mark_stale(Source.SETLISTS)
+    return registers, setlists
+
+
+def _unchanged_poll_votes(
+    vote_store_path: Path | None, polls: "Sequence[PollInfo]"
+) -> dict[int, "PollVotes"]:
+    """Read the votes of the polls that didn't change since the last crawl from the vote store,
+    see :meth:`~akalisten.store.VoteStore.unchanged_poll_votes`. Failures of the store are only
+    logged, the votes are fetched then.
+    """
+    if vote_store_path is None or not vote_store_path.exists():
+        return {}
+
+    import sqlite3
+
+    from .store import VoteStore
+
+    try:
+        with VoteStore(vote_store_path) as store:
+            poll_votes = store.unchanged_poll_votes(polls)
+    except (sqlite3.Error, RuntimeError):
+        _LOGGER.exception("Could not read the votes from %s", vote_store_path)
+        return {}
+    _LOGGER.info("Read the votes of %d of %d polls from the store", len(poll_votes), len(polls))
+    return poll_votes
+
+
+async def _crawl_polls(
+    context: ClientContext,
+    deadlines: SourceDeadlines,
+    freshness: _Freshness,
+    mucken_listen_data: MuckenListenData,
+    vote_store_path: Path | None = None,
+) -> list["PollInfo"]:
+    """Fetch the polls and the votes of the Muckenlisten. The Muckenlisten are stored in
+    :paramref:`mucken_listen_data`, the other active polls are returned. The votes of polls
+    that didn't change since the last crawl are read from the vote store at
+    :paramref:`vote_store_path`, if given.
+    """
+    from .clients.polls import PollAPI
+
+    # The requests for the individual polls are sent concurrently. The clients make sure that
+    # the server is not overloaded, see ClientContext.
+    async with PollAPI(context=context) as poll_client:
+        # The budget of the polls covers both the list and the share tokens
+        polls_start = asyncio.get_running_loop().time()
+        polls = await _with_deadline(
+            Source.POLLS, deadlines, poll_client.get_polls_info(), polls_start
+        )
+        if polls is None:
+            freshness.mark_stale(Source.POLLS)
+            freshness.mark_stale(Source.VOTES)
+            fallback = freshness.fallback
+            polls = [*fallback.mucken_listen.polls.values(), *fallback.polls] if fallback else []
+
+        stored_votes: dict[int, PollVotes] = {}
+        if Source.VOTES not in freshness.stale:
+            stored_votes = _unchanged_poll_votes(
+                vote_store_path, [poll for poll in polls if poll.is_active_mucken_liste]
             )
-            setlists = await setlist_client.get_setlists()
-
-        async with PollAPI() as poll_client:
-            other_polls: list[PollInfo] = []
-            for poll in await poll_client.get_polls_info():
-                if poll.is_active_mucken_liste:
-                    votes = await poll_client.aggregate_poll_votes(poll.id)
-                    mucken_listen_data.poll_votes[poll.id] = votes
-                    mucken_listen_data.polls[poll.id] = poll
-                    mucken_listen_data.polls[poll.id].register_setlist(setlists)
-                elif poll.is_active_poll:
-                    poll.public_tokens.update(await poll_client.get_public_share_token(poll.id))
-                    other_polls.append(poll)
-                else:
-                    continue
-
-        # Compute the members that have not voted yet
+
+        other_polls: list[PollInfo] = []
+        votes_tasks: dict[int, asyncio.Task[PollVotes]] = {}
+        tokens_tasks: dict[int, asyncio.Task[set[str]]] = {}
+        for poll in polls:
+            if poll.is_active_mucken_liste:
+                mucken_listen_data.polls[poll.id] = poll
+                if Source.VOTES not in freshness.stale and poll.id not in stored_votes:
+                    votes_tasks[poll.id] = asyncio.create_task(
+                        poll_client.aggregate_poll_votes(poll.id), name=f"poll {poll.id} votes"
+                    )
+            elif poll.is_active_poll:
+                other_polls.append(poll)
+                if Source.POLLS not in freshness.stale:
+                    tokens_tasks[poll.id] = asyncio.create_task(
+                        poll_client.get_public_share_token(poll.id), name=f"poll {poll.id} shares"
+                    )
+
+        async with asyncio.TaskGroup() as group:
+            votes_task = group.create_task(
+                _wait_with_deadline(Source.VOTES, deadlines, votes_tasks)
+            )
+            tokens_task = group.create_task(
+                _wait_with_deadline(Source.POLLS, deadlines, tokens_tasks, polls_start)
+            )
+
+    _collect_votes(mucken_listen_data, {**stored_votes, **votes_task.result()}, freshness)
+    _collect_tokens(other_polls, tokens_task.result(), freshness)
+    freshness.mark_fresh(Source.POLLS)
+    freshness.mark_fresh(Source.VOTES)
+    return other_polls
+
+
+def _collect_votes(
+    mucken_listen_data: MuckenListenData,
+    poll_votes: Mapping[int, "PollVotes"],
+    freshness: _Freshness,
+) -> None:
+    """Store the fetched votes. For polls whose votes could not be fetched, the votes of the
+    fallback are used. Polls without any votes are dropped.
+    """
+    fallback = freshness.fallback
+    for poll_id in list(mucken_listen_data.polls):
+        if (votes := poll_votes.get(poll_id)) is None:
+            freshness.mark_stale(Source.VOTES)
+            if (
+                fallback is None
+                or (votes := fallback.mucken_listen.poll_votes.get(poll_id)) is None
+            ):
+                _LOGGER.warning("No votes available for poll %s, skipping it", poll_id)
+                del mucken_listen_data.polls[poll_id]
+                continue
+        mucken_listen_data.poll_votes[poll_id] = votes
+
+
+def _collect_tokens(
+    polls: list["PollInfo"], tokens: Mapping[int, set[str]], freshness: _Freshness
+) -> None:
+    """Store the fetched share tokens. For polls whose tokens could not be fetched, the tokens of
+    the fallback are used.
+    """
+    fallback = freshness.fallback
+    fallback_tokens = {poll.id: poll.public_tokens for poll in fallback.polls} if fallback else {}
+    for poll in polls:
+        if (poll_tokens := tokens.get(poll.id)) is None:
+            freshness.mark_stale(Source.POLLS)
+            poll_tokens = fallback_tokens.get(poll.id, set())
+        poll.public_tokens.update(poll_tokens)
+
+
+def _register_setlists(
+    mucken_listen_data: MuckenListenData,
+    setlists: "Sequence[Setlist] | None",
+    freshness: _Freshness,
+) -> None:
+    """Attach the setlists to the Muckenlisten. If the setlists could not be fetched, the
+    setlists of the fallback are used."""
+    fallback = freshness.fallback
+    for poll in mucken_listen_data.polls.values():
+        if setlists is not None:
+            poll.register_setlist(setlists)
+        elif fallback and (fallback_poll := fallback.mucken_listen.polls.get(poll.id)):
+            poll.setlist = fallback_poll.setlist
+
+
+async def _crawl_forms(
+    context: ClientContext,
+    deadlines: SourceDeadlines,
+    freshness: _Freshness,
+    forms_cache_path: Path | None,
+) -> list["FormInfo"]:
+    from .clients.forms import FormsAPI
+
+    async with FormsAPI(context=context, cache_path=forms_cache_path) as forms_client:
+        forms = await _with_deadline(Source.FORMS, deadlines, forms_client.get_all_forms())
+    if forms is not None:
+        freshness.mark_fresh(Source.FORMS)
+    else:
+        freshness.mark_stale(Source.FORMS)
+        forms = freshness.fallback.forms if freshness.fallback else []
+    return [form for form in forms if form.is_active_public_form]
+
+
+@traced
+async def crawl(
+    context: ClientContext | None = None,
+    forms_cache_path: Path | None = None,
+    deadlines: SourceDeadlines | None = None,
+    fallback: TemplateData | None = None,
+    vote_store_path: Path | None = None,
+) -> TemplateData:
+    """Crawl the data of the polls, forms and circles from NextCloud. The local data, i.e. links,
+    lists and chat groups, is not included, see :func:`add_local_data`.
+
+    Each source is fetched within its deadline. For sources that miss their deadline or fail,
+    the data of :paramref:`fallback`, i.e. of an earlier crawl, is used and the source is marked
+    as stale in :attr:`TemplateData.stale`.
+
+    Args:
+        context: The client context shared by all requests.
+        forms_cache_path: The path of the cache for the full forms.
+        deadlines: The deadlines of the sources. Defaults to :class:`SourceDeadlines`.
+        fallback: The data of an earlier crawl.
+        vote_store_path: The path of the :class:`~akalisten.store.VoteStore` from which the
+            votes of the polls that didn't change since the last crawl are read.
+
+    Raises:
+        SourcesUnavailableError: If a source missed its deadline or failed and
+            :paramref:`fallback` has no data of it.
+    """
+    # The clients and their dependencies are only imported when actually crawling, which keeps
+    # the startup fast when rendering a snapshot. See the helper functions.
+    context = context or ClientContext()
+    deadlines = deadlines or SourceDeadlines()
+    freshness = _Freshness(fallback)
+
+    with profile_phase("crawl.registers"):
+        registers, setlists = await _crawl_registers_and_setlists(context, deadlines, freshness)
+    mucken_listen_data = MuckenListenData(polls={}, poll_votes={}, registers=registers)
+
+    with profile_phase("crawl.polls"):
+        other_polls = await _crawl_polls(
+            context, deadlines, freshness, mucken_listen_data, vote_store_path
+        )
+        _register_setlists(mucken_listen_data, setlists, freshness)
+
+    # Compute the members that have not voted yet
+    with profile_phase("crawl.sanitize"):
         for poll_votes in mucken_listen_data.poll_votes.values():
             poll_votes.add_register_users(mucken_listen_data.registers)
             # post-process the votes
             poll_votes.sanitize_votes()
 
-        async with FormsAPI() as forms_client:
-            forms = list(
-                filter(lambda f: f.is_active_public_form, await forms_client.get_all_forms())
-            )
+    with profile_phase("crawl.forms"):
+        forms = await _crawl_forms(context, deadlines, freshness, forms_cache_path)
 
-        template_data = TemplateData(
-            mucken_listen=mucken_listen_data, polls=other_polls, forms=forms, links=[]
-        )
+    _LOGGER.info("Crawl finished: %s", context.statistics)
+    if freshness.unavailable:
+        raise SourcesUnavailableError(freshness.unavailable)
+    if freshness.stale:
+        _LOGGER.warning("Stale data used for: %s", ", ".join(sorted(freshness.stale)))
+    return TemplateData(
+        mucken_listen=mucken_listen_data,
+        polls=other_polls,
+        forms=forms,
+        links=[],
+        fetched=freshness.fetched,
+        stale=freshness.stale,
+    )
 
-        if debug:
-            dummy_data_path.write_text(template_data.model_dump_json(indent=2), encoding="utf-8")
 
+def add_local_data(
+    template_data: TemplateData,
+    links_path: Path | str,
+    lists_path: Path | str,
+    chat_groups_path: Path | str,
+) -> TemplateData:
+    """Add the links, lists and chat groups maintained in the local data files."""
     template_data.links = get_links(links_path)
     template_data.lists = get_lists(lists_path)
     template_data.chat_groups = get_chat_groups(chat_groups_path)
     return template_data
+
+
+@traced
+async def get_template_data(  # noqa: PLR0913
+    debug: bool,
+    snapshot_path: Path,
+    links_path: Path | str,
+    lists_path: Path | str,
+    chat_groups_path: Path | str,
+    forms_cache_path: Path | None = None,
+    context: ClientContext | None = None,
+    deadlines: SourceDeadlines | None = None,
+    vote_store_path: Path | None = None,
+) -> TemplateData:
+    """Get all data for the templates. The crawled data is stored as snapshot, which serves as
+    fallback for the sources that can't be fetched by the next crawl, see :func:`crawl`. In
+    debug mode, the snapshot is reused instead of crawling again.
+    """
+    with profile_phase("snapshot.load"):
+        snapshot = load_snapshot(snapshot_path)
+    if debug and snapshot is not None:
+        template_data = snapshot
+    else:
+        template_data = await crawl(
+            context=context,
+            forms_cache_path=forms_cache_path,
+            deadlines=deadlines,
+            fallback=snapshot,
+            vote_store_path=vote_store_path,
+        )
+        with profile_phase("snapshot.save"):
+            save_snapshot(snapshot_path, template_data)
+
+    with profile_phase("local_data"):
+        return add_local_data(template_data, links_path, lists_path, chat_groups_path)
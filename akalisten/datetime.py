@@ -20,6 +20,15 @@ def date_str_to_aware_datetime(date_str: str) -> dtm.datetime:
     return dtm.datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=TZ_INFO)
 
 
+def _parse_datetime(value: str | int) -> str | int | None:
+    if value in [0, "0"]:
+        return None
+    return value
+
+
+OptionalDateTimeField = Annotated[AwareDatetime | None, BeforeValidator(_parse_datetime)]
+RequiredDateTimeField = Annotated[AwareDatetime, BeforeValidator(_parse_datetime)]
+
 AwareDate = Annotated[
     AwareDatetime,
     BeforeValidator(lambda v: date_str_to_aware_datetime(v) if isinstance(v, str) else v),
@@ -0,0 +1,371 @@
+"""Local stand-in for the OCS APIs of NextCloud that are used by the crawler.
+
+The server answers the endpoints of the polls, circles, forms and setlists apps from generated
+data (see :mod:`akalisten.synthetic`) or from a fixture file. Latency, jitter, server errors
+and rate limiting can be injected per endpoint, such that the concurrency, caching and retry
+behavior of the clients can be measured end-to-end and repeatably without touching production.
+
+Start the server and point the clients to it with the ``NC_BASE_URL`` environment variable::
+
+    python -m akalisten.fake_ocs --port 8080 --polls 40 --users 300 --faults faults.json
+    NC_BASE_URL=http://127.0.0.1:8080 python main.py crawl
+
+The faults are configured as JSON matching :class:`FaultSettings`, e.g.
+
+.. code-block:: json
+
+    {
+        "default": {"latency": 0.05, "jitter": 0.02},
+        "endpoints": {"poll/{id}/votes": {"latency": 0.5, "error_rate": 0.05}},
+        "seed": 42
+    }
+
+A fixture file is a JSON object mapping request targets relative to ``/ocs/v2.php/apps/``, with
+or without query, to the complete response bodies, e.g. ``"polls/api/v1.0/polls"`` or
+``"forms/api/v3/forms?type=owned"``.
+
+With ``--events``, the server additionally plays the part of the NextCloud webhooks and sends
+notifications for random polls and forms to a webhook receiver (see :mod:`akalisten.refresh`)::
+
+    NC_BASE_URL=http://127.0.0.1:8080 python main.py serve --port 8081
+    python -m akalisten.fake_ocs --port 8080 --events http://127.0.0.1:8081/webhook
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from pathlib import Path
+from typing import Any, ClassVar, Protocol
+from urllib.parse import parse_qsl, urlsplit
+
+from pydantic import BaseModel, Field
+
+from akalisten._http import HTTPRequest, HTTPResponse, HTTPServer, json_response
+from akalisten.clients._utils import endpoint_label
+from akalisten.refresh import RefreshEvent, RefreshKind
+from akalisten.synthetic import SyntheticData, SyntheticScale, ocs
+
+_LOGGER = logging.getLogger(__name__)
+
+OCS_PREFIX = "/ocs/v2.php/apps/"
+_APP_PREFIXES = (
+    "polls/api/v1.0/",
+    "circles/",
+    "forms/api/v3/",
+    "orchestrascoresmanager/",
+)  # fmt: skip
+
+
+class EndpointFaults(BaseModel):
+    """The faults injected into the responses of an endpoint."""
+
+    latency: float = 0
+    """Delay in seconds before the response is sent."""
+    jitter: float = 0
+    """Maximum deviation in seconds from :attr:`latency`, drawn uniformly."""
+    error_rate: float = 0
+    """Share of the requests that are answered with ``503 Service Unavailable``."""
+    rate_limit_rate: float = 0
+    """Share of the requests that are answered with ``429 Too Many Requests``."""
+    retry_after: int = 1
+    """Value of the ``Retry-After`` header of ``429`` responses in seconds."""
+
+
+class FaultSettings(BaseModel):
+    default: EndpointFaults = Field(default_factory=EndpointFaults)
+    endpoints: dict[str, EndpointFaults] = Field(default_factory=dict)
+    """Faults for specific endpoints, keyed by
+    :func:`~akalisten.clients._utils.endpoint_label`, e.g. ``poll/{id}/votes``."""
+    seed: int | None = None
+    """Seed for the random faults. Set it to get the same faults on every run."""
+
+    def for_endpoint(self, label: str) -> EndpointFaults:
+        return self.endpoints.get(label, self.default)
+
+
+class ResponseSource(Protocol):
+    def get(self, target: str, query: Mapping[str, str]) -> bytes | None:
+        """Get the response body for a request target relative to :data:`OCS_PREFIX`. Returns
+        :obj:`None` if the target is unknown.
+        """
+
+
+class SyntheticResponses:
+    """Answers the requests from :class:`~akalisten.synthetic.SyntheticData`. Encoded responses
+    are cached, such that the server spends as little time as possible per request.
+    """
+
+    def __init__(self, data: SyntheticData) -> None:
+        self._data = data
+        self._cache: dict[tuple[str, tuple[tuple[str, str], ...]], bytes | None] = {}
+        routes: dict[str, Callable[..., Any]] = {
+            r"polls/api/v1\.0/polls": lambda: {"polls": data.polls()},
+            r"polls/api/v1\.0/poll/(\d+)": lambda poll_id: self._poll(int(poll_id)),
+            r"polls/api/v1\.0/poll/(\d+)/options": lambda poll_id: {
+                "options": data.options(int(poll_id))
+            },
+            r"polls/api/v1\.0/poll/(\d+)/votes": lambda poll_id: {
+                "votes": data.votes(int(poll_id))
+            },
+            r"polls/api/v1\.0/poll/(\d+)/shares": lambda poll_id: {
+                "shares": data.shares(int(poll_id))
+            },
+            r"circles/circles": data.circles,
+            r"circles/circles/circle(\d+)": lambda index: self._circle(int(index)),
+            r"circles/circles/(circle\d+)/members": lambda circle_id: self._members(circle_id),
+            r"forms/api/v3/forms/(\d+)": lambda form_id: self._form(int(form_id)),
+            r"orchestrascoresmanager/setlists": data.setlists,
+        }
+        self._routes = [(re.compile(pattern), handler) for pattern, handler in routes.items()]
+
+    def _poll(self, poll_id: int) -> Any:
+        return self._data.poll(poll_id) if 0 < poll_id <= self._data.scale.polls else None
+
+    def _circle(self, index: int) -> Any:
+        return self._data.circle(index) if index < len(self._data.circles()) else None
+
+    def _members(self, circle_id: str) -> Any:
+        if self._circle(int(circle_id.removeprefix("circle"))) is None:
+            return None
+        return self._data.circle_members(circle_id)
+
+    def _form(self, form_id: int) -> Any:
+        return self._data.form(form_id) if 0 < form_id <= self._data.scale.forms else None
+
+    def _forms(self, query: Mapping[str, str]) -> Any:
+        forms = self._data.forms()
+        # Owned forms are also listed as shared, like for an admin account
+        if query.get("type") == "owned":
+            return [form for form in forms if form["id"] % 2 == 0]
+        return forms
+
+    def _build(self, target: str, query: Mapping[str, str]) -> Any:
+        if target == "forms/api/v3/forms":
+            return self._forms(query)
+        for pattern, handler in self._routes:
+            if match := pattern.fullmatch(target):
+                return handler(*match.groups())
+        return None
+
+    def get(self, target: str, query: Mapping[str, str]) -> bytes | None:
+        key = (target, tuple(sorted(query.items())))
+        if key not in self._cache:
+            data = self._build(target, query)
+            self._cache[key] = None if data is None else json.dumps(ocs(data)).encode()
+        return self._cache[key]
+
+
+class FixtureResponses:
+    """Answers the requests from a fixture file, see the module documentation."""
+
+    def __init__(self, path: Path) -> None:
+        fixtures: dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+        self._responses = {
+            target.strip("/"): json.dumps(body).encode() for target, body in fixtures.items()
+        }
+
+    def get(self, target: str, query: Mapping[str, str]) -> bytes | None:
+        if query:
+            query_string = "&".join(f"{key}={value}" for key, value in sorted(query.items()))
+            if (response := self._responses.get(f"{target}?{query_string}")) is not None:
+                return response
+        return self._responses.get(target)
+
+
+class FakeOCSServer(HTTPServer):
+    """Minimal HTTP/1.1 server with keep-alive support answering ``GET`` requests from a
+    :class:`ResponseSource`.
+
+    Example:
+        .. code-block:: python
+
+            data = SyntheticData(SyntheticScale(polls=40))
+            async with FakeOCSServer(SyntheticResponses(data)) as server:
+                os.environ["NC_BASE_URL"] = server.url
+                await crawl()
+
+    Args:
+        source: The source of the responses.
+        faults: The faults to inject.
+        host: The host to listen on.
+        port: The port to listen on. ``0`` selects a free port.
+    """
+
+    def __init__(
+        self,
+        source: ResponseSource,
+        faults: FaultSettings | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        super().__init__(host=host, port=port)
+        self.source = source
+        self.faults = faults or FaultSettings()
+        self.statistics: Counter[tuple[str, int]] = Counter()
+        """The number of responses per endpoint label and status code."""
+        self._random = random.Random(self.faults.seed)
+
+    async def handle(self, request: HTTPRequest) -> HTTPResponse:
+        url = urlsplit(request.target)
+        if not url.path.startswith(OCS_PREFIX):
+            return self._error(404, "unknown", "Not an OCS endpoint")
+        path = url.path.removeprefix(OCS_PREFIX).strip("/")
+        query = dict(parse_qsl(url.query))
+        query.pop("format", None)
+        label = self._label(path)
+
+        faults = self.faults.for_endpoint(label)
+        if delay := max(faults.latency + self._random.uniform(-1, 1) * faults.jitter, 0):
+            await asyncio.sleep(delay)
+
+        if request.method != "GET":
+            return self._error(405, label, "Only GET requests are supported")
+        if "authorization" not in request.headers:
+            return self._error(401, label, "Current user is not logged in")
+        if fault := self._inject_fault(faults, label):
+            return fault
+        if (body := self.source.get(path, query)) is None:
+            return self._error(404, label, f"Unknown endpoint {path}")
+
+        self.statistics[label, 200] += 1
+        return 200, {}, body
+
+    def _inject_fault(self, faults: EndpointFaults, label: str) -> HTTPResponse | None:
+        roll = self._random.random()
+        if roll < faults.rate_limit_rate:
+            return self._error(429, label, "Reached maximum delay", retry_after=faults.retry_after)
+        if roll < faults.rate_limit_rate + faults.error_rate:
+            return self._error(503, label, "Injected server error")
+        return None
+
+    def _error(
+        self, status: int, label: str, message: str, retry_after: int | None = None
+    ) -> HTTPResponse:
+        self.statistics[label, status] += 1
+        headers = {} if retry_after is None else {"Retry-After": str(retry_after)}
+        meta = {"status": "failure", "statuscode": status, "message": message}
+        return json_response(status, {"ocs": {"meta": meta, "data": []}}, headers)
+
+    @staticmethod
+    def _label(path: str) -> str:
+        """The endpoint label as used by the clients, i.e. relative to the base URL of the
+        app's client.
+        """
+        for prefix in _APP_PREFIXES:
+            if path.startswith(prefix):
+                return endpoint_label(path.removeprefix(prefix))
+        return endpoint_label(path)
+
+
+class FakeEventSource:
+    """Sends notifications like the NextCloud webhook listeners app to a
+    :class:`~akalisten.refresh.WebhookReceiver`.
+
+    Args:
+        url: The URL of the receiver, e.g. ``http://127.0.0.1:8081/webhook``.
+        secret: The secret expected by the receiver.
+    """
+
+    EVENT_CLASSES: ClassVar[Mapping[RefreshKind, str]] = {
+        RefreshKind.POLL: "OCA\\Polls\\Event\\VoteSetEvent",
+        RefreshKind.FORM: "OCA\\Forms\\Events\\FormSubmittedEvent",
+    }
+
+    def __init__(self, url: str, secret: str | None = None) -> None:
+        self.url = url
+        self._headers = {"Authorization": f"Bearer {secret}"} if secret else {}
+        self.statistics: Counter[int] = Counter()
+        """The number of responses per status code."""
+
+    @classmethod
+    def payload(cls, event: RefreshEvent) -> dict[str, Any]:
+        return {
+            "user": {"uid": "fake", "displayName": "Fake User"},
+            "time": int(time.time()),
+            "event": {"class": cls.EVENT_CLASSES[event.kind], event.kind.value: {"id": event.id}},
+        }
+
+    async def send(self, events: Iterable[RefreshEvent], interval: float = 0) -> None:
+        """Send the notifications for :paramref:`events`, waiting :paramref:`interval` seconds
+        between them.
+        """
+        import httpx
+
+        async with httpx.AsyncClient(headers=self._headers) as client:
+            for index, event in enumerate(events):
+                if index and interval:
+                    await asyncio.sleep(interval)
+                try:
+                    response = await client.post(self.url, json=self.payload(event))
+                except httpx.TransportError as exc:
+                    _LOGGER.warning("Sending notification to %s failed: %r", self.url, exc)
+                    continue
+                self.statistics[response.status_code] += 1
+
+
+def _random_events(scale: SyntheticScale) -> Iterator[RefreshEvent]:
+    """Events for random polls and forms of the synthetic data."""
+    rng = random.Random(scale.seed)
+    while True:
+        if rng.random() < scale.polls / (scale.polls + scale.forms):
+            yield RefreshEvent(kind=RefreshKind.POLL, id=rng.randint(1, scale.polls))
+        else:
+            yield RefreshEvent(kind=RefreshKind.FORM, id=rng.randint(1, scale.forms))
+
+
+async def _serve(
+    server: FakeOCSServer, events: FakeEventSource | None, scale: SyntheticScale, interval: float
+) -> None:
+    async with server, asyncio.TaskGroup() as group:
+        group.create_task(server.serve_forever())
+        if events is not None:
+            group.create_task(events.send(_random_events(scale), interval))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the NextCloud APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--faults", type=Path, help="JSON file with the fault settings.")
+    parser.add_argument(
+        "--fixtures", type=Path, help="JSON file with the responses. Overrides the generated data."
+    )
+    parser.add_argument(
+        "--events",
+        metavar="URL",
+        help="Send notifications for random polls and forms to the webhook receiver at URL, "
+        "e.g. http://127.0.0.1:8081/webhook.",
+    )
+    parser.add_argument(
+        "--event-interval",
+        type=float,
+        default=5,
+        help="Seconds between the notifications. Defaults to 5.",
+    )
+    parser.add_argument("--event-secret", help="The secret expected by the webhook receiver.")
+    SyntheticScale.add_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    synthetic_scale = SyntheticScale.from_args(args)
+    fake_server = FakeOCSServer(
+        source=FixtureResponses(args.fixtures)
+        if args.fixtures
+        else SyntheticResponses(SyntheticData(synthetic_scale)),
+        faults=FaultSettings.model_validate_json(args.faults.read_text(encoding="utf-8"))
+        if args.faults
+        else None,
+        host=args.host,
+        port=args.port,
+    )
+    try:
+        event_source = FakeEventSource(args.events, args.event_secret) if args.events else None
+        asyncio.run(_serve(fake_server, event_source, synthetic_scale, args.event_interval))
+    except KeyboardInterrupt:
+        _LOGGER.info("Responses per endpoint and status: %s", dict(fake_server.statistics))
@@ -0,0 +1,105 @@
+"""Versioned feed of the changes of the Muckenlisten, such that open pages can update themselves
+without being reloaded.
+
+On each render, a hash of the votes of each shown Muckenliste is compared with the hashes in the
+previous feed. If any Muckenliste changed or was removed, the version of the feed is incremented
+and a :class:`FeedChange` with the votes of the changed Muckenlisten is added. The pages know the
+version they were rendered with and poll the feed for newer changes. Only the last
+:data:`MAX_CHANGES` changes are kept, pages that are further behind reload instead.
+
+The versions are only comparable within a feed. If the previous feed is lost, a new one with a
+new :attr:`Feed.epoch` is started and pages of the old feed reload as well.
+"""
+
+import hashlib
+import json
+import logging
+import secrets
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel, Field, ValidationError
+
+from akalisten.models.template import MuckenListenData
+from akalisten.render import compact_mucken_listen
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_CHANGES = 20
+
+
+class FeedChange(BaseModel):
+    """The changes from the previous version to :attr:`version`. :attr:`users` and
+    :attr:`polls` are in the format of :func:`~akalisten.render.compact_mucken_listen`.
+    """
+
+    version: int
+    users: list[tuple[str, str]]
+    polls: dict[int, list[list[Any]]]
+    removed: list[int] = Field(default_factory=list)
+    """The IDs of the Muckenlisten that are no longer shown."""
+
+
+class Feed(BaseModel):
+    epoch: str = Field(default_factory=lambda: secrets.token_hex(8))
+    """Random ID of the feed, which distinguishes its versions from those of earlier feeds."""
+    version: int = 0
+    hashes: dict[int, str] = Field(default_factory=dict)
+    """The hashes of the votes of the shown Muckenlisten, keyed by poll ID."""
+    changes: list[FeedChange] = Field(default_factory=list)
+
+    @staticmethod
+    def _subset(mucken_listen: MuckenListenData, poll_ids: list[int]) -> dict[str, Any]:
+        return compact_mucken_listen(
+            mucken_listen.model_copy(
+                update={"polls": {poll_id: mucken_listen.polls[poll_id] for poll_id in poll_ids}}
+            )
+        )
+
+    def next(self, mucken_listen: MuckenListenData) -> "Feed":
+        """The feed for the current data. Returns this feed if nothing changed."""
+        hashes = {
+            poll_id: hashlib.blake2b(
+                json.dumps(self._subset(mucken_listen, [poll_id])).encode(), digest_size=8
+            ).hexdigest()
+            for poll_id in mucken_listen.polls
+        }
+        changed = [
+            poll_id for poll_id, digest in hashes.items() if self.hashes.get(poll_id) != digest
+        ]
+        removed = [poll_id for poll_id in self.hashes if poll_id not in hashes]
+        if not changed and not removed:
+            return self
+
+        compact = self._subset(mucken_listen, changed)
+        change = FeedChange(
+            version=self.version + 1,
+            users=compact["users"],
+            polls=compact["polls"],
+            removed=removed,
+        )
+        _LOGGER.info(
+            "Feed version %d: %d changed and %d removed Muckenlisten",
+            change.version,
+            len(changed),
+            len(removed),
+        )
+        return Feed(
+            epoch=self.epoch,
+            version=change.version,
+            hashes=hashes,
+            changes=[*self.changes, change][-MAX_CHANGES:],
+        )
+
+
+def load_feed(path: Path) -> Feed:
+    """Load the feed written by the previous render. Starts a new feed with a new epoch if there
+    is none.
+    """
+    try:
+        return Feed.model_validate_json(path.read_bytes())
+    except FileNotFoundError:
+        return Feed()
+    except ValidationError:
+        _LOGGER.warning("Ignoring the invalid feed at %s", path)
+        return Feed()
@@ -0,0 +1,57 @@
+"""Inline SVG icons from the vendored `Bootstrap Icons <https://icons.getbootstrap.com/>`_.
+
+The templates render icons with :func:`icon`, which references a symbol by its ID instead of
+using the webfont of Bootstrap Icons. After rendering, :func:`inline_icon_sprite` inserts a sprite
+with only the symbols of the icons used by the page. Thus, neither the browser nor the rendering
+needs to request the icons.
+"""
+
+import functools
+import logging
+import re
+from pathlib import Path
+
+_LOGGER = logging.getLogger(__name__)
+
+ICON_SET_PATH = Path(__file__).parent / "template" / "icons" / "bootstrap-icons1.11.3.svg"
+"""The sprite of all icons, as published by Bootstrap Icons."""
+ICON_SPRITE_PLACEHOLDER = "<!-- icon sprite -->"
+"""Replaced by :func:`inline_icon_sprite` with the sprite of the icons used by the page."""
+
+_SYMBOL = re.compile(r'<symbol\b[^>]*\bid="([^"]+)"[^>]*>(.*?)</symbol>', re.DOTALL)
+# Also matches the class names in the scripts, e.g. of the icons of the theme switcher
+_ICON_NAME = re.compile(r"\bbi-([a-z0-9]+(?:-[a-z0-9]+)*)")
+
+
+@functools.cache
+def icon_set() -> dict[str, str]:
+    """The content of the symbols of all icons, keyed by the icon name."""
+    return dict(_SYMBOL.findall(ICON_SET_PATH.read_text(encoding="utf-8")))
+
+
+def icon(name: str, classes: str = "") -> str:
+    """Render an icon, e.g. ``{{ icon('calendar-week', 'me-2') }}`` in a template.
+
+    Args:
+        name: The name of the icon, as listed on https://icons.getbootstrap.com/.
+        classes: Additional CSS classes of the icon.
+    """
+    if name not in icon_set():
+        _LOGGER.warning("Unknown icon %r", name)
+    return (
+        f'<svg class="bi bi-{name}{" " if classes else ""}{classes}" aria-hidden="true">'
+        f'<use href="#bi-{name}"/></svg>'
+    )
+
+
+def inline_icon_sprite(page: str) -> str:
+    """Replace :data:`ICON_SPRITE_PLACEHOLDER` with a hidden sprite of the icons used by the
+    page.
+    """
+    icons = icon_set()
+    names = sorted({name for name in _ICON_NAME.findall(page) if name in icons})
+    symbols = "".join(
+        f'<symbol id="bi-{name}" viewBox="0 0 16 16">{icons[name]}</symbol>' for name in names
+    )
+    sprite = f'<svg xmlns="http://www.w3.org/2000/svg" style="display: none;">{symbols}</svg>'
+    return page.replace(ICON_SPRITE_PLACEHOLDER, sprite, 1)
@@ -1,10 +1,12 @@
+import functools
 import re
+from typing import TYPE_CHECKING
 
-import bleach
-import markdown
+if TYPE_CHECKING:
+    import bleach
 
 # Keep the allowlist small but support common markdown output.
-_ALLOWED_TAGS = set(bleach.sanitizer.ALLOWED_TAGS) | {
+_EXTRA_TAGS = {
     "p",
     "br",
     "hr",
@@ -27,11 +29,23 @@ _ALLOWED_TAGS = set(bleach.sanitizer.ALLOWED_TAGS) | {
     "th",
     "td",
 }
-_ALLOWED_ATTRIBUTES: dict[str, list[str]] = {
-    **{key: list(value) for key, value in bleach.sanitizer.ALLOWED_ATTRIBUTES.items()},
-    "a": ["href", "title"],
-}
-_ALLOWED_PROTOCOLS = set(bleach.sanitizer.ALLOWED_PROTOCOLS) | {"mailto"}
+
+
+@functools.cache
+def _get_cleaner() -> "bleach.Cleaner":
+    # bleach and markdown are imported on first use, as they are slow to import and not needed
+    # e.g. for crawling only
+    import bleach
+
+    return bleach.Cleaner(
+        tags=set(bleach.sanitizer.ALLOWED_TAGS) | _EXTRA_TAGS,
+        attributes={
+            **{key: list(value) for key, value in bleach.sanitizer.ALLOWED_ATTRIBUTES.items()},
+            "a": ["href", "title"],
+        },
+        protocols=set(bleach.sanitizer.ALLOWED_PROTOCOLS) | {"mailto"},
+        strip=True,
+    )
 
 
 _HEADING_TAG_PATTERN = re.compile(r"<(/?)h([1-6])(\b[^>]*)>", flags=re.IGNORECASE)
@@ -51,17 +65,16 @@ def _downgrade_headings(html_text: str) -> str:
     return _HEADING_TAG_PATTERN.sub(_replace, html_text)
 
 
+@functools.lru_cache(maxsize=1024)
 def render_markdown(markdown_text: str | None) -> str:
-    """Render markdown text to sanitized HTML."""
+    """Render markdown text to sanitized HTML. The results are cached, as the same texts are
+    rendered for every page.
+    """
     if not markdown_text:
         return ""
 
+    import markdown
+
     rendered = markdown.markdown(markdown_text, extensions=["extra", "sane_lists", "nl2br"])
     rendered = _downgrade_headings(rendered)
-    return bleach.clean(
-        rendered,
-        tags=_ALLOWED_TAGS,
-        attributes=_ALLOWED_ATTRIBUTES,
-        protocols=_ALLOWED_PROTOCOLS,
-        strip=True,
-    )
+    return _get_cleaner().clean(rendered)
@@ -4,11 +4,17 @@ import html
 from pydantic import BaseModel
 
 from akalisten.markdown import render_markdown
-from akalisten.models.raw_api_models.forms import FormState, FullForm, Permission, ShareType
+from akalisten.models.raw_api_models.forms import (
+    CondensedForm,
+    FormProjection,
+    FormState,
+    Permission,
+    ShareType,
+)
 
 
 class FormInfo(BaseModel):
-    form: FullForm
+    form: FormProjection
 
     @property
     def id(self) -> int:
@@ -54,11 +60,17 @@ class FormInfo(BaseModel):
             return None
         return f"https://cloud.akablas.de/apps/forms/embed/{hash_value}"
 
+    @staticmethod
+    def is_open_form(form: CondensedForm) -> bool:
+        """Whether the form is active and not expired. This only needs the condensed data and
+        can hence be used to decide whether fetching the full form is worth it at all."""
+        if form.state != FormState.ACTIVE:
+            return False
+        return not ((date := form.expires) and date < dtm.datetime.now(dtm.UTC))
+
     @property
     def is_active_public_form(self) -> bool:
-        if self.form.state != FormState.ACTIVE:
-            return False
-        if (date := self.form.expires) and date < dtm.datetime.now(dtm.UTC):
+        if not self.is_open_form(self.form):
             return False
         if (access := self.form.access) and access.permitAllUsers:
             return True
@@ -1,7 +1,34 @@
 import html
 import re
+from typing import Annotated, Any, TypeVar
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    SerializationInfo,
+    SerializerFunctionWrapHandler,
+    WrapSerializer,
+)
+
+_T = TypeVar("_T")
+
+STABLE_ORDER = "stable_order"
+"""Key of the serialization context that makes :data:`StableSet` fields serialize sorted."""
+
+
+def _serialize_set(
+    values: set[Any], handler: SerializerFunctionWrapHandler, info: SerializationInfo
+) -> Any:
+    serialized = handler(values)
+    if info.context and info.context.get(STABLE_ORDER):
+        return sorted(serialized, key=repr)
+    return serialized
+
+
+StableSet = Annotated[set[_T], WrapSerializer(_serialize_set, when_used="json")]
+"""A set that is serialized in sorted order if :data:`STABLE_ORDER` is set in the serialization
+context, e.g. to hash the serialized data. Otherwise, the order depends on the hashes of the
+elements, which differ between processes for strings."""
 
 
 class User(BaseModel):
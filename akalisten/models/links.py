@@ -10,7 +10,7 @@ class Link(BaseModel):
     display_title: str
     basic_url: AnyUrl | None = None
     login_url: AnyUrl | None = None
-    icon: str = "external-link"
+    icon: str = "box-arrow-up-right"
     description: str | None = None
 
     @model_validator(mode="after")
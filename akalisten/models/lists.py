@@ -1,9 +1,10 @@
+import datetime as dtm
 import html
 from typing import Self
 
 from pydantic import AnyUrl, BaseModel, Field, RootModel, model_validator
 
-from ..datetime import AwareDate
+from ..datetime import TZ_INFO, AwareDate
 
 
 class List(BaseModel):
@@ -32,3 +33,10 @@ class List(BaseModel):
 
 class Lists(RootModel):
     root: list[List] = Field(default_factory=list)
+
+    @property
+    def active_lists(self) -> list[List]:
+        now = dtm.datetime.now(tz=TZ_INFO)
+        return [
+            list_ for list_ in self.root if list_.expire_date is None or list_.expire_date >= now
+        ]
@@ -5,13 +5,16 @@ import re
 from collections.abc import Collection, Sequence
 from typing import Literal
 
-from dateutil.parser import ParserError, parse
 from pydantic import BaseModel, Field
 
 from akalisten.datetime import TZ_INFO
 from akalisten.markdown import render_markdown
-from akalisten.models.general import User
-from akalisten.models.raw_api_models.polls import Poll, PollOption, PollVote
+from akalisten.models.general import StableSet, User
+from akalisten.models.raw_api_models.polls import (
+    PollOptionProjection,
+    PollProjection,
+    PollVoteProjection,
+)
 from akalisten.models.register import Registers
 from akalisten.models.setlists import Setlist
 
@@ -74,6 +77,9 @@ class MuckenInfo(BaseModel):
         with contextlib.suppress(ValueError):
             return dtm.datetime.strptime(time_string, "%H.%M").replace(tzinfo=TZ_INFO)
 
+        # dateutil is slow to import and only needed for unusual formats
+        from dateutil.parser import ParserError, parse
+
         with contextlib.suppress(ParserError):
             return parse(time_string, dayfirst=True)
         return None
@@ -147,8 +153,8 @@ class MuckenInfo(BaseModel):
 
 
 class PollInfo(BaseModel):
-    poll: Poll
-    public_tokens: set[str] = Field(default_factory=set)
+    poll: PollProjection
+    public_tokens: StableSet[str] = Field(default_factory=set)
     setlist: Setlist | None = None
     _mucken_info: MuckenInfo | Literal["not-computed"] = "not-computed"
 
@@ -178,6 +184,21 @@ class PollInfo(BaseModel):
     def expire_date(self) -> dtm.datetime | None:
         return self.poll.configuration.expire
 
+    @property
+    def mucken_liste_expiry(self) -> dtm.datetime | None:
+        """The time from which the poll is no longer an active Muckenliste, since the date of the
+        Mucke has passed. See :attr:`is_active_mucken_liste`."""
+        if not (date := self.mucken_info.date):
+            return None
+        return dtm.datetime.combine(date + dtm.timedelta(days=1), dtm.time(), tzinfo=TZ_INFO)
+
+    @property
+    def poll_expiry(self) -> dtm.datetime:
+        """The time from which the poll is no longer an active poll. See :attr:`is_active_poll`."""
+        return dtm.datetime.combine(
+            self.poll.status.relevantThreshold.date(), dtm.time(), tzinfo=TZ_INFO
+        )
+
     @property
     def is_active_mucken_liste(self) -> bool:
         if self.poll.status.deleted:
@@ -239,10 +260,10 @@ class PollOptionVotes(BaseModel):
     poll_id: int
     id: int
     text: str
-    yes: set[User] = Field(default_factory=set)
-    no: set[User] = Field(default_factory=set)
-    maybe: set[User] = Field(default_factory=set)
-    not_voted: set[User] = Field(default_factory=set)
+    yes: StableSet[User] = Field(default_factory=set)
+    no: StableSet[User] = Field(default_factory=set)
+    maybe: StableSet[User] = Field(default_factory=set)
+    not_voted: StableSet[User] = Field(default_factory=set)
     _sanitized_no: set[User] | None = None
     _sanitized_not_voted: set[User] | None = None
 
@@ -280,13 +301,21 @@ class PollOptionVotes(BaseModel):
             poll_user_answer.user for poll_user_answer in user_answers
         }
 
+    def restore_sanitized(self, no_ids: Collection[str], not_voted_ids: Collection[str]) -> None:
+        """Restore the results of :meth:`sanitize_nos` and :meth:`sanitize_not_voted` from the
+        IDs of the users in :attr:`sanitized_no` and :attr:`sanitized_not_voted`, e.g. when
+        loading a snapshot.
+        """
+        self._sanitized_no = {user for user in self.no if user.id in no_ids}
+        self._sanitized_not_voted = {user for user in self.not_voted if user.id in not_voted_ids}
+
     def add_register_users(self, register_users: Collection[User]) -> None:
         """Add all users that to the :attr:`not_voted` set that are not yet in the
         :attr:`yes`, :attr:`no`, or :attr:`maybe` sets.
         """
         self.not_voted.update(set(register_users) - self.yes - self.no - self.maybe)
 
-    def add_vote(self, vote: PollVote) -> None:
+    def add_vote(self, vote: PollVoteProjection) -> None:
         """Add a vote to the option. Also removes the user from the :attr:`not_voted` set."""
         user = User(name=vote.user.displayName, id=vote.user.id)
 
@@ -337,11 +366,11 @@ class PollOptionVotes(BaseModel):
 class PollUserAnswers(BaseModel):
     poll_id: int
     user: User
-    yes: set[str] = Field(default_factory=set)
-    no: set[str] = Field(default_factory=set)
-    maybe: set[str] = Field(default_factory=set)
+    yes: StableSet[str] = Field(default_factory=set)
+    no: StableSet[str] = Field(default_factory=set)
+    maybe: StableSet[str] = Field(default_factory=set)
 
-    def add_answer(self, poll_vote: PollVote) -> None:
+    def add_answer(self, poll_vote: PollVoteProjection) -> None:
         if poll_vote.answer == "yes":
             self.yes.add(poll_vote.optionText)
         elif poll_vote.answer == "no":
@@ -363,14 +392,14 @@ class PollVotes(BaseModel):
     def _get_user_answers(self, user: User) -> PollUserAnswers:
         return self.users.setdefault(user.id, PollUserAnswers(poll_id=self.poll_id, user=user))
 
-    def add_vote(self, vote: PollVote) -> None:
+    def add_vote(self, vote: PollVoteProjection) -> None:
         option = self._get_option_votes(vote.optionText, vote.optionId)
         option.add_vote(vote)
 
         user = self._get_user_answers(User(name=vote.user.displayName, id=vote.user.id))
         user.add_answer(vote)
 
-    def add_option(self, poll_option: PollOption) -> None:
+    def add_option(self, poll_option: PollOptionProjection) -> None:
         self._get_option_votes(poll_option.text, poll_option.id)
 
     def sanitize_votes(self) -> None:
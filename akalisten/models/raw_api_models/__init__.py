@@ -1,4 +1,11 @@
 """This module contains pydantic models used to represent and process data retrieved from
 the different APIs. The types are exact representations of the data returned by the APIs (as far
 as that's possible based on the sometimes scarce documentation).
+
+For the large or deeply nested payloads, there are additionally lean ``*Projection`` models that
+contain only the fields that are actually used when crawling. The full models subclass these
+projections, such that consumers can accept either. Validating into the projections skips the
+unused subtrees entirely, which saves a lot of parsing time and memory. The full models are
+still useful for debugging and are used when ``strict_models`` is enabled in the
+:class:`~akalisten.clients._context.ClientContext`.
 """
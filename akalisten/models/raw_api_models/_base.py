@@ -0,0 +1,11 @@
+from pydantic import BaseModel, ConfigDict
+
+
+class RawAPIModel(BaseModel):
+    """Base class for all raw API models.
+
+    Building the validation schema of a model is deferred until it is first used. Most of the
+    full models are only used with ``strict_models`` and thus don't slow down the startup.
+    """
+
+    model_config = ConfigDict(defer_build=True)
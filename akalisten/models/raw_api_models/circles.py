@@ -8,9 +8,8 @@ NOTE: Everything is reverse-engineered from the API responses.
 
 from enum import IntEnum, StrEnum
 
-from pydantic import BaseModel
-
-from akalisten.clients._utils import OptionalDateTimeField, RequiredDateTimeField
+from akalisten.datetime import OptionalDateTimeField, RequiredDateTimeField
+from akalisten.models.raw_api_models._base import RawAPIModel
 
 # ==============================
 # Enums
@@ -60,7 +59,7 @@ class CircleSource(IntEnum):
 # ==============================
 
 
-class Inheritance(BaseModel):
+class Inheritance(RawAPIModel):
     circleConfig: int
     circleId: str
     inheritanceDepth: int
@@ -71,7 +70,7 @@ class Inheritance(BaseModel):
     singleId: str
 
 
-class InheritedBy(BaseModel):
+class InheritedBy(RawAPIModel):
     displayName: str
     id: str
     inheritance: Inheritance
@@ -80,11 +79,14 @@ class InheritedBy(BaseModel):
     userType: UserType
 
 
-class BasedOn(BaseModel):
+class BasedOnProjection(RawAPIModel):
+    displayName: str
+
+
+class BasedOn(BasedOnProjection):
     config: int
     creation: OptionalDateTimeField
     description: str
-    displayName: str
     id: str
     initiator: dict | None = None
     name: str
@@ -94,7 +96,7 @@ class BasedOn(BaseModel):
     url: str
 
 
-class InvitedBy(BaseModel):
+class InvitedBy(RawAPIModel):
     basedOn: BasedOn
     displayName: str
     id: str
@@ -103,11 +105,11 @@ class InvitedBy(BaseModel):
     userType: UserType
 
 
-class Notes(BaseModel):
+class Notes(RawAPIModel):
     invitedBy: InvitedBy
 
 
-class Member(BaseModel):
+class Member(RawAPIModel):
     basedOn: BasedOn | None = None
     circleId: str
     contactId: str
@@ -128,19 +130,22 @@ class Member(BaseModel):
     userType: UserType
 
 
-class Settings(BaseModel):
+class Settings(RawAPIModel):
     population: int
     populationInherited: int
 
 
-class Circle(BaseModel):
+class CircleProjection(RawAPIModel):
+    id: str
+    name: str
+
+
+class Circle(CircleProjection):
     config: int
     creation: RequiredDateTimeField
     description: str
     displayName: str
-    id: str
     initiator: Member
-    name: str
     owner: Member
     population: int
     sanitizedName: str
@@ -149,7 +154,15 @@ class Circle(BaseModel):
     url: str
 
 
-class CircleMember(BaseModel):
+class CircleMemberProjection(RawAPIModel):
+    basedOn: BasedOnProjection
+    level: MemberLevel
+    status: MemberStatus
+    userId: str
+    userType: UserType
+
+
+class CircleMember(CircleMemberProjection):
     basedOn: BasedOn
     circle: Circle | None = None
     circleId: str
@@ -160,10 +173,6 @@ class CircleMember(BaseModel):
     instance: str
     invitedBy: InvitedBy
     joined: RequiredDateTimeField
-    level: MemberLevel
     local: bool
     notes: Notes
     singleId: str
-    status: MemberStatus
-    userId: str
-    userType: UserType
@@ -6,9 +6,10 @@ https://github.com/nextcloud/forms/blob/v4.3.4/docs/API_v3.md
 from enum import IntEnum, StrEnum
 from typing import Annotated
 
-from pydantic import BaseModel, BeforeValidator, Field
+from pydantic import BeforeValidator, Field
 
-from akalisten.clients._utils import OptionalDateTimeField, RequiredDateTimeField
+from akalisten.datetime import OptionalDateTimeField, RequiredDateTimeField
+from akalisten.models.raw_api_models._base import RawAPIModel
 
 
 class FormState(IntEnum):
@@ -23,7 +24,7 @@ class ShareType(IntEnum):
     LINK = 3
 
 
-class AccessObject(BaseModel):
+class AccessObject(RawAPIModel):
     permitAllUsers: bool = False
     showToAllUsers: bool = False
 
@@ -36,13 +37,13 @@ class Permission(StrEnum):
     EMBED = "embed"
 
 
-class Option(BaseModel):
+class Option(RawAPIModel):
     id: int
     questionId: int
     text: str
 
 
-class ExtraSettings(BaseModel):
+class ExtraSettings(RawAPIModel):
     allowOtherAnswer: bool | None = False
     shuffleOptions: bool | None = False
     optionsLimitMax: int | None = None
@@ -61,7 +62,7 @@ def _parse_extra_settings(value: object) -> object:
     return value
 
 
-class Question(BaseModel):
+class Question(RawAPIModel):
     id: int
     formId: int
     order: int
@@ -73,7 +74,7 @@ class Question(BaseModel):
     extraSettings: Annotated[ExtraSettings | None, BeforeValidator(_parse_extra_settings)] = None
 
 
-class Share(BaseModel):
+class Share(RawAPIModel):
     id: int
     formId: int
     shareType: ShareType
@@ -81,14 +82,14 @@ class Share(BaseModel):
     displayName: str
 
 
-class Answer(BaseModel):
+class Answer(RawAPIModel):
     id: int
     submissionId: int
     questionId: int
     text: str
 
 
-class Submission(BaseModel):
+class Submission(RawAPIModel):
     id: int
     formId: int
     userId: str
@@ -97,7 +98,7 @@ class Submission(BaseModel):
     userDisplayName: str
 
 
-class CondensedForm(BaseModel):
+class CondensedForm(RawAPIModel):
     id: int
     hash: str
     title: str
@@ -105,18 +106,22 @@ class CondensedForm(BaseModel):
     permissions: list[Permission]
     partial: bool | None = None
     state: FormState
+    lastUpdated: OptionalDateTimeField = None
 
 
-class FullForm(CondensedForm):
+class FormProjection(CondensedForm):
     description: str
+    access: AccessObject | None = None
+    shares: list[Share] = Field(default_factory=list)
+
+
+class FullForm(FormProjection):
     ownerId: str
     submissionMessage: str | None = None
     created: RequiredDateTimeField
-    access: AccessObject | None = None
     isAnonymous: bool
     submitMultiple: bool
     showExpiration: bool
     canSubmit: bool
     questions: list[Question] = Field(default_factory=list)
-    shares: list[Share] = Field(default_factory=list)
     submissions: list[Submission] = Field(default_factory=list)
@@ -5,12 +5,13 @@ https://github.com/nextcloud/polls/blob/346f37964c53bb6cc132edbb1f113642d2bb2c39
 
 from typing import Annotated
 
-from pydantic import BaseModel, BeforeValidator, HttpUrl
+from pydantic import BeforeValidator, HttpUrl
 
-from akalisten.clients._utils import OptionalDateTimeField, RequiredDateTimeField
+from akalisten.datetime import OptionalDateTimeField, RequiredDateTimeField
+from akalisten.models.raw_api_models._base import RawAPIModel
 
 
-class PollConfiguration(BaseModel):
+class PollConfiguration(RawAPIModel):
     title: str
     description: str
     access: str
@@ -27,7 +28,7 @@ class PollConfiguration(BaseModel):
     maxVotesPerOption: int
 
 
-class PollOwner(BaseModel):
+class PollOwner(RawAPIModel):
     userId: str
     displayName: str
     emailAddress: str
@@ -48,7 +49,7 @@ class PollOwner(BaseModel):
     )
 
 
-class PollStatus(BaseModel):
+class PollStatus(RawAPIModel):
     lastInteraction: OptionalDateTimeField
     created: RequiredDateTimeField
     deleted: bool | None = None
@@ -56,7 +57,7 @@ class PollStatus(BaseModel):
     relevantThreshold: RequiredDateTimeField
 
 
-class PollCurrentUserStatus(BaseModel):
+class PollCurrentUserStatus(RawAPIModel):
     userRole: str
     isLocked: bool
     isLoggedIn: bool
@@ -70,7 +71,7 @@ class PollCurrentUserStatus(BaseModel):
     groupInvitations: dict[str, str] | list[str]
 
 
-class PollPermissions(BaseModel):
+class PollPermissions(RawAPIModel):
     addOptions: bool
     archive: bool
     comment: bool
@@ -83,13 +84,16 @@ class PollPermissions(BaseModel):
     vote: bool
 
 
-class Poll(BaseModel):
+class PollProjection(RawAPIModel):
     id: int
     type: str
     descriptionSafe: str
     configuration: PollConfiguration
-    owner: PollOwner
     status: PollStatus
+
+
+class Poll(PollProjection):
+    owner: PollOwner
     currentUserStatus: PollCurrentUserStatus
     permissions: PollPermissions
 
@@ -97,26 +101,33 @@ class Poll(BaseModel):
 # The below classes are reverse engineered from the JSON response of the polls API
 
 
-class PollVoteUser(BaseModel):
+class PollVoteUserProjection(RawAPIModel):
     displayName: str
-    emailAddress: str
     id: str
+
+
+class PollVoteUser(PollVoteUserProjection):
+    emailAddress: str
     isNoUser: bool
     type: str
     userId: str
 
 
-class PollVote(BaseModel):
+class PollVoteProjection(RawAPIModel):
     answer: str
-    deleted: OptionalDateTimeField
-    id: int
     optionId: int
     optionText: str
+    user: PollVoteUserProjection
+
+
+class PollVote(PollVoteProjection):
+    deleted: OptionalDateTimeField
+    id: int
     pollId: int
     user: PollVoteUser
 
 
-class PollOptionOwner(BaseModel):
+class PollOptionOwner(RawAPIModel):
     displayName: str | None = None
     emailAddress: str | None = None
     id: str | None = None
@@ -125,7 +136,7 @@ class PollOptionOwner(BaseModel):
     userID: str | None = None
 
 
-class PollOptionVotes(BaseModel):
+class PollOptionVotes(RawAPIModel):
     count: int
     currentUser: str | None = None
     maybe: int
@@ -133,25 +144,31 @@ class PollOptionVotes(BaseModel):
     yes: int
 
 
-class PollOption(BaseModel):
+class PollOptionProjection(RawAPIModel):
+    id: int
+    text: str
+
+
+class PollOption(PollOptionProjection):
     confirmed: int
     deleted: int
     duration: int
     hash: str
-    id: int
     locked: bool
     order: int
     owner: PollOptionOwner | None = None
     pollId: int
-    text: str
     timestamp: OptionalDateTimeField
     votes: PollOptionVotes
 
 
-class PollShare(BaseModel):
+class PollShareProjection(RawAPIModel):
     type: str
-    id: int
     token: str
+
+
+class PollShare(PollShareProjection):
+    id: int
     pollId: int
     userId: str | None = None
     emailAddress: str | None = None
@@ -2,13 +2,13 @@ import html
 
 from pydantic import BaseModel
 
-from akalisten.models.general import User
+from akalisten.models.general import StableSet, User
 
 
 class RegisterCircle(BaseModel):
     name: str
     id: str
-    members: set[User]
+    members: StableSet[User]
 
     @property
     def display_name(self) -> str:
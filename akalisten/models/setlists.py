@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 
-from akalisten.clients._utils import OptionalDateTimeField
+from akalisten.datetime import OptionalDateTimeField
 
 
 class Setlist(BaseModel):
@@ -0,0 +1,112 @@
+import datetime as dtm
+from collections.abc import Iterator
+from enum import StrEnum
+
+from pydantic import AwareDatetime, BaseModel, Field
+
+from akalisten.models.chatgroups import ChatGroup, ChatGroups
+from akalisten.models.forms import FormInfo
+from akalisten.models.general import StableSet
+from akalisten.models.links import Link
+from akalisten.models.lists import List, Lists
+from akalisten.models.polls import PollInfo, PollVotes
+from akalisten.models.register import Registers
+
+
+class Source(StrEnum):
+    """The sources of the crawled data. Each source has its own deadline, see
+    :class:`akalisten.crawl.SourceDeadlines`.
+    """
+
+    REGISTERS = "registers"
+    SETLISTS = "setlists"
+    POLLS = "polls"
+    VOTES = "votes"
+    FORMS = "forms"
+
+
+class MuckenListenData(BaseModel):
+    polls: dict[int, PollInfo]
+    poll_votes: dict[int, PollVotes]
+    registers: Registers
+
+
+class StaleNotice(BaseModel):
+    sources: list[Source]
+    since: AwareDatetime | None
+    """The oldest time at which the data of the sources was fetched successfully. :obj:`None`
+    if that is unknown or if no data was available at all."""
+
+
+class TemplateData(BaseModel):
+    mucken_listen: MuckenListenData
+    polls: list[PollInfo]
+    forms: list[FormInfo]
+    links: list[Link] = Field(default_factory=list)
+    lists: list[List] = Field(default_factory=list)
+    chat_groups: list[ChatGroup] = Field(default_factory=list)
+    fetched: dict[Source, AwareDatetime] = Field(default_factory=dict)
+    """The time at which the data of each source was last fetched successfully."""
+    stale: StableSet[Source] = Field(default_factory=set)
+    """The sources that could not be fetched in the last crawl and whose data was taken from an
+    earlier crawl instead."""
+
+    def stale_notice(self, *sources: Source | str) -> StaleNotice | None:
+        """Get a notice for a page section showing data of the given sources, if any of them is
+        stale.
+        """
+        stale_sources = [source for source in map(Source, sources) if source in self.stale]
+        if not stale_sources:
+            return None
+        times: list[dtm.datetime | None] = [self.fetched.get(source) for source in stale_sources]
+        return StaleNotice(
+            sources=stale_sources,
+            since=None if None in times else min(time for time in times if time is not None),
+        )
+
+    def _expiries(self) -> Iterator[dtm.datetime | None]:
+        for poll in self.mucken_listen.polls.values():
+            yield poll.mucken_liste_expiry
+        for poll in self.polls:
+            yield poll.poll_expiry
+        for form in self.forms:
+            yield form.expire_date
+        for list_ in self.lists:
+            yield list_.expire_date
+        for group in self.chat_groups:
+            yield group.expire_date
+
+    def next_expiry(self, now: dtm.datetime) -> dtm.datetime | None:
+        """The next time after :paramref:`now` at which a shown poll, form, list or chat group
+        expires, i.e. at which the rendered pages change without new data. :obj:`None` if
+        nothing expires. Items never become active only by the passing of time.
+        """
+        return min(
+            (expiry for expiry in self._expiries() if expiry and expiry > now), default=None
+        )
+
+    def remove_expired(self) -> bool:
+        """Remove the items that are no longer active, using the same criteria as the crawl and
+        the loading of the local data. Expired Muckenlisten are removed and not moved to the
+        other polls, since their share tokens are not known.
+
+        Returns:
+            Whether any item was removed.
+        """
+        mucken_listen = self.mucken_listen
+        expired_ids = [
+            poll_id
+            for poll_id, poll in mucken_listen.polls.items()
+            if not poll.is_active_mucken_liste
+        ]
+        for poll_id in expired_ids:
+            del mucken_listen.polls[poll_id]
+            mucken_listen.poll_votes.pop(poll_id, None)
+
+        counts = (len(self.polls), len(self.forms), len(self.lists), len(self.chat_groups))
+        self.polls = [poll for poll in self.polls if poll.is_active_poll]
+        self.forms = [form for form in self.forms if form.is_active_public_form]
+        self.lists = Lists(self.lists).active_lists
+        self.chat_groups = ChatGroups(self.chat_groups).active_groups
+        new_counts = (len(self.polls), len(self.forms), len(self.lists), len(self.chat_groups))
+        return bool(expired_ids) or counts != new_counts
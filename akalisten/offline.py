@@ -0,0 +1,66 @@
+"""Precache manifest of the service worker that makes ``index.html`` available offline, e.g. at
+venues with poor reception.
+
+The manifest lists the files written next to ``index.html`` and the external scripts and
+stylesheets of the page, each with a hash of its content. For the pages, which contain the time
+of the rendering, the inputs of the rendering are hashed instead. The manifest is embedded into
+the service worker, such that the browser only installs a new service worker if a hash changed.
+The service worker precaches the listed files, answers repeat visits from the cache and
+revalidates in the background, see ``template/sw.j2``. The lists that can be filled in offline
+are part of the page and are thus covered by it.
+"""
+
+import hashlib
+import json
+import re
+from collections.abc import Iterable, Mapping
+
+from pydantic import BaseModel
+
+SERVICE_WORKER_FILE = "sw.js"
+"""The file of the service worker. It controls all pages in the output directory."""
+
+_ASSETS = re.compile(
+    r"""<script\b[^>]*?\ssrc="(https://[^"]+)"|<link\b[^>]*?\shref="(https://[^"]+)\"""",
+    re.IGNORECASE,
+)
+
+
+class PrecacheEntry(BaseModel):
+    url: str
+    """Relative to the output directory or absolute for external files."""
+    revision: str | None = None
+    """Hash of the content. :obj:`None` for external files, whose URLs contain their version."""
+
+
+class PrecacheManifest(BaseModel):
+    version: str
+    """Hash of all entries, which only changes if an entry changed."""
+    entries: list[PrecacheEntry]
+
+
+def _hash(content: str) -> str:
+    return hashlib.blake2b(content.encode(), digest_size=8).hexdigest()
+
+
+def page_assets(html: str) -> list[str]:
+    """The external scripts and stylesheets of the page in the order of the page."""
+    return list(dict.fromkeys(script or link for script, link in _ASSETS.findall(html)))
+
+
+def precache_manifest(files: Mapping[str, str], assets: Iterable[str]) -> PrecacheManifest:
+    """Build the manifest.
+
+    Args:
+        files: The content from which the revision of each file written to the output directory
+            is computed, keyed by file name. Either the content of the file or, for content that
+            changes on every render, its inputs.
+        assets: The URLs of the external files, see :func:`page_assets`.
+    """
+    entries = [
+        PrecacheEntry(url=file_name, revision=_hash(content))
+        for file_name, content in sorted(files.items())
+    ]
+    entries.extend(PrecacheEntry(url=url) for url in assets)
+    version = _hash(json.dumps([entry.model_dump() for entry in entries]))
+    return PrecacheManifest(version=version, entries=entries)
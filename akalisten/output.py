@@ -0,0 +1,155 @@
+"""Writing of the rendered pages to the output directory.
+
+HTML pages are minified by :func:`minify_html` before they are written. Every file is also
+written precompressed as ``<file>.gz`` and, if the optional :mod:`brotli` package is installed,
+as ``<file>.br``, such that a static web server can serve them without compressing them on each
+request, e.g. with ``gzip_static`` and ``brotli_static`` of nginx.
+"""
+
+import gzip
+import logging
+import re
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from pydantic import BaseModel
+
+_LOGGER = logging.getLogger(__name__)
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+"""Quality 11 compresses the pages only about 10% better, but takes about 50 times as long."""
+
+# The parts of the HTML in which the indentation is not simply collapsed. Elements are only
+# matched if they span several lines, since the attribute values of all other elements can't
+# contain a line break.
+_SPECIAL = re.compile(
+    r"""
+    (?P<raw><(?P<tag>pre|textarea|script|style)\b.*?</(?P=tag)\s*>)
+    |(?P<comment><!--.*?-->)
+    |(?P<element>
+        <[a-zA-Z/!][^>"'\n]*+(?:(?:"[^"\n]*+"|'[^'\n]*+')[^>"'\n]*+)*+
+        (?:\n|"[^"]*\n[^"]*"|'[^']*\n[^']*')
+        (?:[^>"']|"[^"]*"|'[^']*')*>
+    )
+    """,
+    re.DOTALL | re.IGNORECASE | re.VERBOSE,
+)
+_INDENTATION = re.compile(r"\n\s+")
+_ELEMENT_SPACE = re.compile(r"""("[^"]*"|'[^']*')|\s+""")
+
+
+def _minify_special(match: re.Match[str]) -> str:
+    if match["raw"] is not None:
+        return match["raw"]
+    if match["comment"] is not None:
+        return ""
+    # Only the whitespace between the attributes, the attribute values are kept as they are
+    minified = _ELEMENT_SPACE.sub(lambda space: space[1] or " ", match["element"][:-1])
+    return f"{minified.rstrip()}>"
+
+
+def minify_html(html: str) -> str:
+    """Collapse the indentation of the HTML and remove comments. Each line break followed by
+    whitespace is replaced by a single line break, which the browser renders the same. The
+    content of ``<pre>``, ``<textarea>``, ``<script>`` and ``<style>`` elements and the values
+    of attributes are left untouched.
+    """
+    parts = []
+    position = 0
+    for match in _SPECIAL.finditer(html):
+        parts.append(_INDENTATION.sub("\n", html[position : match.start()]))
+        parts.append(_minify_special(match))
+        position = match.end()
+    parts.append(_INDENTATION.sub("\n", html[position:]))
+    return "".join(parts)
+
+
+class OutputSizes(BaseModel):
+    """The sizes of a written file in bytes."""
+
+    file_name: str
+    rendered: int
+    written: int
+    """The size after the minification."""
+    gzip: int
+    brotli: int | None = None
+    """:obj:`None` if :mod:`brotli` is not installed."""
+
+
+def _compress_brotli(data: bytes) -> bytes | None:
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def write_file(output_dir: Path, file_name: str, content: str, minify: bool = True) -> OutputSizes:
+    """Write the file and its compressed siblings. Stale ``.br`` files are removed if
+    :mod:`brotli` is not installed.
+
+    Args:
+        output_dir: The directory to write to.
+        file_name: The name of the file.
+        content: The content of the file.
+        minify: Whether to minify the content if it is an HTML page.
+    """
+    rendered = content.encode()
+    if minify and file_name.endswith(".html"):
+        content = minify_html(content)
+    data = content.encode()
+    path = output_dir / file_name
+    path.write_bytes(data)
+
+    gzipped = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    path.with_name(f"{file_name}.gz").write_bytes(gzipped)
+    brotli_path = path.with_name(f"{file_name}.br")
+    if (compressed := _compress_brotli(data)) is None:
+        brotli_path.unlink(missing_ok=True)
+    else:
+        brotli_path.write_bytes(compressed)
+
+    return OutputSizes(
+        file_name=file_name,
+        rendered=len(rendered),
+        written=len(data),
+        gzip=len(gzipped),
+        brotli=None if compressed is None else len(compressed),
+    )
+
+
+def write_pages(
+    pages: Iterable[tuple[str, str]], output_dir: Path, minify: bool = True
+) -> list[OutputSizes]:
+    """Write the pages with :func:`write_file` in a worker thread. If :paramref:`pages` is
+    rendered lazily, e.g. by :func:`~akalisten.render.iter_pages`, the next page is rendered
+    while the previous one is minified and compressed.
+
+    Args:
+        pages: The pages as tuples of file name and content, written in this order.
+        output_dir: The directory to write to.
+        minify: Whether to minify the HTML pages.
+
+    Returns:
+        The sizes of the written files, in the order of :paramref:`pages`.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="write_pages") as executor:
+        futures = [
+            executor.submit(write_file, output_dir, file_name, content, minify)
+            for file_name, content in pages
+        ]
+    sizes = [future.result() for future in futures]
+    for size in sizes:
+        _LOGGER.info(
+            "Wrote %s: %d bytes rendered, %d written (%.0f%% saved), %d gzip, %s brotli",
+            size.file_name,
+            size.rendered,
+            size.written,
+            100 * (1 - size.written / size.rendered) if size.rendered else 0,
+            size.gzip,
+            size.brotli if size.brotli is not None else "no",
+        )
+    return sizes
@@ -0,0 +1,186 @@
+"""Optional profiling of the phases of a run with :mod:`cProfile` and :mod:`tracemalloc`.
+
+Code that makes up a phase of a run is wrapped with :func:`profile_phase`. Unless a
+:class:`Profiler` is activated, this is a no-op, so the hooks can stay in place permanently.
+While a profiler is active, each phase is profiled separately and the following files are
+written to the output directory of the profiler:
+
+* ``<phase>.pstats``: The :mod:`cProfile` statistics, e.g. for ``python -m pstats`` or
+  `snakeviz <https://jiffyclub.github.io/snakeviz/>`_.
+* ``<phase>.allocations.txt``: The source lines that allocated the most memory during the
+  phase that was still alive at its end, together with the peak memory usage during the phase.
+* ``summary.txt``: Wall time, allocated memory and peak memory of all phases.
+
+Example:
+    .. code-block:: python
+
+        with Profiler(Path("reports/profile")).activate():
+            with profile_phase("render"):
+                render()
+"""
+
+import cProfile
+import logging
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from akalisten.tracing import trace_span
+
+_LOGGER = logging.getLogger(__name__)
+
+_ACTIVE_PROFILER: ContextVar["Profiler | None"] = ContextVar("_ACTIVE_PROFILER", default=None)
+_PHASE_STACK: ContextVar[tuple[cProfile.Profile, ...]] = ContextVar("_PHASE_STACK", default=())
+_IGNORED_FILES = frozenset((tracemalloc.__file__, cProfile.__file__, "<unknown>"))
+
+
+class PhaseResult(BaseModel):
+    name: str
+    duration: float
+    """Wall time in seconds."""
+    allocated: int
+    """Size in bytes of the memory allocated during the phase that is still alive at its end."""
+    peak: int
+    """Peak size in bytes of the memory allocated during the phase."""
+
+
+class Profiler:
+    """Profiles the phases wrapped with :func:`profile_phase` while activated with
+    :meth:`activate`.
+
+    Phases may be nested. While a nested phase runs, the :mod:`cProfile` profiler of the outer
+    phase is paused, i.e. its statistics only contain the code that is not part of a nested
+    phase. The memory report of the outer phase only covers the allocations after the last
+    nested phase, since the traces are cleared at the start of each phase.
+
+    Only one :mod:`cProfile` profiler can be enabled at a time. A phase that starts while a
+    phase of another task runs, e.g. a refresh triggered by a webhook during a crawl, is
+    therefore not profiled but only traced.
+
+    Args:
+        output_dir: The directory to write the reports to.
+        top: The number of source lines listed in the allocation reports.
+    """
+
+    def __init__(self, output_dir: Path, top: int = 25) -> None:
+        self.output_dir = output_dir
+        self.top = top
+        self.results: list[PhaseResult] = []
+        self._enabled: cProfile.Profile | None = None
+        """The profile of the innermost phase of the task that is currently profiled."""
+        self._running: set[cProfile.Profile] = set()
+
+    @contextmanager
+    def activate(self) -> Iterator["Profiler"]:
+        """Make this the profiler used by :func:`profile_phase` in the current context. The
+        summary is written when leaving the context.
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        token = _ACTIVE_PROFILER.set(self)
+        try:
+            yield self
+        finally:
+            _ACTIVE_PROFILER.reset(token)
+            if started_tracing:
+                tracemalloc.stop()
+            self.write_summary()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Profile the wrapped code as phase :paramref:`name`."""
+        # The stack of the phases is kept per task, such that phases of other tasks are detected
+        stack = _PHASE_STACK.get()
+        if self._enabled is not None and (not stack or stack[-1] is not self._enabled):
+            _LOGGER.warning("Phase %s overlaps a phase of another task and is not profiled", name)
+            with trace_span(name, "phase"):
+                yield
+            return
+
+        if stack:
+            stack[-1].disable()
+        profile = cProfile.Profile()
+        token = _PHASE_STACK.set((*stack, profile))
+        self._enabled = profile
+        self._running.add(profile)
+        # Only the allocations during the phase are of interest. Clearing the traces is much
+        # cheaper than comparing snapshots of the whole heap before and after the phase.
+        tracemalloc.clear_traces()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            with trace_span(name, "phase"):
+                profile.enable()
+                try:
+                    yield
+                finally:
+                    profile.disable()
+        finally:
+            duration = time.perf_counter() - start
+            _PHASE_STACK.reset(token)
+            self._running.discard(profile)
+            self._write_phase(name, profile, duration)
+            # A phase of a task spawned during this phase may still be profiled. Conversely, the
+            # outer phase may have ended already if it belongs to the task that spawned this one.
+            if self._enabled is profile:
+                if stack and stack[-1] in self._running:
+                    self._enabled = stack[-1]
+                    self._enabled.enable()
+                else:
+                    self._enabled = None
+
+    def _write_phase(self, name: str, profile: cProfile.Profile, duration: float) -> None:
+        peak = tracemalloc.get_traced_memory()[1]
+        # Filtering the statistics instead of the traces is much faster for large heaps
+        statistics = [
+            statistic
+            for statistic in tracemalloc.take_snapshot().statistics("lineno")
+            if (filename := statistic.traceback[0].filename) not in _IGNORED_FILES
+            and not filename.startswith("<frozen importlib")
+        ]
+        result = PhaseResult(
+            name=name,
+            duration=duration,
+            allocated=sum(statistic.size for statistic in statistics),
+            peak=peak,
+        )
+        self.results.append(result)
+
+        profile.dump_stats(self.output_dir / f"{name}.pstats")
+        lines = [
+            f"Phase {name}: {1000 * duration:.1f} ms, allocated "
+            f"{result.allocated / 2**20:.2f} MiB, peak {peak / 2**20:.2f} MiB",
+            "",
+            f"Top {self.top} lines by allocated memory:",
+            *(str(statistic) for statistic in statistics[: self.top]),
+        ]
+        (self.output_dir / f"{name}.allocations.txt").write_text(
+            "\n".join(lines) + "\n", encoding="utf-8"
+        )
+
+    def write_summary(self) -> None:
+        lines = [f"{'phase':<20}{'time [ms]':>12}{'alloc [MiB]':>14}{'peak [MiB]':>14}"]
+        lines.extend(
+            f"{result.name:<20}{1000 * result.duration:>12.1f}"
+            f"{result.allocated / 2**20:>14.2f}{result.peak / 2**20:>14.2f}"
+            for result in self.results
+        )
+        (self.output_dir / "summary.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        _LOGGER.info("Wrote profiles of %d phases to %s", len(self.results), self.output_dir)
+
+
+def profile_phase(name: str) -> AbstractContextManager[object]:
+    """Context manager that profiles the wrapped code as phase :paramref:`name` if a
+    :class:`Profiler` is active. The phase is also recorded as span if a
+    :class:`~akalisten.tracing.Tracer` is active. Does nothing otherwise.
+    """
+    if (profiler := _ACTIVE_PROFILER.get()) is None:
+        return trace_span(name, "phase")
+    return profiler.phase(name)
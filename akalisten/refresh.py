@@ -0,0 +1,352 @@
+"""Event-driven refresh of the rendered pages.
+
+Instead of only crawling everything on a timer, a :class:`WebhookReceiver` accepts
+notifications of NextCloud, e.g. from the webhook listeners app or a Flow "Call a webhook"
+action, when someone votes or a form changes. A :class:`PageRefresher` maps each event to the
+requests for the affected poll or form, patches the template data kept in memory and re-renders
+the pages. Events arriving in quick succession are handled together. A full crawl still runs
+periodically as safety net, e.g. for changed registers, setlists or missed events.
+
+Two payload formats are understood:
+
+* The payloads of the NextCloud webhook listeners app, e.g.
+  ``{"event": {"class": "OCA\\\\Forms\\\\Events\\\\FormSubmittedEvent", "form": {"id": 3}}}``.
+  The poll or form is looked up in the event data, see :meth:`RefreshEvent.from_payload`.
+* Plain notifications like ``{"poll": 12}`` or ``{"form": 3}``.
+
+For local testing, :class:`~akalisten.fake_ocs.FakeEventSource` sends such notifications.
+"""
+
+import asyncio
+import datetime as dtm
+import hmac
+import json
+import logging
+from collections.abc import Awaitable, Callable, Collection, Mapping
+from enum import StrEnum
+from typing import TYPE_CHECKING, Any, TypeVar
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel, ConfigDict
+
+from ._http import HTTPRequest, HTTPResponse, HTTPServer, json_response
+from .clients._context import ClientContext
+from .datetime import TZ_INFO
+from .models.forms import FormInfo
+from .models.polls import PollInfo
+from .models.template import TemplateData
+from .tracing import traced
+
+if TYPE_CHECKING:
+    from .clients.forms import FormsAPI
+    from .clients.polls import PollAPI
+    from .models.polls import PollVotes
+
+_LOGGER = logging.getLogger(__name__)
+
+_ItemT = TypeVar("_ItemT", PollInfo, FormInfo)
+_GONE_STATUS_CODES = frozenset((403, 404))
+"""Status codes indicating that a poll or form was deleted or is no longer shared."""
+_EXPIRY_MARGIN = dtm.timedelta(seconds=1)
+"""Items are considered active up to and including their expiry time."""
+
+
+class RefreshKind(StrEnum):
+    POLL = "poll"
+    FORM = "form"
+
+
+_ID_PATHS: Mapping[RefreshKind, tuple[tuple[str, ...], ...]] = {
+    RefreshKind.POLL: (("poll",), ("poll", "id"), ("pollId",), ("vote", "pollId")),
+    RefreshKind.FORM: (("form",), ("form", "id"), ("formId",), ("submission", "formId")),
+}
+"""Where to look for the ID of the affected poll or form in the event data."""
+
+
+class RefreshEvent(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    kind: RefreshKind
+    id: int
+
+    @staticmethod
+    def _lookup(data: Mapping[str, Any], path: tuple[str, ...]) -> int | None:
+        value: Any = data
+        for key in path:
+            if not isinstance(value, Mapping):
+                return None
+            value = value.get(key)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.isdigit():
+            return int(value)
+        return None
+
+    @classmethod
+    def from_payload(cls, payload: Any) -> "RefreshEvent | None":
+        """Get the event for a notification payload, see the module documentation. Returns
+        :obj:`None` if the payload doesn't concern a poll or form.
+        """
+        if not isinstance(payload, Mapping):
+            return None
+        event = payload.get("event", payload)
+        if not isinstance(event, Mapping):
+            return None
+        event_class = str(event.get("class", "")).lower()
+        for kind, paths in _ID_PATHS.items():
+            # Events of the NextCloud apps are only considered for the matching app
+            if event_class and f"\\{kind}s\\" not in event_class:
+                continue
+            for path in paths:
+                if (item_id := cls._lookup(event, path)) is not None:
+                    return cls(kind=kind, id=item_id)
+        return None
+
+
+def _replace_item(items: list[_ItemT], item_id: int, item: _ItemT | None) -> None:
+    """Replace the item with the given ID in place, append it if it is new or remove it if
+    :paramref:`item` is :obj:`None`.
+    """
+    index = next((index for index, old in enumerate(items) if old.id == item_id), None)
+    if index is None:
+        if item is not None:
+            items.append(item)
+    elif item is None:
+        del items[index]
+    else:
+        items[index] = item
+
+
+class PageRefresher:
+    """Keeps the template data of the last crawl in memory, patches it on events and re-renders
+    the pages. Run it with :meth:`run` and pass events with :meth:`submit`.
+
+    Setlists are not refetched for single polls. A refreshed Muckenliste keeps its setlist and
+    polls that just became Muckenlisten get theirs with the next full crawl.
+
+    Args:
+        template_data: The data of the last full crawl including the local data.
+        render: Renders and writes the pages.
+        full_crawl: Crawls all data, called with the current data as fallback.
+        context: The client context for the targeted requests.
+        debounce: Seconds to wait for further events after the first event before refreshing.
+        crawl_interval: Seconds between the full crawls.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        template_data: TemplateData,
+        render: Callable[[TemplateData], None],
+        full_crawl: Callable[[TemplateData], Awaitable[TemplateData]],
+        context: ClientContext | None = None,
+        debounce: float = 2,
+        crawl_interval: float = 3600,
+    ) -> None:
+        self.template_data = template_data
+        self.context = context or ClientContext()
+        self.debounce = debounce
+        self.crawl_interval = crawl_interval
+        self._render = render
+        self._full_crawl = full_crawl
+        self._pending: set[RefreshEvent] = set()
+        self._wakeup = asyncio.Event()
+
+    def submit(self, event: RefreshEvent) -> None:
+        self._pending.add(event)
+        self._wakeup.set()
+
+    def _next_expiry(self, loop: asyncio.AbstractEventLoop) -> float | None:
+        """The next expiry of the shown data in terms of :meth:`loop.time`."""
+        now = dtm.datetime.now(TZ_INFO)
+        if (expiry := self.template_data.next_expiry(now)) is None:
+            return None
+        return loop.time() + (expiry - now + _EXPIRY_MARGIN).total_seconds()
+
+    async def run(self) -> None:
+        """Handle the submitted events and crawl all data every :attr:`crawl_interval` seconds
+        until cancelled. In between, the pages are re-rendered from the current data whenever a
+        shown item expires, see :meth:`TemplateData.next_expiry`.
+        """
+        loop = asyncio.get_running_loop()
+        next_crawl = loop.time() + self.crawl_interval
+        while True:
+            next_expiry = self._next_expiry(loop)
+            try:
+                async with asyncio.timeout_at(min(next_crawl, next_expiry or next_crawl)):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                if loop.time() >= next_crawl:
+                    await self.refresh_all()
+                    next_crawl = loop.time() + self.crawl_interval
+                else:
+                    self.refresh_expired()
+                continue
+
+            # Handle the events that arrive shortly after another in one go
+            await asyncio.sleep(self.debounce)
+            self._wakeup.clear()
+            events, self._pending = self._pending, set()
+            await self.refresh(events)
+
+    def refresh_expired(self) -> None:
+        """Remove the expired items from the current data and re-render the pages."""
+        if self.template_data.remove_expired():
+            _LOGGER.info("Re-rendering the pages without the expired items")
+            self._render_current()
+
+    def _render_current(self) -> None:
+        # An error must not end the refresh loop, the next event may be rendered successfully
+        try:
+            self._render(self.template_data)
+        except Exception:
+            _LOGGER.exception("Rendering the pages failed")
+
+    @traced
+    async def refresh_all(self) -> None:
+        try:
+            self.template_data = await self._full_crawl(self.template_data)
+        except Exception:
+            _LOGGER.exception("Full crawl failed, keeping the current data")
+            return
+        self._render_current()
+
+    @traced
+    async def refresh(self, events: Collection[RefreshEvent]) -> None:
+        """Refetch the polls and forms affected by :paramref:`events`, patch the template data
+        and re-render the pages.
+        """
+        poll_ids = sorted({event.id for event in events if event.kind is RefreshKind.POLL})
+        form_ids = sorted({event.id for event in events if event.kind is RefreshKind.FORM})
+        _LOGGER.info("Refreshing polls %s and forms %s", poll_ids, form_ids)
+        try:
+            async with asyncio.TaskGroup() as group:
+                if poll_ids:
+                    group.create_task(self._refresh_polls(poll_ids), name="refresh polls")
+                if form_ids:
+                    group.create_task(self._refresh_forms(form_ids), name="refresh forms")
+        except Exception:
+            # The items that were patched before the error are still rendered
+            _LOGGER.exception("Refreshing polls %s and forms %s failed", poll_ids, form_ids)
+        self._render_current()
+
+    async def _refresh_polls(self, poll_ids: Collection[int]) -> None:
+        from .clients.polls import PollAPI
+
+        async with PollAPI(context=self.context) as client:
+            results = await asyncio.gather(
+                *(self._fetch_poll(client, poll_id) for poll_id in poll_ids),
+                return_exceptions=True,
+            )
+        for poll_id, result in zip(poll_ids, results, strict=True):
+            if isinstance(result, BaseException):
+                _LOGGER.warning("Refreshing poll %s failed", poll_id, exc_info=result)
+            else:
+                self._patch_poll(poll_id, *result)
+
+    @staticmethod
+    async def _fetch_poll(
+        client: "PollAPI", poll_id: int
+    ) -> tuple[PollInfo | None, "PollVotes | None"]:
+        import httpx
+
+        try:
+            poll = await client.get_poll_info(poll_id)
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code in _GONE_STATUS_CODES:
+                return None, None
+            raise
+        if poll.is_active_mucken_liste:
+            return poll, await client.aggregate_poll_votes(poll_id)
+        if poll.is_active_poll:
+            poll.public_tokens.update(await client.get_public_share_token(poll_id))
+        return poll, None
+
+    def _patch_poll(self, poll_id: int, poll: PollInfo | None, votes: "PollVotes | None") -> None:
+        mucken_listen = self.template_data.mucken_listen
+        if poll is not None and votes is not None:
+            if (old_poll := mucken_listen.polls.get(poll_id)) is not None:
+                poll.setlist = old_poll.setlist
+            votes.add_register_users(mucken_listen.registers)
+            votes.sanitize_votes()
+            mucken_listen.polls[poll_id] = poll
+            mucken_listen.poll_votes[poll_id] = votes
+        else:
+            mucken_listen.polls.pop(poll_id, None)
+            mucken_listen.poll_votes.pop(poll_id, None)
+
+        active_poll = poll if poll is not None and votes is None and poll.is_active_poll else None
+        _replace_item(self.template_data.polls, poll_id, active_poll)
+
+    async def _refresh_forms(self, form_ids: Collection[int]) -> None:
+        from .clients.forms import FormsAPI
+
+        async with FormsAPI(context=self.context) as client:
+            results = await asyncio.gather(
+                *(self._fetch_form(client, form_id) for form_id in form_ids),
+                return_exceptions=True,
+            )
+        for form_id, result in zip(form_ids, results, strict=True):
+            if isinstance(result, BaseException):
+                _LOGGER.warning("Refreshing form %s failed", form_id, exc_info=result)
+            else:
+                active_form = (
+                    result if result is not None and result.is_active_public_form else None
+                )
+                _replace_item(self.template_data.forms, form_id, active_form)
+
+    @staticmethod
+    async def _fetch_form(client: "FormsAPI", form_id: int) -> FormInfo | None:
+        import httpx
+
+        try:
+            return FormInfo(form=await client.get_form(form_id))
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code in _GONE_STATUS_CODES:
+                return None
+            raise
+
+
+class WebhookReceiver(HTTPServer):
+    """Accepts the notifications as ``POST`` requests to :attr:`PATH` and passes them to a
+    :class:`PageRefresher`. Notifications that don't concern a poll or form are ignored.
+
+    Args:
+        refresher: The refresher to pass the events to. Must run in the same event loop.
+        secret: If given, requests must carry the header ``Authorization: Bearer <secret>``.
+        host: The host to listen on.
+        port: The port to listen on. ``0`` selects a free port.
+    """
+
+    PATH = "/webhook"
+
+    def __init__(
+        self,
+        refresher: PageRefresher,
+        secret: str | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        super().__init__(host=host, port=port)
+        self.refresher = refresher
+        self._authorization = f"Bearer {secret}" if secret else None
+
+    async def handle(self, request: HTTPRequest) -> HTTPResponse:
+        if urlsplit(request.target).path.rstrip("/") != self.PATH:
+            return json_response(404, {"error": "Not found"})
+        if request.method != "POST":
+            return json_response(405, {"error": "Only POST requests are supported"})
+        if self._authorization is not None and not hmac.compare_digest(
+            request.headers.get("authorization", "").encode(), self._authorization.encode()
+        ):
+            return json_response(401, {"error": "Invalid secret"})
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return json_response(400, {"error": "Invalid JSON"})
+
+        if (event := RefreshEvent.from_payload(payload)) is None:
+            _LOGGER.debug("Ignoring notification %s", payload)
+            return json_response(202, {"status": "ignored"})
+        _LOGGER.info("Received notification for %s %s", event.kind, event.id)
+        self.refresher.submit(event)
+        return json_response(202, {"status": "queued"})
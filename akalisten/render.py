@@ -0,0 +1,222 @@
+"""Rendering of the HTML pages from the template data."""
+
+import datetime as dtm
+import functools
+import hashlib
+import json
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from jinja2 import FileSystemLoader, StrictUndefined
+
+from akalisten.datetime import TZ_INFO, strftime
+from akalisten.icons import ICON_SPRITE_PLACEHOLDER, icon, inline_icon_sprite
+from akalisten.jinja2 import RelImportEnvironment
+from akalisten.models.general import STABLE_ORDER, User
+from akalisten.models.polls import PollOptionVotes
+from akalisten.models.template import MuckenListenData, TemplateData
+from akalisten.offline import SERVICE_WORKER_FILE, page_assets, precache_manifest
+
+if TYPE_CHECKING:
+    from akalisten.feed import Feed
+    from akalisten.timeseries import VoteSeries
+
+TEMPLATE_DIR = Path(__file__).parent / "template"
+PAGES: Mapping[str, tuple[str, bool]] = {
+    "index.html": ("index.j2", False),
+    "wordpress.html": ("wordpress.j2", True),
+}
+"""The rendered pages, mapping the output file name to the template name and whether the page is
+rendered for WordPress.
+"""
+DATA_FILE = "data.json"
+"""The file with the votes of the Muckenlisten for the client-side rendering of ``index.html``."""
+FEED_FILE = "feed.json"
+"""The file with the :class:`~akalisten.feed.Feed` of the changes, polled by ``index.html``."""
+
+
+def create_environment(template_dir: Path = TEMPLATE_DIR) -> RelImportEnvironment:
+    environment = RelImportEnvironment(
+        loader=FileSystemLoader(template_dir),
+        lstrip_blocks=True,
+        trim_blocks=True,
+        undefined=StrictUndefined,
+    )
+    environment.globals["strftime"] = strftime
+    environment.globals["icon"] = icon
+    return environment
+
+
+@functools.cache
+def _templates_revision(environment: RelImportEnvironment) -> str:
+    """Hash of the sources of all templates, including the included scripts and styles."""
+    digest = hashlib.blake2b(digest_size=8)
+    for name in environment.list_templates():
+        source, _, _ = environment.loader.get_source(environment, name)  # type: ignore[union-attr]
+        digest.update(f"{name}\n{source}\n".encode())
+    return digest.hexdigest()
+
+
+def _pages_revision_source(
+    environment: RelImportEnvironment,
+    template_data: TemplateData,
+    vote_series: Mapping[int, "VoteSeries"],
+    client_rendering: bool,
+    feed: "Feed | None",
+) -> str:
+    """The inputs of the pages except for the time of the rendering, which the pages contain,
+    e.g. in the footer and the trends of the votes. The precache manifest of the service worker
+    hashes these instead of the pages, such that it only changes if the pages actually changed.
+    The times at which the fresh sources were fetched are left out for the same reason.
+    """
+    return json.dumps(
+        [
+            _templates_revision(environment),
+            template_data.model_dump_json(exclude={"fetched"}, context={STABLE_ORDER: True}),
+            {source: template_data.fetched.get(source) for source in sorted(template_data.stale)},
+            {poll_id: len(series) for poll_id, series in vote_series.items()},
+            client_rendering,
+            feed and [feed.epoch, feed.version],
+        ],
+        default=str,
+    )
+
+
+def iter_pages(  # noqa: PLR0913
+    environment: RelImportEnvironment,
+    template_data: TemplateData,
+    now: dtm.datetime | None = None,
+    vote_series: Mapping[int, "VoteSeries"] | None = None,
+    client_rendering: bool = False,
+    feed: "Feed | None" = None,
+) -> Iterator[tuple[str, str]]:
+    """Render all :data:`PAGES` one after another, such that each page can be processed while
+    the next one is rendered. Use :func:`render_pages` to render them at once.
+
+    Args:
+        environment: The environment from :func:`create_environment`.
+        template_data: The data to render.
+        now: The time of the rendering. Defaults to now.
+        vote_series: The recorded vote counts of the Muckenlisten, keyed by poll ID. A trend is
+            shown for the Muckenlisten with records.
+        client_rendering: Leave the votes of the Muckenlisten out of the pages and let the
+            browser render them from :func:`compact_mucken_listen`, which is written to
+            :data:`DATA_FILE` and embedded into the WordPress page. Keeps the size of the
+            pages proportional to the number of votes instead of the markup per vote.
+        feed: The feed of the changes of the Muckenlisten for the current data. It is written
+            next to ``index.html``, which polls it to update itself.
+
+    The service worker :data:`~akalisten.offline.SERVICE_WORKER_FILE` comes last, since its
+    precache manifest contains the revisions of the pages that are not rendered for WordPress.
+
+    Yields:
+        The file name and content of each page.
+    """
+    mucken_listen_json = None
+    if client_rendering:
+        mucken_listen_json = json.dumps(
+            compact_mucken_listen(template_data.mucken_listen),
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+    kwargs = {
+        "links": template_data.links,
+        "lists": template_data.lists,
+        "mucken_listen": template_data.mucken_listen,
+        "polls": template_data.polls,
+        "forms": template_data.forms,
+        "chat_groups": template_data.chat_groups,
+        "stale_notice": template_data.stale_notice,
+        "vote_series": vote_series or {},
+        "now": now or dtm.datetime.now(TZ_INFO),
+        "client_rendering": client_rendering,
+        "data_file": DATA_FILE,
+        "feed": feed,
+        "feed_file": FEED_FILE,
+        "service_worker_file": SERVICE_WORKER_FILE,
+        "icon_sprite": ICON_SPRITE_PLACEHOLDER,
+        # Embedded into a script element, which must not be closed by the data
+        "mucken_listen_json": mucken_listen_json and mucken_listen_json.replace("</", "<\\/"),
+    }
+    # The data files come first, such that they are written before the pages that refer to them
+    revision_sources = {}
+    if mucken_listen_json is not None:
+        yield DATA_FILE, mucken_listen_json
+        revision_sources[DATA_FILE] = mucken_listen_json
+    if feed is not None:
+        yield FEED_FILE, feed.model_dump_json()
+    pages_revision_source = _pages_revision_source(
+        environment, template_data, vote_series or {}, client_rendering, feed
+    )
+    assets = []
+    for file_name, (template, wordpress) in PAGES.items():
+        page = inline_icon_sprite(
+            environment.get_template(template).render(wordpress=wordpress, **kwargs)
+        )
+        yield file_name, page
+        if not wordpress:
+            revision_sources[file_name] = f"{file_name}\n{pages_revision_source}"
+            assets.extend(page_assets(page))
+
+    manifest = precache_manifest(revision_sources, dict.fromkeys(assets))
+    yield SERVICE_WORKER_FILE, environment.get_template("sw.j2").render(manifest=manifest)
+
+
+def render_pages(  # noqa: PLR0913
+    environment: RelImportEnvironment,
+    template_data: TemplateData,
+    now: dtm.datetime | None = None,
+    vote_series: Mapping[int, "VoteSeries"] | None = None,
+    client_rendering: bool = False,
+    feed: "Feed | None" = None,
+) -> dict[str, str]:
+    """Render all :data:`PAGES` at once, see :func:`iter_pages` for the arguments.
+
+    Returns:
+        The rendered pages keyed by their file name.
+    """
+    return dict(iter_pages(environment, template_data, now, vote_series, client_rendering, feed))
+
+
+def _column_votes(option: PollOptionVotes) -> tuple[set[User], ...]:
+    """The votes of the option in the order of the columns on the page."""
+    return option.yes, option.sanitized_no, option.maybe, option.sanitized_not_voted
+
+
+def compact_mucken_listen(mucken_listen: MuckenListenData) -> dict[str, Any]:
+    """The votes of the shown Muckenlisten in a compact form for the client-side rendering.
+
+    Each user is listed once in ``users`` as ``[id, display name]``, ordered as on the page.
+    ``polls`` maps the poll IDs to the options as ``[text, yes, no, maybe, pending]``, where the
+    votes are the ascending indices of the users in ``users``. The no and pending votes are the
+    sanitized ones.
+    """
+    options = {
+        poll_id: list(mucken_listen.poll_votes[poll_id].options.values())
+        for poll_id in mucken_listen.polls
+    }
+    users = sorted(
+        {
+            user
+            for poll_options in options.values()
+            for option in poll_options
+            for votes in _column_votes(option)
+            for user in votes
+        },
+        key=lambda user: (user.html_display_name, user.id),
+    )
+    indices = {user: index for index, user in enumerate(users)}
+    return {
+        "users": [[user.id, user.display_name] for user in users],
+        "polls": {
+            poll_id: [
+                [
+                    option.text,
+                    *(sorted(indices[user] for user in votes) for votes in _column_votes(option)),
+                ]
+                for option in poll_options
+            ]
+            for poll_id, poll_options in options.items()
+        },
+    }
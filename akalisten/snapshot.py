@@ -0,0 +1,136 @@
+"""Versioned snapshots of the crawled data.
+
+After each crawl, the crawled :class:`~akalisten.models.template.TemplateData` is stored as a
+snapshot. The next crawl falls back to it for the sources that can't be fetched in time. In
+debug mode, the snapshot is loaded instead of crawling again. Snapshots can also be used to
+replay and profile the rendering. Besides the data, a snapshot contains the results of
+:meth:`~akalisten.models.polls.PollVotes.sanitize_votes`, such that they don't have to be
+recomputed when loading it.
+
+Snapshots are stored as compact JSON, compressed with gzip if the file name ends with ``.gz``.
+Increment :data:`SNAPSHOT_VERSION` whenever the stored data changes in an incompatible way.
+Snapshots of other versions are ignored.
+"""
+
+import datetime as dtm
+import gzip
+import logging
+import zlib
+from pathlib import Path
+
+from pydantic import AwareDatetime, BaseModel, Field
+
+from akalisten.datetime import TZ_INFO
+from akalisten.models.template import TemplateData
+
+_LOGGER = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+"""The version of the snapshot format written by :func:`save_snapshot`."""
+
+
+class SanitizedOptionVotes(BaseModel):
+    """The IDs of the users in the sanitized sets of a
+    :class:`~akalisten.models.polls.PollOptionVotes`.
+    """
+
+    no: list[str]
+    not_voted: list[str]
+
+
+class Snapshot(BaseModel):
+    version: int
+    created: AwareDatetime
+    data: TemplateData
+    sanitized: dict[int, dict[int, SanitizedOptionVotes]] = Field(default_factory=dict)
+    """The sanitized votes, keyed by poll ID and option ID."""
+
+    @classmethod
+    def from_template_data(cls, data: TemplateData) -> "Snapshot":
+        """Create a snapshot of the data. The votes of all polls must have been sanitized."""
+        return cls(
+            version=SNAPSHOT_VERSION,
+            created=dtm.datetime.now(TZ_INFO),
+            data=data,
+            sanitized={
+                poll_id: {
+                    option_id: SanitizedOptionVotes(
+                        no=[user.id for user in option.sanitized_no],
+                        not_voted=[user.id for user in option.sanitized_not_voted],
+                    )
+                    for option_id, option in poll_votes.options.items()
+                }
+                for poll_id, poll_votes in data.mucken_listen.poll_votes.items()
+            },
+        )
+
+    def to_template_data(self) -> TemplateData:
+        """Get the data with the sanitized votes restored."""
+        for poll_id, poll_votes in self.data.mucken_listen.poll_votes.items():
+            sanitized = self.sanitized.get(poll_id, {})
+            if sanitized.keys() != poll_votes.options.keys():
+                poll_votes.sanitize_votes()
+                continue
+            for option_id, option in poll_votes.options.items():
+                option.restore_sanitized(
+                    no_ids=set(sanitized[option_id].no),
+                    not_voted_ids=set(sanitized[option_id].not_voted),
+                )
+        return self.data
+
+
+def save_snapshot(path: Path, data: TemplateData) -> None:
+    """Save a snapshot of the data to the given path. The file is replaced atomically."""
+    content = Snapshot.from_template_data(data).model_dump_json().encode()
+    if path.suffix == ".gz":
+        content = gzip.compress(content, compresslevel=6, mtime=0)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.tmp")
+    temp_path.write_bytes(content)
+    temp_path.replace(path)
+
+
+def read_snapshot(path: Path) -> bytes:
+    """Read the raw content of a snapshot file, decompressing it if necessary.
+
+    Raises:
+        OSError: If the file can't be read or is not a valid gzip file.
+        EOFError: If the compressed file is truncated.
+        zlib.error: If the compressed data is corrupt.
+    """
+    content = path.read_bytes()
+    if path.suffix == ".gz":
+        return gzip.decompress(content)
+    return content
+
+
+def parse_snapshot(content: bytes) -> Snapshot:
+    """Parse the raw content of a snapshot.
+
+    Raises:
+        ValueError: If the content is invalid or was written by another version.
+    """
+    snapshot = Snapshot.model_validate_json(content)
+    if snapshot.version != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"Snapshot has version {snapshot.version}, expected version {SNAPSHOT_VERSION}"
+        )
+    return snapshot
+
+
+def load_snapshot(path: Path) -> TemplateData | None:
+    """Load the data from the snapshot at the given path. Returns :obj:`None` if there is no
+    snapshot or if it can't be used, e.g. because it was written by another version.
+    """
+    if not path.exists():
+        return None
+
+    # A corrupt or unreadable snapshot must not stop the run, the crawl just has no fallback
+    try:
+        snapshot = parse_snapshot(read_snapshot(path))
+    except (ValueError, OSError, EOFError, zlib.error) as exc:
+        _LOGGER.warning("Ignoring snapshot %s: %s", path, exc)
+        return None
+
+    _LOGGER.info("Loaded snapshot %s created at %s", path, snapshot.created)
+    return snapshot.to_template_data()
@@ -0,0 +1,394 @@
+"""Local SQLite store of the crawled polls, options, votes, registers and forms.
+
+After each crawl, the crawled data is written to the store with :meth:`VoteStore.record`. Only
+the differences to the stored data are written, i.e. the rows that were added, changed or
+removed since the last crawl. Every row keeps the time at which it was first seen and last
+changed, which allows for cheap historical queries without an external database, e.g.
+:meth:`VoteStore.answer_delays`.
+
+The store also speeds up the crawls: The votes of the polls that had no interaction since their
+votes were recorded are read from the store instead of being fetched, see
+:meth:`VoteStore.unchanged_poll_votes`.
+
+The store uses the WAL journal mode, such that it can be queried while a crawl writes to it.
+Increment :data:`STORE_VERSION` whenever the schema changes in an incompatible way.
+"""
+
+import datetime as dtm
+import logging
+import sqlite3
+import statistics
+from collections.abc import Iterable, Mapping, Sequence
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+from pydantic import BaseModel
+
+from akalisten.models.general import User
+from akalisten.models.polls import PollInfo, PollVotes
+from akalisten.models.raw_api_models.polls import (
+    PollOptionProjection,
+    PollVoteProjection,
+    PollVoteUserProjection,
+)
+from akalisten.models.template import Source, TemplateData
+
+_LOGGER = logging.getLogger(__name__)
+
+STORE_VERSION = 2
+"""The version of the schema, stored as ``user_version`` of the database."""
+
+_ANSWERS = ("yes", "no", "maybe")
+_SCHEMA = """
+CREATE TABLE polls (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    created REAL NOT NULL,
+    data TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    changed_at REAL NOT NULL
+);
+CREATE TABLE options (
+    poll_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    changed_at REAL NOT NULL,
+    PRIMARY KEY (poll_id, id)
+) WITHOUT ROWID;
+CREATE TABLE votes (
+    poll_id INTEGER NOT NULL,
+    option_id INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    user_name TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    changed_at REAL NOT NULL,
+    PRIMARY KEY (poll_id, option_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX votes_by_user ON votes (user_id, poll_id);
+CREATE TABLE register_members (
+    register_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    register_name TEXT NOT NULL,
+    user_name TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    changed_at REAL NOT NULL,
+    PRIMARY KEY (register_id, user_id)
+) WITHOUT ROWID;
+CREATE TABLE forms (
+    id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    changed_at REAL NOT NULL
+);
+"""
+# The last interaction with each poll when its recorded votes were fetched
+_SCHEMA_VOTE_SYNCS = """
+CREATE TABLE vote_syncs (
+    poll_id INTEGER PRIMARY KEY,
+    last_interaction REAL NOT NULL,
+    first_seen REAL NOT NULL,
+    changed_at REAL NOT NULL
+);
+"""
+_MIGRATIONS = {1: _SCHEMA_VOTE_SYNCS}
+"""The scripts that migrate the schema from the given version to the next one."""
+
+
+class StoreChanges(BaseModel):
+    """The number of rows written by :meth:`VoteStore.record`."""
+
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+    def __iadd__(self, other: "StoreChanges") -> Self:
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.deleted += other.deleted
+        return self
+
+
+class AnswerDelay(BaseModel):
+    user: User
+    polls: int
+    """The number of polls the user answered while the store observed them."""
+    median_delay: dtm.timedelta
+    """The median time between the creation of a poll and the first answer of the user."""
+
+
+class VoteStore:
+    """The store, see the module documentation. Use it as context manager to open and close
+    the database.
+
+    Args:
+        path: The path of the database file. Created if it doesn't exist.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            raise RuntimeError("The store is not open. Use it as context manager.")
+        return self._connection
+
+    def __enter__(self) -> Self:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version == 0:
+            with self._connection:
+                self._connection.executescript(_SCHEMA + _SCHEMA_VOTE_SYNCS)
+                self._connection.execute(f"PRAGMA user_version={STORE_VERSION}")
+        elif version in _MIGRATIONS:
+            with self._connection:
+                for migration in range(version, STORE_VERSION):
+                    self._connection.executescript(_MIGRATIONS[migration])
+                self._connection.execute(f"PRAGMA user_version={STORE_VERSION}")
+        elif version != STORE_VERSION:
+            self._connection.close()
+            self._connection = None
+            raise RuntimeError(
+                f"The store {self.path} has version {version}, expected {STORE_VERSION}."
+            )
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.connection.close()
+        self._connection = None
+
+    def _sync(  # noqa: PLR0913
+        self,
+        table: str,
+        keys: Sequence[str],
+        values: Sequence[str],
+        rows: Mapping[tuple[Any, ...], tuple[Any, ...]],
+        now: float,
+        scope: tuple[str, Any] | None = None,
+    ) -> StoreChanges:
+        """Make the rows of :paramref:`table` equal to :paramref:`rows`, which map the values
+        of the key columns to the values of the value columns. Only rows that differ are
+        written. With :paramref:`scope`, only the rows with the given value of the given column
+        are considered, e.g. the votes of one poll.
+        """
+        where, parameters = (f" WHERE {scope[0]} = ?", (scope[1],)) if scope else ("", ())
+        existing = {
+            row[: len(keys)]: row[len(keys) :]
+            for row in self.connection.execute(
+                f"SELECT {', '.join([*keys, *values])} FROM {table}{where}", parameters
+            )
+        }
+        inserted = [(*key, *row, now, now) for key, row in rows.items() if key not in existing]
+        updated = [
+            (*row, now, *key)
+            for key, row in rows.items()
+            if key in existing and existing[key] != row
+        ]
+        deleted = [key for key in existing if key not in rows]
+
+        columns = [*keys, *values, "first_seen", "changed_at"]
+        key_condition = " AND ".join(f"{key} = ?" for key in keys)
+        self.connection.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            inserted,
+        )
+        self.connection.executemany(
+            f"UPDATE {table} SET {', '.join(f'{value} = ?' for value in values)}, changed_at = ? "
+            f"WHERE {key_condition}",
+            updated,
+        )
+        self.connection.executemany(f"DELETE FROM {table} WHERE {key_condition}", deleted)
+        return StoreChanges(inserted=len(inserted), updated=len(updated), deleted=len(deleted))
+
+    def record(
+        self, template_data: TemplateData, crawled: dtm.datetime | None = None
+    ) -> StoreChanges:
+        """Write the differences between the crawled data and the stored data. Polls and forms
+        that are no longer shown are kept, since their data doesn't change anymore.
+
+        Args:
+            template_data: The crawled data.
+            crawled: The time of the crawl. Defaults to now.
+
+        Returns:
+            The number of written rows.
+        """
+        now = (crawled or dtm.datetime.now(dtm.UTC)).timestamp()
+        mucken_listen = template_data.mucken_listen
+        changes = StoreChanges()
+        with self.connection:
+            for poll in [*mucken_listen.polls.values(), *template_data.polls]:
+                changes += self._sync(
+                    "polls",
+                    ("id",),
+                    ("title", "created", "data"),
+                    {
+                        (poll.id,): (
+                            poll.poll.configuration.title,
+                            poll.poll.status.created.timestamp(),
+                            poll.model_dump_json(),
+                        )
+                    },
+                    now,
+                    scope=("id", poll.id),
+                )
+            for poll_id, poll_votes in mucken_listen.poll_votes.items():
+                changes += self._sync(
+                    "options",
+                    ("poll_id", "id"),
+                    ("position", "text"),
+                    {
+                        (poll_id, option.id): (position, option.text)
+                        for position, option in enumerate(poll_votes.options.values())
+                    },
+                    now,
+                    scope=("poll_id", poll_id),
+                )
+                changes += self._sync(
+                    "votes",
+                    ("poll_id", "option_id", "user_id"),
+                    ("user_name", "answer"),
+                    {
+                        (poll_id, option.id, user.id): (user.name, answer)
+                        for option in poll_votes.options.values()
+                        for answer in _ANSWERS
+                        for user in getattr(option, answer)
+                    },
+                    now,
+                    scope=("poll_id", poll_id),
+                )
+            # Stale votes may be older than the last interaction of their poll
+            votes_fresh = Source.VOTES not in template_data.stale
+            changes += self._sync(
+                "vote_syncs",
+                ("poll_id",),
+                ("last_interaction",),
+                {
+                    (poll_id,): (last_interaction.timestamp(),)
+                    for poll_id, poll in mucken_listen.polls.items()
+                    if votes_fresh
+                    and poll_id in mucken_listen.poll_votes
+                    and (last_interaction := poll.poll.status.lastInteraction) is not None
+                },
+                now,
+            )
+            changes += self._sync(
+                "register_members",
+                ("register_id", "user_id"),
+                ("register_name", "user_name"),
+                {
+                    (register.id, user.id): (register.name, user.name)
+                    for register in mucken_listen.registers.registers
+                    for user in register.members
+                },
+                now,
+            )
+            for form in template_data.forms:
+                changes += self._sync(
+                    "forms",
+                    ("id",),
+                    ("data",),
+                    {(form.id,): (form.model_dump_json(),)},
+                    now,
+                    scope=("id", form.id),
+                )
+        _LOGGER.debug("Recorded the crawl in %s: %r", self.path, changes)
+        return changes
+
+    def poll_votes(self, poll_id: int) -> PollVotes:
+        """The votes of a poll as aggregated by
+        :meth:`~akalisten.clients.polls.PollAPI.aggregate_poll_votes`, i.e. without the members
+        of the registers that didn't vote.
+        """
+        poll_votes = PollVotes(poll_id=poll_id)
+        options = self.connection.execute(
+            "SELECT id, text FROM options WHERE poll_id = ? ORDER BY position", (poll_id,)
+        )
+        for option_id, text in options:
+            poll_votes.add_option(PollOptionProjection(id=option_id, text=text))
+        votes = self.connection.execute(
+            "SELECT votes.option_id, options.text, votes.user_id, votes.user_name, votes.answer "
+            "FROM votes JOIN options "
+            "ON options.poll_id = votes.poll_id AND options.id = votes.option_id "
+            "WHERE votes.poll_id = ?",
+            (poll_id,),
+        )
+        for option_id, text, user_id, user_name, answer in votes:
+            poll_votes.add_vote(
+                PollVoteProjection(
+                    answer=answer,
+                    optionId=option_id,
+                    optionText=text,
+                    user=PollVoteUserProjection(displayName=user_name, id=user_id),
+                )
+            )
+        return poll_votes
+
+    def unchanged_poll_votes(self, polls: Iterable[PollInfo]) -> dict[int, PollVotes]:
+        """The recorded votes of those :paramref:`polls` that had no interaction since their
+        votes were fetched, according to ``lastInteraction`` of the poll status. NextCloud
+        updates it whenever a vote, an option or the poll itself changes, so these votes are
+        identical to the ones the API would return.
+
+        Args:
+            polls: The freshly fetched polls.
+
+        Returns:
+            The votes by poll ID.
+        """
+        synced = dict(self.connection.execute("SELECT poll_id, last_interaction FROM vote_syncs"))
+        return {
+            poll.id: self.poll_votes(poll.id)
+            for poll in polls
+            if (last_interaction := poll.poll.status.lastInteraction) is not None
+            and synced.get(poll.id) == last_interaction.timestamp()
+        }
+
+    def answer_delays(self, min_polls: int = 3) -> list[AnswerDelay]:
+        """How long the users typically take to answer a poll, slowest first.
+
+        The NextCloud API doesn't tell when a vote was cast, so the delay is measured from the
+        creation of the poll until the crawl that first saw a vote of the user. Only polls that
+        were recorded before the user voted are taken into account, since the delay of votes
+        that already existed in the first crawl of a poll is unknown.
+
+        Args:
+            min_polls: Users that answered fewer polls are left out.
+        """
+        rows = self.connection.execute(
+            "SELECT answers.user_id, answers.user_name, answers.answered - polls.created "
+            "FROM ("
+            "  SELECT poll_id, user_id, MAX(user_name) AS user_name, MIN(first_seen) AS answered"
+            "  FROM votes GROUP BY user_id, poll_id"
+            ") AS answers JOIN polls ON polls.id = answers.poll_id "
+            "WHERE answers.answered > polls.first_seen"
+        )
+        delays: dict[User, list[float]] = {}
+        for user_id, user_name, delay in rows:
+            delays.setdefault(User(name=user_name, id=user_id), []).append(delay)
+        return sorted(
+            (
+                AnswerDelay(
+                    user=user,
+                    polls=len(user_delays),
+                    median_delay=dtm.timedelta(seconds=statistics.median(user_delays)),
+                )
+                for user, user_delays in delays.items()
+                if len(user_delays) >= min_polls
+            ),
+            key=lambda answer_delay: answer_delay.median_delay,
+            reverse=True,
+        )
@@ -0,0 +1,598 @@
+"""Generator for synthetic but realistic API payloads at a configurable scale.
+
+The payloads have the same shape as the responses of the NextCloud APIs and validate into the
+full models of :mod:`akalisten.models.raw_api_models`. They are used for benchmarks and for
+profiling without access to NextCloud. The data is deterministic for a given
+:class:`SyntheticScale`.
+
+A snapshot of synthetic data for ``main.py bench`` can be created with::
+
+    python -m akalisten.synthetic --polls 40 --users 300 .cache/synthetic.json
+"""
+
+import argparse
+import datetime as dtm
+import random
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from akalisten.datetime import TZ_INFO
+from akalisten.models.forms import FormInfo
+from akalisten.models.general import User
+from akalisten.models.polls import PollInfo, PollVotes
+from akalisten.models.raw_api_models.circles import (
+    CircleMemberProjection,
+    MemberLevel,
+    MemberStatus,
+    UserType,
+)
+from akalisten.models.raw_api_models.forms import CondensedForm, FormProjection
+from akalisten.models.raw_api_models.polls import (
+    PollOptionProjection,
+    PollProjection,
+    PollVoteProjection,
+)
+from akalisten.models.register import RegisterCircle, Registers
+from akalisten.models.setlists import Setlist
+from akalisten.models.template import MuckenListenData, TemplateData
+
+JSON = dict[str, Any]
+
+_FIRST_NAMES = (
+    "Anna", "Ben", "Clara", "David", "Emma", "Felix", "Greta", "Hannes", "Ida", "Jonas", "Klara",
+    "Lukas", "Mia", "Noah", "Olivia", "Paul", "Quirin", "Rosa", "Simon", "Thea", "Ulrich",
+    "Vera", "Wilhelm", "Xenia", "Yusuf", "Zoe",
+)  # fmt: skip
+_LAST_NAMES = (
+    "Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Schulz",
+    "Hoffmann", "Schäfer", "Koch", "Bauer", "Richter", "Klein", "Wolf", "Schröder", "Neumann",
+    "Schwarz", "Zimmermann", "Braun", "Krüger", "Hofmann", "Hartmann", "Lange", "Schmitt",
+)  # fmt: skip
+_INSTRUMENTS = (
+    "Schlagzeug", "Flöte/Oboe", "Klarinette", "Altsaxophon", "Tenorsaxophon", "Ba(ri)ssklagott",
+    "Trompete", "Flügelhorn", "Horn", "TenBarEuph", "Posaune", "Tuba", "Gitarre",
+)  # fmt: skip
+_REGISTERS = (
+    "Schlagwerk", "Flöte+Oboe", "Klarinette", "Saxophon", "Trompete+Flügelhorn", "Horn",
+    "TenBarEuph", "Posaune", "Bass",
+)  # fmt: skip
+_LOCATIONS = ("Audimax", "Mensa 2", "Marktplatz", "Stadthalle", "Kulturzentrum", "Sportplatz")
+_EVENTS = ("Sommerfest", "Erstiwoche", "Weihnachtskonzert", "Stadtfest", "Hochzeit", "Uni-Ball")
+_ANSWERS = ("yes", "yes", "yes", "no", "maybe")
+
+
+class SyntheticScale(BaseModel):
+    """The size of the generated data."""
+
+    polls: int = 20
+    """Number of polls. Every second poll is a Muckenliste."""
+    options: int = len(_INSTRUMENTS)
+    """Number of options per Muckenliste. Options beyond the instruments don't map to a
+    register."""
+    users: int = 150
+    """Number of members."""
+    vote_ratio: float = 0.7
+    """Share of the members that vote in each poll."""
+    forms: int = 10
+    submissions: int = 20
+    """Number of submissions per form."""
+    setlists: int = 10
+    seed: int = 0
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        """Add a command line option for each field to the parser."""
+        for name, field in cls.model_fields.items():
+            parser.add_argument(
+                f"--{name.replace('_', '-')}",
+                type=field.annotation,  # type: ignore[arg-type]
+                default=None,
+                help=f"Default: {field.default}",
+            )
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "SyntheticScale":
+        """Create the scale from the options added by :meth:`add_arguments`."""
+        return cls(
+            **{
+                name: value
+                for name in cls.model_fields
+                if (value := getattr(args, name)) is not None
+            }
+        )
+
+
+def ocs(data: Any) -> JSON:
+    """Wrap data in the envelope of the OCS API."""
+    return {"ocs": {"meta": {"status": "ok", "statuscode": 200, "message": "OK"}, "data": data}}
+
+
+class SyntheticData:
+    """Generates the payloads for a given :class:`SyntheticScale`. The payloads of the list
+    endpoints are returned as lists, wrap them with :func:`ocs` to get complete responses.
+
+    Args:
+        scale: The size of the generated data.
+        now: The reference time. Polls, forms and setlists are dated relative to it.
+    """
+
+    def __init__(self, scale: SyntheticScale | None = None, now: dtm.datetime | None = None):
+        self.scale = scale or SyntheticScale()
+        self.now = now or dtm.datetime.now(TZ_INFO)
+        self._random = random.Random(self.scale.seed)
+        self.users: list[User] = [
+            User(
+                name=f"{_FIRST_NAMES[i % len(_FIRST_NAMES)]} "
+                f"{_LAST_NAMES[(i // len(_FIRST_NAMES)) % len(_LAST_NAMES)]}",
+                id=f"user{i:05d}",
+            )
+            for i in range(self.scale.users)
+        ]
+
+    # Helpers
+
+    def _timestamp(self, days: float) -> int:
+        return int((self.now + dtm.timedelta(days=days)).timestamp())
+
+    def _instrument(self, user_index: int) -> str:
+        return _INSTRUMENTS[user_index % len(_INSTRUMENTS)]
+
+    def _user_payload(self, user: User) -> JSON:
+        return {
+            "userId": user.id,
+            "displayName": user.name,
+            "emailAddress": f"{user.id}@example.com",
+            "isNoUser": False,
+            "type": "user",
+            "id": user.id,
+        }
+
+    def _event_date(self, poll_id: int) -> dtm.datetime:
+        return (self.now + dtm.timedelta(days=7 + 3 * poll_id)).replace(
+            hour=19, minute=0, second=0, microsecond=0
+        )
+
+    def is_mucken_poll(self, poll_id: int) -> bool:
+        return poll_id % 2 == 1
+
+    # Polls
+
+    def poll_description(self, poll_id: int) -> str:
+        if not self.is_mucken_poll(poll_id):
+            return (
+                f"Bitte tragt euch bis **{self._event_date(poll_id):%d.%m.}** ein.\n\n"
+                "Mehr Infos im [Wiki](https://example.com/wiki)."
+            )
+        return (
+            "## Infos\n"
+            f"* Datum: {self._event_date(poll_id):%d.%m.%Y}\n"
+            f"* Ort: {_LOCATIONS[poll_id % len(_LOCATIONS)]}\n"
+            "* M2: 17:30 Uhr\n"
+            "* Direkt: 18:00\n"
+            "* Start: 19 Uhr\n"
+            "* Ende: ca. 21:30\n"
+            "\n"
+            "Wir spielen das **übliche Programm**. Bitte bringt mit:\n\n"
+            "1. Noten\n"
+            "2. Schwarze Kleidung\n\n"
+            "> Anfahrt siehe [Karte](https://example.com/map)"
+        )
+
+    def poll(self, poll_id: int) -> JSON:
+        if self.is_mucken_poll(poll_id):
+            title = f"Muckenliste: {_EVENTS[poll_id % len(_EVENTS)]} {poll_id}"
+        else:
+            title = f"Umfrage {poll_id}: Probenwochenende"
+        owner = self._user_payload(self.users[0]) if self.users else {}
+        return {
+            "id": poll_id,
+            "type": "textPoll",
+            "descriptionSafe": self.poll_description(poll_id),
+            "configuration": {
+                "title": title,
+                "description": self.poll_description(poll_id),
+                "access": "open",
+                "allowComment": True,
+                "allowMaybe": True,
+                "allowProposals": "disallow",
+                "anonymous": False,
+                "autoReminder": False,
+                "expire": 0,
+                "hideBookedUp": False,
+                "proposalsExpire": 0,
+                "showResults": "always",
+                "useNo": True,
+                "maxVotesPerOption": 0,
+            },
+            "status": {
+                "lastInteraction": self._timestamp(-1),
+                "created": self._timestamp(-30),
+                "deleted": False,
+                "expired": False,
+                "relevantThreshold": self._timestamp(30 + 3 * poll_id),
+            },
+            "owner": owner,
+            "currentUserStatus": {
+                "userRole": "admin",
+                "isLocked": False,
+                "isLoggedIn": True,
+                "isNoUser": False,
+                "isOwner": False,
+                "userId": "admin",
+                "orphanedVotes": 0,
+                "yesVotes": 0,
+                "countVotes": 0,
+                "shareToken": "",
+                "groupInvitations": [],
+            },
+            "permissions": dict.fromkeys(
+                (
+                    "addOptions",
+                    "archive",
+                    "comment",
+                    "delete",
+                    "edit",
+                    "seeResults",
+                    "seeUsernames",
+                    "subscribe",
+                    "view",
+                    "vote",
+                ),
+                True,
+            ),  # fmt: skip
+        }
+
+    def polls(self) -> list[JSON]:
+        return [self.poll(poll_id) for poll_id in range(1, self.scale.polls + 1)]
+
+    def _option_text(self, index: int) -> str:
+        if index < len(_INSTRUMENTS):
+            return _INSTRUMENTS[index]
+        return f"Sonstiges {index - len(_INSTRUMENTS) + 1}"
+
+    def options(self, poll_id: int) -> list[JSON]:
+        count = self.scale.options if self.is_mucken_poll(poll_id) else 3
+        return [
+            {
+                "id": poll_id * 1000 + index,
+                "text": self._option_text(index)
+                if self.is_mucken_poll(poll_id)
+                else f"Termin {index + 1}",
+                "confirmed": 0,
+                "deleted": 0,
+                "duration": 0,
+                "hash": f"{poll_id:x}{index:04x}",
+                "locked": False,
+                "order": index,
+                "owner": None,
+                "pollId": poll_id,
+                "timestamp": 0,
+                "votes": {"count": 0, "maybe": 0, "no": 0, "yes": 0},
+            }
+            for index in range(count)
+        ]
+
+    def votes(self, poll_id: int) -> list[JSON]:
+        options = self.options(poll_id)
+        # Separate random generator per poll, such that the votes don't depend on the order
+        # in which the polls are requested
+        generator = random.Random(f"{self.scale.seed}-{poll_id}")
+        votes: list[JSON] = []
+        for index, user in enumerate(self.users):
+            if generator.random() >= self.scale.vote_ratio:
+                continue
+            if self.is_mucken_poll(poll_id):
+                # Members mostly vote for their own instrument, sometimes for a second one
+                chosen = [options[index % len(_INSTRUMENTS) % len(options)]]
+                others = [option for option in options if option is not chosen[0]]
+                if generator.random() < 0.2 and others:  # noqa: PLR2004
+                    # NextCloud keeps a single vote per user and option
+                    chosen.append(generator.choice(others))
+            else:
+                chosen = options
+            for option in chosen:
+                votes.append(
+                    {
+                        "answer": generator.choice(_ANSWERS),
+                        "optionId": option["id"],
+                        "optionText": option["text"],
+                        "deleted": 0,
+                        "id": len(votes) + poll_id * 100_000,
+                        "pollId": poll_id,
+                        "user": {
+                            "displayName": user.name,
+                            "id": user.id,
+                            "emailAddress": f"{user.id}@example.com",
+                            "isNoUser": False,
+                            "type": "user",
+                            "userId": user.id,
+                        },
+                    }
+                )
+        return votes
+
+    def shares(self, poll_id: int) -> list[JSON]:
+        owner = self._user_payload(self.users[0]) if self.users else {}
+        return [
+            {
+                "id": poll_id * 10 + index,
+                "pollId": poll_id,
+                "type": share_type,
+                "token": f"token{poll_id}{share_type}",
+                "invitationSent": False,
+                "reminderSent": False,
+                "locked": False,
+                "label": "",
+                "URL": f"https://cloud.example.com/index.php/apps/polls/s/token{poll_id}",
+                "publicPollEmail": "optional",
+                "voted": False,
+                "deleted": False,
+                "user": owner,
+            }
+            for index, share_type in enumerate(("public", "user"))
+        ]
+
+    # Circles
+
+    def _based_on(self, display_name: str, identifier: str, source: int) -> JSON:
+        return {
+            "displayName": display_name,
+            "config": 0,
+            "creation": self._timestamp(-365),
+            "description": "",
+            "id": identifier,
+            "name": identifier,
+            "population": 0,
+            "sanitizedName": display_name,
+            "source": source,
+            "url": f"https://cloud.example.com/{identifier}",
+        }
+
+    def _invited_by(self) -> JSON:
+        return {
+            "basedOn": self._based_on("Admin", "admin", 1),
+            "displayName": "Admin",
+            "id": "admin",
+            "instance": "cloud.example.com",
+            "userId": "admin",
+            "userType": 1,
+        }
+
+    def _member(self, circle_id: str, user: User, level: int) -> JSON:
+        return {
+            "basedOn": self._based_on(user.name, user.id, 1),
+            "circleId": circle_id,
+            "contactId": "",
+            "contactMeta": "",
+            "displayName": user.name,
+            "displayUpdate": self._timestamp(-10),
+            "id": f"{circle_id}-{user.id}",
+            "instance": "cloud.example.com",
+            "invitedBy": self._invited_by(),
+            "joined": self._timestamp(-100),
+            "level": level,
+            "local": True,
+            "notes": {"invitedBy": self._invited_by()},
+            "singleId": user.id,
+            "status": "Member",
+            "userId": user.id,
+            "userType": 1,
+        }
+
+    def circle(self, index: int) -> JSON:
+        circle_id = f"circle{index:03d}"
+        name = f"Register {_REGISTERS[index]}" if index < len(_REGISTERS) else "Vorstand"
+        admin = self._member(circle_id, User(name="Admin", id="admin"), MemberLevel.OWNER)
+        return {
+            "id": circle_id,
+            "name": name,
+            "config": 0,
+            "creation": self._timestamp(-365),
+            "description": "",
+            "displayName": name,
+            "initiator": admin,
+            "owner": admin,
+            "population": len(self.users) // len(_REGISTERS),
+            "sanitizedName": name,
+            "source": 16,
+            "url": f"https://cloud.example.com/circles/{circle_id}",
+        }
+
+    def circles(self) -> list[JSON]:
+        return [self.circle(index) for index in range(len(_REGISTERS) + 1)]
+
+    def circle_members(self, circle_id: str) -> list[JSON]:
+        index = int(circle_id.removeprefix("circle"))
+        circle = self.circle(index)
+        members = [
+            self._member(circle_id, user, MemberLevel.MEMBER) | {"circle": None}
+            for user_index, user in enumerate(self.users)
+            if user_index % len(_REGISTERS) == index
+        ]
+        return [circle["owner"], *members]
+
+    # Forms
+
+    def condensed_form(self, form_id: int) -> JSON:
+        return {
+            "id": form_id,
+            "hash": f"form{form_id:05d}",
+            "title": f"Anmeldung {_EVENTS[form_id % len(_EVENTS)]} {form_id}",
+            # Every fourth form is expired and thus not relevant
+            "expires": self._timestamp(-1 if form_id % 4 == 0 else 14 + form_id),
+            "permissions": ["edit", "results", "submit", "embed"],
+            "partial": True,
+            "state": 0,
+            "lastUpdated": self._timestamp(-form_id % 7),
+        }
+
+    def forms(self) -> list[JSON]:
+        return [self.condensed_form(form_id) for form_id in range(1, self.scale.forms + 1)]
+
+    def form(self, form_id: int) -> JSON:
+        questions = [
+            {
+                "id": form_id * 100 + index,
+                "formId": form_id,
+                "order": index,
+                "type": question_type,
+                "isRequired": True,
+                "text": text,
+                "name": "",
+                "options": [
+                    {"id": form_id * 1000 + index * 10 + option, "questionId": index, "text": text}
+                    for option, text in enumerate(options)
+                ],
+                "extraSettings": [],
+            }
+            for index, (question_type, text, options) in enumerate(
+                (
+                    ("short", "Name", ()),
+                    ("multiple_unique", "Instrument", _INSTRUMENTS),
+                    ("long", "Anmerkungen", ()),
+                )
+            )
+        ]
+        return self.condensed_form(form_id) | {
+            "description": f"Bitte bis zum **{form_id}.** anmelden.\n\n* Essen\n* Getränke",
+            "access": {"permitAllUsers": form_id % 2 == 0, "showToAllUsers": False},
+            "shares": [
+                {
+                    "id": form_id,
+                    "formId": form_id,
+                    "shareType": 3,
+                    "shareWith": f"share{form_id:05d}",
+                    "displayName": "",
+                }
+            ],
+            "ownerId": "admin",
+            "submissionMessage": None,
+            "created": self._timestamp(-20),
+            "isAnonymous": False,
+            "submitMultiple": False,
+            "showExpiration": True,
+            "canSubmit": True,
+            "questions": questions,
+            "submissions": [
+                {
+                    "id": form_id * 10_000 + index,
+                    "formId": form_id,
+                    "userId": user.id,
+                    "timestamp": self._timestamp(-index / 24),
+                    "userDisplayName": user.name,
+                    "answers": [
+                        {
+                            "id": form_id * 100_000 + index * 10 + question,
+                            "submissionId": form_id * 10_000 + index,
+                            "questionId": questions[question]["id"],
+                            "text": text,
+                        }
+                        for question, text in enumerate(
+                            (user.name, self._instrument(index), "Komme etwas später")
+                        )
+                    ],
+                }
+                for index, user in enumerate(self.users[: self.scale.submissions])
+            ],
+        }
+
+    # Setlists
+
+    def setlists(self) -> list[JSON]:
+        return [
+            {
+                "id": index,
+                "title": f"Setlist {index}",
+                "description": None,
+                # Setlists for the first Muckenlisten, such that they are matched by date
+                "startDateTime": self._event_date(2 * index - 1).isoformat(),
+                "duration": 7200,
+                "defaultModerationDuration": None,
+                "folderCollectionVersionId": None,
+                "isDraft": False,
+                "isPublished": True,
+            }
+            for index in range(1, self.scale.setlists + 1)
+        ]
+
+    # Processed data
+
+    def registers(self) -> Registers:
+        """The registers as computed by
+        :meth:`~akalisten.clients.circles.CirclesAPI.aggregate_registers`.
+        """
+        registers = []
+        for circle in self.circles():
+            if not circle["name"].startswith("Register "):
+                continue
+            members = [
+                CircleMemberProjection(**member) for member in self.circle_members(circle["id"])
+            ]
+            registers.append(
+                RegisterCircle(
+                    name=circle["name"],
+                    id=circle["id"],
+                    members={
+                        User(name=member.basedOn.displayName, id=member.userId)
+                        for member in members
+                        if member.status == MemberStatus.MEMBER
+                        and member.userType == UserType.USER
+                        and member.level == MemberLevel.MEMBER
+                    },
+                )
+            )
+        return Registers(registers=registers)
+
+    def poll_votes(self, poll_id: int) -> PollVotes:
+        """The votes as aggregated by :meth:`~akalisten.clients.polls.PollAPI.aggregate_poll_votes`
+        (without the register users and sanitization).
+        """
+        poll_votes = PollVotes(poll_id=poll_id)
+        for option in self.options(poll_id):
+            poll_votes.add_option(PollOptionProjection(**option))
+        for vote in self.votes(poll_id):
+            poll_votes.add_vote(PollVoteProjection(**vote))
+        return poll_votes
+
+    def template_data(self) -> TemplateData:
+        """The data as returned by :func:`akalisten.crawl.crawl`."""
+        setlists = [Setlist(**setlist) for setlist in self.setlists()]
+        data = MuckenListenData(polls={}, poll_votes={}, registers=self.registers())
+        other_polls = []
+        for payload in self.polls():
+            poll = PollInfo(poll=PollProjection(**payload))
+            if poll.is_active_mucken_liste:
+                poll.register_setlist(setlists)
+                data.polls[poll.id] = poll
+                poll_votes = self.poll_votes(poll.id)
+                poll_votes.add_register_users(data.registers)
+                poll_votes.sanitize_votes()
+                data.poll_votes[poll.id] = poll_votes
+            elif poll.is_active_poll:
+                poll.public_tokens.update(
+                    share["token"] for share in self.shares(poll.id) if share["type"] == "public"
+                )
+                other_polls.append(poll)
+
+        forms = [
+            FormInfo(form=FormProjection(**self.form(form.id)))
+            for form in (CondensedForm(**data) for data in self.forms())
+            if FormInfo.is_open_form(form)
+        ]
+        return TemplateData(
+            mucken_listen=data,
+            polls=other_polls,
+            forms=[form for form in forms if form.is_active_public_form],
+        )
+
+
+if __name__ == "__main__":
+    from akalisten.snapshot import save_snapshot
+
+    parser = argparse.ArgumentParser(description="Write a snapshot of synthetic data.")
+    SyntheticScale.add_arguments(parser)
+    parser.add_argument("path", type=Path, help="The path of the snapshot.")
+    args = parser.parse_args()
+    save_snapshot(args.path, SyntheticData(SyntheticScale.from_args(args)).template_data())
@@ -253,8 +253,8 @@ class CategoryManager {
      */
     setupCategoryInfoTooltip() {
         this.muckenlistenManager.getPollIds().forEach(pollId => {
-            const infoIcon = document.querySelector(`#categoryDropdown-${pollId}`).parentElement.nextElementSibling?.querySelector('.bi-info-circle');
-            if (infoIcon && window.bootstrap) {
+            const infoIcon = document.querySelector(`#categoryDropdown-${pollId}`).parentElement.nextElementSibling;
+            if (infoIcon?.matches('[data-bs-toggle="tooltip"]') && window.bootstrap) {
                 new window.bootstrap.Tooltip(infoIcon);
             }
         });
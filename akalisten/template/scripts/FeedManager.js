@@ -0,0 +1,107 @@
+/**
+ * FeedManager hält die Muckenlisten aktuell, ohne die Seite neu zu laden. Dazu wird regelmäßig der
+ * Änderungs-Feed (feed.json) abgefragt und nur die geänderten Muckenlisten werden neu gerendert.
+ * Die Auswahl der Filter und Kategorien sowie die Hervorhebung bleiben dabei erhalten.
+ * @class
+ * @param {MuckenlistenManager} muckenlistenManager
+ * @param {FilterManager} filterManager
+ * @param {CategoryManager} categoryManager
+ * @param {UserHighlightManager} userHighlightManager
+ */
+class FeedManager {
+    /**
+     * Abstand zwischen den Abfragen des Feeds in Millisekunden.
+     * @type {number}
+     */
+    static INTERVAL = 60 * 1000;
+
+    constructor(muckenlistenManager, filterManager, categoryManager, userHighlightManager) {
+        this.muckenlistenManager = muckenlistenManager;
+        this.filterManager = filterManager;
+        this.categoryManager = categoryManager;
+        this.userHighlightManager = userHighlightManager;
+        this.src = null;
+        this.epoch = null;
+        this.version = 0;
+        this.updating = false;
+    }
+
+    /**
+     * Startet die regelmäßige Abfrage, falls die Seite einen Feed hat. Die erste Abfrage erfolgt
+     * sofort, da die Seite auch aus dem Cache des Service Workers stammen kann. Solange die Seite
+     * nicht sichtbar ist, wird der Feed nicht abgefragt, beim Zurückkehren dafür sofort.
+     */
+    init() {
+        const accordion = document.getElementById('accordion-muckenlisten');
+        this.src = accordion?.getAttribute('data-feed-src');
+        if (!this.src) return;
+        this.epoch = accordion.getAttribute('data-feed-epoch');
+        this.version = Number(accordion.getAttribute('data-feed-version'));
+        setInterval(() => this.update(), FeedManager.INTERVAL);
+        document.addEventListener('visibilitychange', () => this.update());
+        this.update();
+    }
+
+    /**
+     * Fragt den Feed ab und wendet die Änderungen seit der eigenen Version an. Lädt die Seite neu,
+     * falls das nicht möglich ist, z.B. weil die Seite zu alt ist, eine Muckenliste dazukam oder
+     * der Feed neu begonnen wurde.
+     * @returns {Promise<void>}
+     */
+    async update() {
+        if (document.hidden || this.updating) return;
+        this.updating = true;
+        try {
+            const response = await fetch(this.src, {cache: 'no-cache'});
+            if (!response.ok) return;
+            const feed = await response.json();
+            // Die Versionen eines neu begonnenen Feeds sagen nichts über den Stand der Seite aus
+            if (feed.epoch !== this.epoch || feed.version < this.version) {
+                this.reload(feed);
+                return;
+            }
+            if (feed.version === this.version) return;
+
+            const changes = feed.changes.filter(change => change.version > this.version);
+            if (changes[0]?.version !== this.version + 1
+                || !changes.every(change => this.muckenlistenManager.applyChange(change))) {
+                this.reload(feed);
+                return;
+            }
+            this.version = feed.version;
+            this.restoreState(changes);
+        } catch (error) {
+            console.error('Der Änderungs-Feed konnte nicht abgefragt werden.', error);
+        } finally {
+            this.updating = false;
+        }
+    }
+
+    /**
+     * Lädt die Seite neu. Kommt die Seite aus dem Cache des Service Workers, ist sie nach dem
+     * Neuladen eventuell noch veraltet, da der Cache erst im Hintergrund aktualisiert wird. Damit
+     * sie sich dann nicht ständig neu lädt, wird für denselben Stand des Feeds frühestens nach
+     * INTERVAL erneut neu geladen.
+     * @param {Object} feed - Der abgefragte Feed.
+     */
+    reload(feed) {
+        const key = 'akalisten_feed_reload';
+        const id = `${feed.epoch}:${feed.version}`;
+        const last = JSON.parse(sessionStorage.getItem(key) ?? 'null');
+        if (last?.id === id && Date.now() - last.time < FeedManager.INTERVAL) return;
+        sessionStorage.setItem(key, JSON.stringify({id, time: Date.now()}));
+        window.location.reload();
+    }
+
+    /**
+     * Stellt die Sichtbarkeit der Spalten und Kategorien sowie die Hervorhebung für die neu
+     * gerenderten Muckenlisten wieder her.
+     * @param {Object[]} changes - Die angewendeten Änderungen.
+     */
+    restoreState(changes) {
+        this.filterManager.updateColumnVisibility();
+        this.categoryManager.updateCategoryVisibility();
+        const pollIds = new Set(changes.flatMap(change => Object.keys(change.polls)));
+        pollIds.forEach(pollId => this.userHighlightManager.setupPollHighlighting(pollId));
+    }
+}
@@ -4,6 +4,12 @@
  * @param {string} pollId - Die ID der Umfrage/Muckenliste.
  */
 class Muckenliste {
+    /**
+     * Die Spalten einer Muckenliste, in der Reihenfolge der Stimmen in den kompakten Daten.
+     * @type {string[]}
+     */
+    static VOTE_TYPES = ['yes', 'no', 'maybe', 'pending'];
+
     /**
      * Erstellt eine neue Muckenliste.
      * @param {string} pollId
@@ -14,6 +20,109 @@ class Muckenliste {
         this.container = document.getElementById(`muckenliste-columns-${pollId}`);
     }
 
+    /**
+     * Rendert die Kategorien aller Spalten aus den kompakten Daten (siehe data.json), falls die
+     * Seite ohne sie ausgeliefert wurde.
+     * @param {Array[]} options - Die Optionen als [Text, Ja, Nein, Vielleicht, Keine Antwort],
+     *  wobei die Stimmen die Indizes der Nutzer in users sind.
+     * @param {string[][]} users - Alle Nutzer als [ID, Name].
+     */
+    render(options, users) {
+        Muckenliste.VOTE_TYPES.forEach((type, typeIndex) => {
+            const target = this.container.querySelector(`.column.${type} .column-categories`);
+            if (!target) return;
+            const fragment = document.createDocumentFragment();
+            options.forEach(([text, ...votes]) => {
+                fragment.appendChild(Muckenliste.renderCategory(text, votes, typeIndex, users));
+            });
+            target.replaceChildren(fragment);
+        });
+    }
+
+    /**
+     * Aktualisiert die Muckenliste mit den neuen Stimmen aus dem Änderungs-Feed, inklusive der
+     * Anzahlen in den Spaltenüberschriften.
+     * @param {Array[]} options - Die Optionen wie bei render.
+     * @param {string[][]} users - Alle Nutzer als [ID, Name].
+     * @returns {boolean} - false, falls sich die Kategorien geändert haben. Dann passt die
+     *  Kategorie-Auswahl nicht mehr und die Seite muss neu geladen werden.
+     */
+    update(options, users) {
+        const categories = options.map(([text]) => text);
+        const current = this.getAllCategories();
+        if (categories.length !== current.length || categories.some((text, i) => text !== current[i])) {
+            return false;
+        }
+        this.render(options, users);
+        // Wie total_sanitized_*_votes: Nutzer zählen nur in der "besten" Spalte, in der sie stehen
+        const counted = new Set();
+        ['yes', 'maybe', 'no', 'pending'].forEach(type => {
+            const typeIndex = Muckenliste.VOTE_TYPES.indexOf(type);
+            const userIndices = new Set(options.flatMap(([, ...votes]) => votes[typeIndex]));
+            const total = this.container.querySelector(`.column.${type} .column-total`);
+            if (total) {
+                const count = type === 'pending'
+                    ? userIndices.size
+                    : [...userIndices].filter(index => !counted.has(index)).length;
+                total.textContent = String(count);
+            }
+            if (type !== 'pending') userIndices.forEach(index => counted.add(index));
+        });
+        return true;
+    }
+
+    /**
+     * Erzeugt eine Kategorie einer Spalte, entsprechend dem Makro render_category.
+     * @param {string} text - Der Name der Kategorie.
+     * @param {number[][]} votes - Die Stimmen je Spalte.
+     * @param {number} typeIndex - Der Index der Spalte.
+     * @param {string[][]} users - Alle Nutzer als [ID, Name].
+     * @returns {HTMLElement}
+     */
+    static renderCategory(text, votes, typeIndex, users) {
+        const createEntry = (className) => {
+            const entry = document.createElement('div');
+            entry.className = `alert alert-secondary alert-sm alert-entry mb-1${className}`;
+            return entry;
+        };
+        const counts = votes.map(userIndices => userIndices.length);
+        const maxSlots = Math.max(...counts);
+
+        const category = document.createElement('div');
+        category.className = 'mb-3 register-category';
+        category.setAttribute('data-category-name', text);
+        const title = document.createElement('div');
+        title.className = 'fw-bold mb-2 ms-1';
+        title.textContent = text;
+        const entries = document.createElement('div');
+        entries.className = 'd-flex flex-column';
+
+        votes[typeIndex].forEach(userIndex => {
+            const [id, name] = users[userIndex];
+            const entry = createEntry('');
+            entry.setAttribute('data-user-id', id);
+            const span = document.createElement('span');
+            span.textContent = name;
+            entry.appendChild(span);
+            entries.appendChild(entry);
+        });
+        // Füll-Elemente, damit die Kategorien in allen Spalten gleich hoch sind. Eins bleibt immer
+        // sichtbar, solange die Kategorie sichtbar ist.
+        for (let x = votes[typeIndex].length; x < maxSlots; x++) {
+            const entry = createEntry(` opacity-50${x > 0 ? ' fill-entry' : ''}`);
+            Muckenliste.VOTE_TYPES.forEach((type, index) => {
+                entry.setAttribute(`data-fill-for-${type}`, String(x === 0 || counts[index] > x));
+            });
+            entries.appendChild(entry);
+        }
+        if (maxSlots === 0) {
+            entries.appendChild(createEntry(' opacity-50'));
+        }
+
+        category.append(title, entries);
+        return category;
+    }
+
     /**
      * Gibt die aktuell ausgewählten Kategorien zurück.
      * @returns {string[]}
@@ -17,6 +17,54 @@ class MuckenlistenManager {
         this.muckenlisten = this.pollIds.map(id => new Muckenliste(id));
     }
 
+    /**
+     * Rendert die Muckenlisten aus den kompakten Daten, falls die Seite ohne sie ausgeliefert
+     * wurde. Die Daten sind entweder in die Seite eingebettet (WordPress) oder werden aus der
+     * Datei im Attribut data-src geladen.
+     * @returns {Promise<void>}
+     */
+    async render() {
+        const embedded = document.getElementById('muckenlisten-data');
+        const src = document.getElementById('accordion-muckenlisten')?.getAttribute('data-src');
+        if (!embedded && !src) return;
+        let data;
+        try {
+            if (embedded) {
+                data = JSON.parse(embedded.textContent);
+            } else {
+                const response = await fetch(src);
+                if (!response.ok) throw new Error(`${src}: ${response.status}`);
+                data = await response.json();
+            }
+        } catch (error) {
+            console.error('Die Muckenlisten konnten nicht geladen werden.', error);
+            return;
+        }
+        this.muckenlisten.forEach(list => {
+            const options = data.polls[list.pollId];
+            if (options) list.render(options, data.users);
+        });
+    }
+
+    /**
+     * Wendet eine Änderung aus dem Änderungs-Feed an (siehe feed.json): Aktualisiert die
+     * geänderten Muckenlisten und entfernt die nicht mehr angezeigten.
+     * @param {Object} change - Die Änderung mit users, polls und removed.
+     * @returns {boolean} - false, falls die Änderung nicht ohne Neuladen angewendet werden kann,
+     *  z.B. bei einer neuen Muckenliste.
+     */
+    applyChange(change) {
+        change.removed.forEach(pollId => {
+            document.getElementById(`muckenliste-${pollId}`)?.remove();
+            this.muckenlisten = this.muckenlisten.filter(list => list.pollId !== String(pollId));
+            this.pollIds = this.pollIds.filter(id => id !== String(pollId));
+        });
+        return Object.entries(change.polls).every(([pollId, options]) => {
+            const list = this.muckenlisten.find(list => list.pollId === pollId);
+            return list !== undefined && list.update(options, change.users);
+        });
+    }
+
     /**
      * Gibt alle Poll-IDs zurück.
      * @returns {string[]}
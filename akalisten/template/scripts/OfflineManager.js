@@ -0,0 +1,18 @@
+/**
+ * OfflineManager registriert den Service Worker, der die Seite und ihre Ressourcen zwischenspeichert,
+ * sodass sie auch bei schlechtem Empfang sofort lädt. Die WordPress-Seite hat keinen Service Worker.
+ * @class
+ */
+class OfflineManager {
+    /**
+     * Registriert den Service Worker aus dem Attribut data-service-worker, falls der Browser
+     * Service Worker unterstützt. Fehler, z.B. beim Öffnen der Datei ohne Server, werden ignoriert.
+     */
+    init() {
+        const src = document.documentElement.getAttribute('data-service-worker');
+        if (!src || !('serviceWorker' in navigator)) return;
+        navigator.serviceWorker.register(src).catch(error => {
+            console.warn('Der Service Worker konnte nicht registriert werden.', error);
+        });
+    }
+}
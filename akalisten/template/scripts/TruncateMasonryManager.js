@@ -1,69 +1,91 @@
 /**
- * Kapselt die Logik für das Umschalten von Truncate-Text und das Aktualisieren des Masonry-Layouts.
- * Stellt sicher, dass das Masonry-Layout aktualisiert wird, wenn eine Truncate-Checkbox
- * umgeschaltet wird.
+ * Ordnet die Karten der Masonry-Grids an, ohne eine Masonry-Bibliothek zu laden, und hält das
+ * Layout aktuell, wenn eine Truncate-Checkbox umgeschaltet wird.
+ * Die Grids sind CSS-Grids (siehe layout-styles.css). Unterstützt der Browser
+ * grid-template-rows: masonry, ordnet er die Karten selbst an. Sonst erhält jede Karte eine
+ * Zeilenspanne entsprechend ihrer Höhe. Ein ResizeObserver erkennt geänderte Höhen, z.B. durch
+ * Truncate-Texte, aufgeklappte Accordions oder eine andere Fensterbreite. Die Spannen werden
+ * höchstens einmal pro Frame aktualisiert: Erst werden alle Höhen gelesen, dann alle Spannen
+ * geschrieben, damit der Browser das Layout nicht für jede Karte neu berechnen muss.
  *
  * @param {string} masonrySelector - CSS-Selektor für Masonry-Grid-Elemente (Standard: '[data-masonry]')
  *
  */
 class TruncateMasonryManager {
+    /**
+     * @typedef {Object} MasonryLayout
+     * @property {HTMLElement} grid
+     * @property {Map<HTMLElement, number>} spans - Die Zeilenspanne je Karte.
+     */
+
+    /**
+     * Die Höhe der Zeilen in Pixeln, in deren Vielfachen die Karten angeordnet werden.
+     * @type {number}
+     */
+    static ROW_HEIGHT = 4;
+
     constructor(masonrySelector = '[data-masonry]') {
         this.masonrySelector = masonrySelector;
-        this.masonryInstances = new Map(); // Map von Grid-Element zu Masonry-Instanz
+        this.pendingGrids = new Set(); // Grids, deren Layout im nächsten Frame aktualisiert wird
+        this.frame = null;
     }
 
     /**
      * Initialisiert den TruncateMasonryManager.
-     * Findet alle Masonry-Grids und setzt Event Listener für Truncate-Checkboxen.
-     * Ruft die Masonry-Layout-Funktion auf, wenn eine Checkbox umgeschaltet wird.
+     * Beobachtet die Karten aller Masonry-Grids. Der ResizeObserver meldet jede Karte einmal
+     * direkt nach dem Beobachten, sodass dabei auch das erste Layout berechnet wird.
      */
     init() {
-        this.initAllMasonryGrids();
-        this.observeTruncateToggles();
+        if (!window.ResizeObserver || CSS.supports('grid-template-rows', 'masonry')) return;
+        const observer = new ResizeObserver(entries => {
+            entries.forEach(entry => this.pendingGrids.add(entry.target.parentElement));
+            this.scheduleLayout();
+        });
+        document.querySelectorAll(this.masonrySelector).forEach(grid => {
+            Array.from(grid.children).forEach(card => observer.observe(card));
+        });
     }
 
     /**
-     * Initialisiert alle Masonry-Grids auf der Seite.
-     * Sucht nach Elementen mit dem angegebenen Masonry-Selektor und erstellt
-     * eine Masonry-Instanz für jedes gefundene Grid.
+     * Aktualisiert das Layout der geänderten Grids im nächsten Frame.
      */
-    initAllMasonryGrids() {
-        // Alle Grids mit data-masonry finden und Masonry initialisieren
-        const grids = document.querySelectorAll(this.masonrySelector);
-        grids.forEach(grid => {
-            if (window.Masonry && !this.masonryInstances.has(grid)) {
-                const instance = new Masonry(grid, { percentPosition: true });
-                this.masonryInstances.set(grid, instance);
-            }
+    scheduleLayout() {
+        if (this.frame !== null) return;
+        this.frame = requestAnimationFrame(() => {
+            this.frame = null;
+            const layouts = Array.from(this.pendingGrids, grid => this.measureGrid(grid));
+            this.pendingGrids.clear();
+            layouts.forEach(layout => this.applyLayout(layout));
         });
     }
 
     /**
-     * Beobachtet alle Truncate-Checkboxen und setzt Event Listener für Änderungen.
-     * Wenn eine Checkbox umgeschaltet wird, wird das entsprechende Masonry-Layout aktualisiert.
+     * Berechnet die Zeilenspannen der Karten eines Grids, ohne das Layout zu verändern.
+     * @param {HTMLElement} grid
+     * @returns {MasonryLayout|null} - null, falls das Grid nicht sichtbar ist, z.B. in einem
+     *  zugeklappten Accordion.
      */
-    observeTruncateToggles() {
-        // Alle Checkboxen mit ID-Präfix 'truncate-toggle-' beobachten
-        document.querySelectorAll('input[type="checkbox"][id^="truncate-toggle-"]').forEach(checkbox => {
-            checkbox.addEventListener('change', () => {
-                this.updateMasonryLayoutForCheckbox(checkbox);
-            });
+    measureGrid(grid) {
+        if (!grid.offsetParent) return null;
+        const spans = new Map();
+        Array.from(grid.children).forEach(card => {
+            // Der Abstand zur vorherigen Karte ist der obere Außenabstand der Bootstrap-Spalte
+            const height = card.getBoundingClientRect().height + parseFloat(getComputedStyle(card).marginTop);
+            spans.set(card, Math.max(1, Math.ceil(height / TruncateMasonryManager.ROW_HEIGHT)));
         });
+        return {grid, spans};
     }
 
     /**
-     * Aktualisiert das Masonry-Layout für das Grid, das die angegebene Checkbox enthält.
-     * Sucht das nächste übergeordnete Grid-Element und ruft die Layout-Methode der Masonry-Instanz auf.
-     * @param {HTMLInputElement} checkbox - Die umgeschaltete Truncate-Checkbox
+     * Setzt die Zeilenspannen eines Grids. Unveränderte Spannen werden nicht neu geschrieben.
+     * @param {MasonryLayout|null} layout
      */
-    updateMasonryLayoutForCheckbox(checkbox) {
-        // Finde das nächste Grid (row mit data-masonry) als Vorfahre
-        const grid = checkbox.closest('.row[data-masonry]');
-        if (grid && this.masonryInstances.has(grid)) {
-            const instance = this.masonryInstances.get(grid);
-            if (instance && typeof instance.layout === 'function') {
-                instance.layout();
-            }
-        }
+    applyLayout(layout) {
+        if (!layout) return;
+        layout.grid.style.gridAutoRows = `${TruncateMasonryManager.ROW_HEIGHT}px`;
+        layout.spans.forEach((span, card) => {
+            const gridRowEnd = `span ${span}`;
+            if (card.style.gridRowEnd !== gridRowEnd) card.style.gridRowEnd = gridRowEnd;
+        });
     }
 }
@@ -83,60 +83,7 @@ class UserHighlightManager {
                 this.highlightUser(highlightedUser, pollId, true);
             }
         });
-        pollIds.forEach(pollId => {
-            const container = document.getElementById(`muckenliste-${pollId}`);
-            if (!container) return;
-            const userElements = Array.from(container.querySelectorAll('.alert[data-user-id]'));
-            const slotElements = Array.from(container.querySelectorAll('.alert:not([data-user-id])'));
-            const userIdCounts = {};
-            userElements.forEach(el => {
-                const userId = el.getAttribute('data-user-id');
-                userIdCounts[userId] = (userIdCounts[userId] || 0) + 1;
-            });
-            const highlightableUserIds = Object.keys(userIdCounts).filter(uid => userIdCounts[uid] > 1);
-            userElements.forEach(el => {
-                const userId = el.getAttribute('data-user-id');
-                if (highlightableUserIds.includes(userId)) {
-                    el.classList.add('pointer');
-                } else {
-                    el.classList.remove('pointer');
-                }
-            });
-            userElements.forEach(el => {
-                const userId = el.getAttribute('data-user-id');
-                if (highlightableUserIds.includes(userId)) {
-                    el.addEventListener('mouseenter', () => {
-                        if (this.highlightedUser) return;
-                        this.highlightUser(userId, pollId, false);
-                    });
-                    el.addEventListener('mouseleave', () => {
-                        if (this.highlightedUser) return;
-                        this.clearHighlight();
-                    });
-                    el.addEventListener('click', e => {
-                        e.stopPropagation();
-                        if (this.highlightedUser === userId && this.highlightedPollId === pollId) {
-                            this.clearHighlight(true);
-                        } else {
-                            this.previousCategorySelection = this.categoryManager.muckenlistenManager.muckenlisten[0].getSelectedCategories();
-                            this.highlightedUser = userId;
-                            this.highlightedPollId = pollId;
-                            this.highlightUser(userId, pollId, true);
-                            this.showOnlyUserCategoriesGlobal(userId);
-                        }
-                    });
-                } else {
-                    el.addEventListener('click', () => {
-                        this.clearHighlight();
-                    });
-                }
-            });
-            slotElements.forEach(el => {
-                el.addEventListener('click', () => {
-                    this.clearHighlight();
-                });
-            });
-        });
+        pollIds.forEach(pollId => this.setupPollHighlighting(pollId));
         document.body.addEventListener('click', e => {
             if (!e.target.closest('.alert[data-user-id]') && !e.target.closest('.alert:not([data-user-id])')) {
                 this.clearHighlight();
@@ -152,4 +99,67 @@ class UserHighlightManager {
             }
         });
     }
+
+    /**
+     * Richtet die Event Listener für die Nutzer einer Muckenliste ein. Muss nach dem Aktualisieren
+     * der Muckenliste erneut aufgerufen werden, da die Elemente dabei ersetzt werden.
+     * @param {string} pollId
+     */
+    setupPollHighlighting(pollId) {
+        if (this.highlightedUser && this.highlightedPollId === pollId) {
+            this.muckenlistenManager.highlightUser(this.highlightedUser, pollId);
+        }
+        const container = document.getElementById(`muckenliste-${pollId}`);
+        if (!container) return;
+        const userElements = Array.from(container.querySelectorAll('.alert[data-user-id]'));
+        const slotElements = Array.from(container.querySelectorAll('.alert:not([data-user-id])'));
+        const userIdCounts = {};
+        userElements.forEach(el => {
+            const userId = el.getAttribute('data-user-id');
+            userIdCounts[userId] = (userIdCounts[userId] || 0) + 1;
+        });
+        const highlightableUserIds = Object.keys(userIdCounts).filter(uid => userIdCounts[uid] > 1);
+        userElements.forEach(el => {
+            const userId = el.getAttribute('data-user-id');
+            if (highlightableUserIds.includes(userId)) {
+                el.classList.add('pointer');
+            } else {
+                el.classList.remove('pointer');
+            }
+        });
+        userElements.forEach(el => {
+            const userId = el.getAttribute('data-user-id');
+            if (highlightableUserIds.includes(userId)) {
+                el.addEventListener('mouseenter', () => {
+                    if (this.highlightedUser) return;
+                    this.highlightUser(userId, pollId, false);
+                });
+                el.addEventListener('mouseleave', () => {
+                    if (this.highlightedUser) return;
+                    this.clearHighlight();
+                });
+                el.addEventListener('click', e => {
+                    e.stopPropagation();
+                    if (this.highlightedUser === userId && this.highlightedPollId === pollId) {
+                        this.clearHighlight(true);
+                    } else {
+                        this.previousCategorySelection = this.categoryManager.muckenlistenManager.muckenlisten[0].getSelectedCategories();
+                        this.highlightedUser = userId;
+                        this.highlightedPollId = pollId;
+                        this.highlightUser(userId, pollId, true);
+                        this.showOnlyUserCategoriesGlobal(userId);
+                    }
+                });
+            } else {
+                el.addEventListener('click', () => {
+                    this.clearHighlight();
+                });
+            }
+        });
+        slotElements.forEach(el => {
+            el.addEventListener('click', () => {
+                this.clearHighlight();
+            });
+        });
+    }
 }
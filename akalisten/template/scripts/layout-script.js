@@ -1,5 +1,5 @@
 /**
- * Mapping von Theme-Namen zu Bootstrap-Icon-Klassen.
+ * Mapping von Theme-Namen zu Bootstrap-Icon-Klassen, die zugleich die IDs der Icons im Sprite sind.
  */
 const iconClassMap = {
     light: 'bi-sun-fill',
@@ -56,7 +56,9 @@ const showActiveTheme = (theme, focus = false) => {
     const btnToActive = document.querySelector(`[data-bs-theme-value="${theme}"]`);
 
     if (activeThemeIcon && iconClassMap[theme]) {
-        activeThemeIcon.className = `bi ${iconClassMap[theme]} theme-icon-active`;
+        // Das Icon ist ein SVG, dessen className nicht gesetzt werden kann
+        activeThemeIcon.setAttribute('class', `bi ${iconClassMap[theme]} theme-icon-active`);
+        activeThemeIcon.querySelector('use').setAttribute('href', `#${iconClassMap[theme]}`);
     }
 
     document.querySelectorAll('[data-bs-theme-value]').forEach(element => {
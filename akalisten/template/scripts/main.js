@@ -4,10 +4,12 @@
  * Event Listener:
  * - DOMContentLoaded: Startet die Initialisierung der Muckenlisten, Filter, Kategorien und User-Highlighting.
  */
-document.addEventListener('DOMContentLoaded', () => {
+document.addEventListener('DOMContentLoaded', async () => {
     const storageManager = new StorageManager();
     const muckenlistenManager = new MuckenlistenManager(storageManager);
     muckenlistenManager.init();
+    // Bei clientseitigem Rendern müssen die Listen stehen, bevor die Manager sie auswerten
+    await muckenlistenManager.render();
     const filterManager = new FilterManager(muckenlistenManager, storageManager);
     const categoryManager = new CategoryManager(muckenlistenManager, storageManager);
     const userHighlightManager = new UserHighlightManager(muckenlistenManager, categoryManager, storageManager);
@@ -28,4 +30,12 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // Initialisierung der User-Highlight-Logik
     userHighlightManager.setupUserHighlighting();
+
+    // Aktualisierung der Muckenlisten über den Änderungs-Feed
+    const feedManager = new FeedManager(muckenlistenManager, filterManager, categoryManager, userHighlightManager);
+    feedManager.init();
+
+    // Zwischenspeichern der Seite für schlechten Empfang
+    const offlineManager = new OfflineManager();
+    offlineManager.init();
 });
@@ -0,0 +1,187 @@
+"""Time series of the vote counts of the Muckenlisten, e.g. to show how fast a Mucke filled up.
+
+Each poll has its own append-only file with fixed-size binary records of the counts of an option
+at a given time, see :data:`RECORD`. A record is only appended when a count of the option changed
+since its previous record, so a crawl without changes writes nothing and the file of a poll
+stays small. Reading the series of a poll only reads the file of that poll.
+"""
+
+import datetime as dtm
+import logging
+import struct
+from array import array
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from pathlib import Path
+from typing import NamedTuple, Self
+
+from akalisten.models.polls import PollOptionVotes, PollVotes
+
+_LOGGER = logging.getLogger(__name__)
+
+RECORD = struct.Struct("<IIHHHH")
+"""Time in seconds since the epoch, option ID and the counts of a :class:`VoteCounts`."""
+
+
+class VoteCounts(NamedTuple):
+    yes: int
+    no: int
+    maybe: int
+    pending: int
+
+    @classmethod
+    def from_option(cls, option: PollOptionVotes) -> Self:
+        """The counts as shown on the page, i.e. with the sanitized no and pending votes."""
+        return cls(
+            yes=len(option.yes),
+            no=len(option.sanitized_no),
+            maybe=len(option.maybe),
+            pending=len(option.sanitized_not_voted),
+        )
+
+
+class OptionSeries:
+    """The recorded counts of an option, one array per column.
+
+    Args:
+        records: The unpacked records of the option, see :data:`RECORD`.
+    """
+
+    def __init__(self, records: Sequence[tuple[int, ...]]) -> None:
+        times, _, *columns = zip(*records, strict=True)
+        self.times = array("I", times)
+        self.columns = {
+            name: array("H", column)
+            for name, column in zip(VoteCounts._fields, columns, strict=True)
+        }
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def latest(self) -> VoteCounts:
+        return VoteCounts(*(column[-1] for column in self.columns.values()))
+
+    def totals(self) -> Iterator[int]:
+        """The number of users in the option at each record."""
+        return map(sum, zip(*self.columns.values(), strict=True))
+
+
+class VoteSeries:
+    """The recorded counts of all options of a poll.
+
+    Args:
+        data: The content of the file of the poll.
+    """
+
+    def __init__(self, data: bytes = b"") -> None:
+        records: dict[int, list[tuple[int, ...]]] = {}
+        for record in RECORD.iter_unpack(data):
+            records.setdefault(record[1], []).append(record)
+        self.options = {
+            option_id: OptionSeries(option_records)
+            for option_id, option_records in records.items()
+        }
+
+    def __len__(self) -> int:
+        return sum(len(option) for option in self.options.values())
+
+    @classmethod
+    def load(cls, path: Path) -> Self:
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return cls()
+        if partial := len(data) % RECORD.size:
+            # Left by an interrupted write. Cut off, such that the next records are aligned
+            _LOGGER.warning("Dropping a partial record at the end of %s", path)
+            data = data[:-partial]
+            with path.open("r+b") as file:
+                file.truncate(len(data))
+        return cls(data)
+
+    @property
+    def start(self) -> dtm.datetime | None:
+        """The time of the first record."""
+        if not self.options:
+            return None
+        return dtm.datetime.fromtimestamp(
+            min(option.times[0] for option in self.options.values()), dtm.UTC
+        )
+
+    def latest(self) -> dict[int, VoteCounts]:
+        return {option_id: option.latest for option_id, option in self.options.items()}
+
+    def sparkline(
+        self, option_id: int, end: dtm.datetime, width: int = 120, height: int = 24
+    ) -> str:
+        """Inline SVG of the yes votes of the option as step line, relative to the largest
+        number of users in the option. The time axis spans from the first record of the poll
+        until :paramref:`end`. Empty if nothing was recorded for the option.
+        """
+        option = self.options.get(option_id)
+        if not option or self.start is None:
+            return ""
+        start = self.start.timestamp()
+        duration = max(end.timestamp() - start, 1)
+        total = max(*option.totals(), 1)
+        points: list[str] = []
+        y = float(height)
+        for time, yes in zip(option.times, option.columns["yes"], strict=True):
+            x = min((time - start) / duration, 1) * width
+            points.append(f"{x:.1f},{y:.1f}")
+            y = height - yes / total * (height - 2) - 1
+            points.append(f"{x:.1f},{y:.1f}")
+        points.append(f"{width},{y:.1f}")
+        return (
+            f'<svg class="sparkline" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}" role="img" '
+            f'aria-label="Verlauf: {option.latest.yes} von {total} dabei">'
+            f'<polyline fill="none" stroke="currentColor" stroke-width="1.5" '
+            f'points="{" ".join(points)}"/></svg>'
+        )
+
+
+def series_path(directory: Path, poll_id: int) -> Path:
+    return directory / f"{poll_id}.bin"
+
+
+def load_vote_series(directory: Path, poll_ids: Iterable[int]) -> dict[int, VoteSeries]:
+    """Load the series of the given polls. Polls without records are left out."""
+    return {
+        poll_id: series
+        for poll_id in poll_ids
+        if (series := VoteSeries.load(series_path(directory, poll_id)))
+    }
+
+
+def append_vote_counts(
+    directory: Path, poll_votes: Mapping[int, PollVotes], recorded: dtm.datetime | None = None
+) -> int:
+    """Append the counts of the options that changed since their previous record. The votes
+    must have been sanitized.
+
+    Args:
+        directory: The directory of the files.
+        poll_votes: The votes keyed by poll ID.
+        recorded: The time of the counts. Defaults to now.
+
+    Returns:
+        The number of appended records.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    time = int((recorded or dtm.datetime.now(dtm.UTC)).timestamp())
+    appended = 0
+    for poll_id, votes in poll_votes.items():
+        path = series_path(directory, poll_id)
+        latest = VoteSeries.load(path).latest()
+        records = [
+            RECORD.pack(time, option_id, *counts)
+            for option_id, option in votes.options.items()
+            if (counts := VoteCounts.from_option(option)) != latest.get(option_id)
+        ]
+        if records:
+            with path.open("ab") as file:
+                file.write(b"".join(records))
+            appended += len(records)
+    _LOGGER.debug("Appended %d records to the vote series in %s", appended, directory)
+    return appended
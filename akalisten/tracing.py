@@ -0,0 +1,148 @@
+"""Lightweight tracing of a run as a tree of spans, written in the Chrome trace event format.
+
+Spans are recorded with :func:`trace_span` or the :func:`traced` decorator. Unless a
+:class:`Tracer` is activated, both are no-ops. While a tracer is active, every span is recorded
+with its start, duration and arguments. Each asyncio task gets its own track, such that the
+concurrent requests of a crawl show up side by side and the request that gated the end of a
+phase is easy to spot.
+
+The trace file can be opened with `Perfetto <https://ui.perfetto.dev/>`_ or
+``chrome://tracing``. No collector or other external service is required.
+
+Example:
+    .. code-block:: python
+
+        with Tracer().activate(Path("reports/traces/trace.json")):
+            with trace_span("render", "phase") as args:
+                args["pages"] = len(render())
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Awaitable, Callable, Coroutine, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, ParamSpec, TypeVar
+
+_LOGGER = logging.getLogger(__name__)
+
+_P = ParamSpec("_P")
+_R = TypeVar("_R")
+_SIMPLE_TYPES = (str, int, float, bool)
+_ACTIVE_TRACER: ContextVar["Tracer | None"] = ContextVar("_ACTIVE_TRACER", default=None)
+
+
+class Tracer:
+    """Records the spans opened with :func:`trace_span` while activated with :meth:`activate`."""
+
+    def __init__(self) -> None:
+        self.events: list[dict[str, Any]] = []
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+        # Track IDs keyed by asyncio task or, outside of tasks, by thread
+        self._tracks: dict[object, int] = {}
+
+    @contextmanager
+    def activate(self, path: Path) -> Iterator["Tracer"]:
+        """Make this the tracer used by :func:`trace_span` in the current context. The trace is
+        written to :paramref:`path` when leaving the context.
+        """
+        token = _ACTIVE_TRACER.set(self)
+        try:
+            yield self
+        finally:
+            _ACTIVE_TRACER.reset(token)
+            self.write(path)
+
+    def _track(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key: object = task or threading.current_thread()
+        if (track := self._tracks.get(key)) is None:
+            track = self._tracks[key] = len(self._tracks)
+            name = task.get_name() if task else threading.current_thread().name
+            self.events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self._pid,
+                    "tid": track,
+                    "args": {"name": name},
+                }
+            )
+        return track
+
+    @contextmanager
+    def span(self, name: str, category: str, args: dict[str, Any]) -> Iterator[dict[str, Any]]:
+        """Record a span. Yields :paramref:`args`, such that results can be attached to the
+        span.
+        """
+        track = self._track()
+        start = time.perf_counter_ns()
+        try:
+            yield args
+        except BaseException as exc:
+            args["error"] = repr(exc)
+            raise
+        finally:
+            end = time.perf_counter_ns()
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": (start - self._origin) / 1000,
+                    "dur": (end - start) / 1000,
+                    "pid": self._pid,
+                    "tid": track,
+                    "args": args,
+                }
+            )
+
+    def write(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        content = {"traceEvents": self.events, "displayTimeUnit": "ms"}
+        path.write_text(json.dumps(content, default=repr), encoding="utf-8")
+        _LOGGER.info("Wrote trace with %d events to %s", len(self.events), path)
+
+
+def trace_span(name: str, category: str, **args: Any) -> AbstractContextManager[dict[str, Any]]:
+    """Context manager that records the wrapped code as span if a :class:`Tracer` is active and
+    does nothing otherwise. Yields a dictionary of span arguments, to which further arguments,
+    e.g. the status code of a response, can be added.
+
+    Args:
+        name: The name of the span.
+        category: The category of the span, e.g. ``http`` or ``phase``.
+        **args: Arguments shown in the details of the span.
+    """
+    if (tracer := _ACTIVE_TRACER.get()) is None:
+        return nullcontext({})
+    return tracer.span(name, category, args)
+
+
+def traced(function: Callable[_P, Awaitable[_R]]) -> Callable[_P, Coroutine[Any, Any, _R]]:
+    """Decorator for async functions that records each call as a span named after the function.
+    Arguments of simple types, e.g. IDs, are recorded as arguments of the span.
+    """
+
+    @functools.wraps(function)
+    async def wrapper(*args: _P.args, **kwargs: _P.kwargs) -> _R:
+        if (tracer := _ACTIVE_TRACER.get()) is None:
+            return await function(*args, **kwargs)
+        span_args = {
+            "args": [arg for arg in args if isinstance(arg, _SIMPLE_TYPES)],
+            **{key: arg for key, arg in kwargs.items() if isinstance(arg, _SIMPLE_TYPES)},
+        }
+        with tracer.span(function.__qualname__, "call", span_args):
+            return await function(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from akalisten.clients._context import ClientContext
+from akalisten.crawl import crawl
+from akalisten.fake_ocs import EndpointFaults, FakeOCSServer, FaultSettings
+from akalisten.models.template import TemplateData
+
+FAULTS = {
+    "ideal": FaultSettings(),
+    "latency": FaultSettings(default=EndpointFaults(latency=0.05, jitter=0.02), seed=0),
+    "faulty": FaultSettings(
+        default=EndpointFaults(latency=0.05, jitter=0.02, error_rate=0.05, rate_limit_rate=0.01),
+        seed=0,
+    ),
+}
+
+
+@pytest.fixture(params=list(FAULTS))
+def faults(request: pytest.FixtureRequest) -> FaultSettings:
+    return FAULTS[request.param]
+
+
+def bench_crawl(benchmark: BenchmarkFixture, server: FakeOCSServer) -> None:
+    def run() -> TemplateData:
+        return asyncio.run(crawl(ClientContext()))
+
+    template_data = benchmark.pedantic(run, rounds=3, warmup_rounds=1)
+    assert template_data.mucken_listen.polls
+    benchmark.extra_info["responses"] = {
+        f"{label} {status}": count for (label, status), count in server.statistics.items()
+    }
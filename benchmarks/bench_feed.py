@@ -0,0 +1,25 @@
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from akalisten.feed import Feed
+from akalisten.models.template import TemplateData
+
+
+def bench_feed_unchanged(benchmark: BenchmarkFixture, template_data: TemplateData) -> None:
+    """A render without changes, which is the common case."""
+    mucken_listen = template_data.mucken_listen
+    feed = Feed().next(mucken_listen)
+    assert benchmark(feed.next, mucken_listen) is feed
+
+
+def bench_feed_changed_vote(
+    benchmark: BenchmarkFixture, template_data: TemplateData, mucken_poll_id: int
+) -> None:
+    """A render after a single changed vote."""
+    mucken_listen = template_data.mucken_listen
+    feed = Feed().next(mucken_listen)
+    option = next(iter(mucken_listen.poll_votes[mucken_poll_id].options.values()))
+    user = next(iter(option.yes))
+    option.yes.discard(user)
+    option.no.add(user)
+    new_feed = benchmark(feed.next, mucken_listen)
+    assert list(new_feed.changes[-1].polls) == [mucken_poll_id]
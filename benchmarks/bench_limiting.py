@@ -0,0 +1,75 @@
+import asyncio
+import contextlib
+import time
+
+import httpx
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from akalisten.clients._limiting import (
+    AdaptiveLimiter,
+    CircuitState,
+    LimitedTransport,
+    TrafficController,
+    TrafficSettings,
+)
+from akalisten.clients._metrics import MetricsRecorder
+from akalisten.clients._statistics import RequestStatistics
+
+
+async def _respond(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/slow":
+        await asyncio.sleep(1)
+    return httpx.Response(200)
+
+
+def bench_cancelled_trial_request(benchmark: BenchmarkFixture) -> None:
+    """Cancelling the trial request of a half-open circuit, e.g. by a deadline, must not keep
+    the circuit half-open, which would reject all further requests to the host.
+    """
+
+    async def cancel_trial_and_recover() -> CircuitState:
+        statistics = RequestStatistics()
+        traffic = TrafficController(
+            statistics, TrafficSettings(failure_threshold=1, reset_timeout=0)
+        )
+        transport = LimitedTransport(
+            httpx.MockTransport(_respond), traffic, MetricsRecorder(statistics)
+        )
+        breaker = traffic.breaker("nextcloud.test")
+        breaker.record(success=False)
+        assert breaker.state == CircuitState.OPEN
+
+        with contextlib.suppress(TimeoutError):
+            async with asyncio.timeout(0.01):
+                await transport.handle_async_request(
+                    httpx.Request("GET", "https://nextcloud.test/slow")
+                )
+        assert breaker.state == CircuitState.OPEN
+
+        await transport.handle_async_request(httpx.Request("GET", "https://nextcloud.test/fast"))
+        return breaker.state
+
+    state = benchmark.pedantic(lambda: asyncio.run(cancel_trial_and_recover()), rounds=5)
+    assert state == CircuitState.CLOSED
+
+
+def bench_pause_while_waiting_for_slot(benchmark: BenchmarkFixture) -> None:
+    """A ``Retry-After`` received while a request waits for a slot must also pause that
+    request.
+    """
+
+    async def wait_for_slot() -> float:
+        limiter = AdaptiveLimiter(TrafficSettings(initial_concurrency=1))
+
+        async def request() -> float:
+            async with limiter.slot():
+                return time.monotonic()
+
+        async with limiter.slot():
+            waiting = asyncio.create_task(request())
+            await asyncio.sleep(0)
+            paused_until = time.monotonic() + 0.02
+            limiter.record(0, status_code=429, retry_after=0.02)
+        return await waiting - paused_until
+
+    assert benchmark.pedantic(lambda: asyncio.run(wait_for_slot()), rounds=5) >= 0
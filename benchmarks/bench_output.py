@@ -0,0 +1,36 @@
+import datetime as dtm
+from pathlib import Path
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from akalisten.markdown import render_markdown
+from akalisten.models.template import TemplateData
+from akalisten.output import OutputSizes, minify_html, write_pages
+from akalisten.render import create_environment, iter_pages, render_pages
+
+
+@pytest.fixture
+def index_html(template_data: TemplateData, now: dtm.datetime) -> str:
+    return render_pages(create_environment(), template_data, now=now)["index.html"]
+
+
+def bench_minify_html(benchmark: BenchmarkFixture, index_html: str) -> None:
+    minified = benchmark(minify_html, index_html)
+    assert len(minified) < len(index_html)
+    benchmark.extra_info["bytes"] = {"rendered": len(index_html), "minified": len(minified)}
+
+
+def bench_render_and_write_pages(
+    benchmark: BenchmarkFixture, tmp_path: Path, template_data: TemplateData, now: dtm.datetime
+) -> None:
+    """Rendering the pages while the previous one is minified and compressed."""
+    environment = create_environment()
+    render_pages(environment, template_data, now=now)
+
+    def render_and_write() -> list[OutputSizes]:
+        render_markdown.cache_clear()
+        return write_pages(iter_pages(environment, template_data, now=now), tmp_path)
+
+    sizes = benchmark.pedantic(render_and_write, rounds=5)
+    benchmark.extra_info["bytes"] = {size.file_name: size.model_dump() for size in sizes}
@@ -0,0 +1,91 @@
+from typing import Any
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from akalisten.models.polls import MuckenInfo, PollVotes
+from akalisten.models.raw_api_models.polls import PollOptionProjection, PollVoteProjection
+from akalisten.models.register import Registers
+from akalisten.synthetic import SyntheticData
+
+
+@pytest.fixture(scope="module")
+def options(synthetic: SyntheticData, mucken_poll_id: int) -> list[dict[str, Any]]:
+    return synthetic.options(mucken_poll_id)
+
+
+@pytest.fixture(scope="module")
+def votes(synthetic: SyntheticData, mucken_poll_id: int) -> list[dict[str, Any]]:
+    return synthetic.votes(mucken_poll_id)
+
+
+@pytest.fixture(scope="module")
+def registers(synthetic: SyntheticData) -> Registers:
+    return synthetic.registers()
+
+
+def _aggregate(
+    poll_id: int, options: list[dict[str, Any]], votes: list[dict[str, Any]]
+) -> PollVotes:
+    # Same steps as PollAPI.aggregate_poll_votes, without the requests
+    poll_votes = PollVotes(poll_id=poll_id)
+    for option in options:
+        poll_votes.add_option(PollOptionProjection(**option))
+    for vote in votes:
+        poll_votes.add_vote(PollVoteProjection(**vote))
+    return poll_votes
+
+
+def bench_aggregate_poll_votes(
+    benchmark: BenchmarkFixture,
+    mucken_poll_id: int,
+    options: list[dict[str, Any]],
+    votes: list[dict[str, Any]],
+) -> None:
+    poll_votes = benchmark(_aggregate, mucken_poll_id, options, votes)
+    assert poll_votes.options
+
+
+def bench_sanitize_votes(
+    benchmark: BenchmarkFixture,
+    mucken_poll_id: int,
+    options: list[dict[str, Any]],
+    votes: list[dict[str, Any]],
+    registers: Registers,
+) -> None:
+    def setup() -> tuple[tuple[PollVotes], dict[str, Any]]:
+        poll_votes = _aggregate(mucken_poll_id, options, votes)
+        poll_votes.add_register_users(registers)
+        return (poll_votes,), {}
+
+    benchmark.pedantic(PollVotes.sanitize_votes, setup=setup, rounds=50)
+
+
+def bench_total_sanitized_votes(
+    benchmark: BenchmarkFixture,
+    mucken_poll_id: int,
+    options: list[dict[str, Any]],
+    votes: list[dict[str, Any]],
+    registers: Registers,
+) -> None:
+    poll_votes = _aggregate(mucken_poll_id, options, votes)
+    poll_votes.add_register_users(registers)
+    poll_votes.sanitize_votes()
+
+    def totals() -> tuple[int, int, int, int]:
+        return (
+            poll_votes.total_sanitized_yes_votes,
+            poll_votes.total_sanitized_no_votes,
+            poll_votes.total_sanitized_maybe_votes,
+            poll_votes.total_sanitized_pending_votes,
+        )
+
+    assert sum(benchmark(totals)) > 0
+
+
+def bench_mucken_info_from_string(
+    benchmark: BenchmarkFixture, synthetic: SyntheticData, mucken_poll_id: int
+) -> None:
+    description = synthetic.poll_description(mucken_poll_id)
+    info = benchmark(MuckenInfo.from_string, description)
+    assert info.is_complete
@@ -0,0 +1,51 @@
+import asyncio
+import datetime as dtm
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from akalisten.clients._context import ClientContext
+from akalisten.fake_ocs import FakeEventSource, FakeOCSServer
+from akalisten.models.template import TemplateData
+from akalisten.refresh import PageRefresher, RefreshEvent, RefreshKind, WebhookReceiver
+from akalisten.render import create_environment, render_pages
+
+
+def bench_refresh_poll(
+    benchmark: BenchmarkFixture,
+    server: FakeOCSServer,
+    template_data: TemplateData,
+    mucken_poll_id: int,
+    now: dtm.datetime,
+) -> None:
+    """Time from sending a notification for a Muckenliste until the pages are re-rendered."""
+    environment = create_environment()
+    event = RefreshEvent(kind=RefreshKind.POLL, id=mucken_poll_id)
+
+    async def notify_and_render() -> None:
+        rendered = asyncio.Event()
+
+        def render(data: TemplateData) -> None:
+            render_pages(environment, data, now=now)
+            rendered.set()
+
+        async def full_crawl(fallback: TemplateData) -> TemplateData:
+            return fallback
+
+        refresher = PageRefresher(
+            template_data,
+            render=render,
+            full_crawl=full_crawl,
+            context=ClientContext(),
+            debounce=0,
+        )
+        async with WebhookReceiver(refresher) as receiver:
+            runner = asyncio.create_task(refresher.run())
+            await FakeEventSource(receiver.url + receiver.PATH).send([event])
+            await rendered.wait()
+            runner.cancel()
+
+    benchmark.pedantic(lambda: asyncio.run(notify_and_render()), rounds=5, warmup_rounds=1)
+    assert template_data.mucken_listen.poll_votes[mucken_poll_id].options
+    benchmark.extra_info["responses"] = {
+        f"{label} {status}": count for (label, status), count in server.statistics.items()
+    }
@@ -0,0 +1,61 @@
+import datetime as dtm
+
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from akalisten.bench import render_all_markdown
+from akalisten.markdown import render_markdown
+from akalisten.models.template import TemplateData
+from akalisten.render import DATA_FILE, create_environment, render_pages
+from akalisten.synthetic import SyntheticData
+
+
+def bench_render_markdown(
+    benchmark: BenchmarkFixture, synthetic: SyntheticData, mucken_poll_id: int
+) -> None:
+    description = synthetic.poll_description(mucken_poll_id)
+
+    def render() -> str:
+        render_markdown.cache_clear()
+        return render_markdown(description)
+
+    assert "<li>" in benchmark(render)
+
+
+def bench_render_all_markdown(benchmark: BenchmarkFixture, template_data: TemplateData) -> None:
+    def render() -> None:
+        render_markdown.cache_clear()
+        render_all_markdown(template_data)
+
+    benchmark(render)
+
+
+def bench_render_pages(
+    benchmark: BenchmarkFixture, template_data: TemplateData, now: dtm.datetime
+) -> None:
+    environment = create_environment()
+    # Compile the templates once, such that only the rendering is measured
+    render_pages(environment, template_data, now=now)
+
+    def render() -> dict[str, str]:
+        render_markdown.cache_clear()
+        return render_pages(environment, template_data, now=now)
+
+    pages = benchmark(render)
+    assert all(pages.values())
+    benchmark.extra_info["bytes"] = {name: len(page.encode()) for name, page in pages.items()}
+
+
+def bench_render_pages_client_rendering(
+    benchmark: BenchmarkFixture, template_data: TemplateData, now: dtm.datetime
+) -> None:
+    """The pages without the votes of the Muckenlisten, plus the compact data for them."""
+    environment = create_environment()
+    render_pages(environment, template_data, now=now, client_rendering=True)
+
+    def render() -> dict[str, str]:
+        render_markdown.cache_clear()
+        return render_pages(environment, template_data, now=now, client_rendering=True)
+
+    pages = benchmark(render)
+    assert pages[DATA_FILE]
+    benchmark.extra_info["bytes"] = {name: len(page.encode()) for name, page in pages.items()}
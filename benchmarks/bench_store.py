@@ -0,0 +1,87 @@
+import asyncio
+import datetime as dtm
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from akalisten.clients._context import ClientContext
+from akalisten.crawl import crawl
+from akalisten.fake_ocs import FakeOCSServer
+from akalisten.models.template import TemplateData
+from akalisten.store import VoteStore
+
+
+@pytest.fixture
+def store(tmp_path: Path, template_data: TemplateData, now: dtm.datetime) -> Iterator[VoteStore]:
+    with VoteStore(tmp_path / "votes.sqlite") as store:
+        store.record(template_data, crawled=now)
+        yield store
+
+
+def bench_record_first_crawl(
+    benchmark: BenchmarkFixture, tmp_path: Path, template_data: TemplateData
+) -> None:
+    paths = (tmp_path / f"votes-{i}.sqlite" for i in range(1000))
+
+    def record() -> int:
+        with VoteStore(next(paths)) as store:
+            return store.record(template_data).inserted
+
+    assert benchmark.pedantic(record, rounds=5)
+
+
+def bench_record_unchanged(
+    benchmark: BenchmarkFixture, store: VoteStore, template_data: TemplateData
+) -> None:
+    """A crawl that found no changes, which is the common case."""
+    changes = benchmark(store.record, template_data)
+    assert not changes.inserted + changes.updated + changes.deleted
+
+
+def bench_record_changed_vote(
+    benchmark: BenchmarkFixture, store: VoteStore, template_data: TemplateData, mucken_poll_id: int
+) -> None:
+    """A crawl that found a single changed vote."""
+    options = list(template_data.mucken_listen.poll_votes[mucken_poll_id].options.values())
+    user = next(iter(options[0].yes | options[0].no))
+    answers = (options[0].yes, options[0].no)
+
+    def change_and_record() -> int:
+        # Toggle the answer of the user between yes and no
+        source, target = answers if user in answers[0] else answers[::-1]
+        source.discard(user)
+        target.add(user)
+        return store.record(template_data).updated
+
+    assert benchmark(change_and_record) == 1
+
+
+def bench_store_poll_votes(
+    benchmark: BenchmarkFixture, store: VoteStore, template_data: TemplateData, mucken_poll_id: int
+) -> None:
+    poll_votes = benchmark(store.poll_votes, mucken_poll_id)
+    mucken_listen = template_data.mucken_listen
+    poll_votes.add_register_users(mucken_listen.registers)
+    poll_votes.sanitize_votes()
+    assert poll_votes == mucken_listen.poll_votes[mucken_poll_id]
+    assert list(poll_votes.options) == list(mucken_listen.poll_votes[mucken_poll_id].options)
+
+
+def bench_crawl_with_store(
+    benchmark: BenchmarkFixture, server: FakeOCSServer, tmp_path: Path
+) -> None:
+    """A crawl that reads the votes of the unchanged polls from the store."""
+    path = tmp_path / "votes.sqlite"
+    crawled = asyncio.run(crawl(ClientContext()))
+    with VoteStore(path) as store:
+        store.record(crawled)
+
+    def run() -> TemplateData:
+        return asyncio.run(crawl(ClientContext(), vote_store_path=path))
+
+    server.statistics.clear()
+    template_data = benchmark.pedantic(run, rounds=3, warmup_rounds=1)
+    assert template_data.mucken_listen.poll_votes == crawled.mucken_listen.poll_votes
+    assert not any(label == "poll/{id}/votes" for label, _ in server.statistics)
@@ -0,0 +1,60 @@
+import datetime as dtm
+from pathlib import Path
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from akalisten.models.template import TemplateData
+from akalisten.timeseries import (
+    RECORD,
+    VoteSeries,
+    append_vote_counts,
+    load_vote_series,
+    series_path,
+)
+
+# Number of changes recorded per option, roughly one per crawl with new votes over a few weeks
+CHANGES = 200
+
+
+@pytest.fixture
+def series_dir(
+    tmp_path: Path, template_data: TemplateData, mucken_poll_id: int, now: dtm.datetime
+) -> Path:
+    """The series of the Muckenliste with :data:`CHANGES` records per option."""
+    options = template_data.mucken_listen.poll_votes[mucken_poll_id].options
+    start = int((now - dtm.timedelta(days=30)).timestamp())
+    records = (
+        RECORD.pack(start + change * 3600, option_id, change, 0, 0, CHANGES - change)
+        for change in range(CHANGES)
+        for option_id in options
+    )
+    series_path(tmp_path, mucken_poll_id).write_bytes(b"".join(records))
+    return tmp_path
+
+
+def bench_append_unchanged(
+    benchmark: BenchmarkFixture, series_dir: Path, template_data: TemplateData
+) -> None:
+    """A crawl that found no changes, which is the common case."""
+    poll_votes = template_data.mucken_listen.poll_votes
+    append_vote_counts(series_dir, poll_votes)
+    assert benchmark(append_vote_counts, series_dir, poll_votes) == 0
+
+
+def bench_load_vote_series(
+    benchmark: BenchmarkFixture, series_dir: Path, mucken_poll_id: int
+) -> None:
+    vote_series = benchmark(load_vote_series, series_dir, [mucken_poll_id])
+    assert len(vote_series[mucken_poll_id]) >= CHANGES
+
+
+def bench_sparklines(
+    benchmark: BenchmarkFixture, series_dir: Path, mucken_poll_id: int, now: dtm.datetime
+) -> None:
+    series = VoteSeries.load(series_path(series_dir, mucken_poll_id))
+
+    def sparklines() -> list[str]:
+        return [series.sparkline(option_id, now) for option_id in series.options]
+
+    assert all(benchmark(sparklines))
@@ -0,0 +1,69 @@
+import datetime as dtm
+from collections.abc import Iterator
+
+import pytest
+
+from akalisten.datetime import TZ_INFO
+from akalisten.fake_ocs import FakeOCSServer, FaultSettings, SyntheticResponses
+from akalisten.models.template import TemplateData
+from akalisten.synthetic import SyntheticData, SyntheticScale
+
+SCALES = {
+    "small": SyntheticScale(polls=10, users=60, forms=4, submissions=10, setlists=5),
+    "medium": SyntheticScale(),
+    "large": SyntheticScale(polls=80, options=20, users=600, forms=30, submissions=200),
+}
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--scale",
+        choices=list(SCALES),
+        default="medium",
+        help="The scale of the synthetic data used by the benchmarks.",
+    )
+
+
+@pytest.fixture(scope="session")
+def scale(request: pytest.FixtureRequest) -> SyntheticScale:
+    return SCALES[request.config.getoption("--scale")]
+
+
+@pytest.fixture(scope="session")
+def now() -> dtm.datetime:
+    return dtm.datetime.now(TZ_INFO)
+
+
+@pytest.fixture(scope="session")
+def synthetic(scale: SyntheticScale, now: dtm.datetime) -> SyntheticData:
+    return SyntheticData(scale, now=now)
+
+
+@pytest.fixture
+def template_data(synthetic: SyntheticData) -> TemplateData:
+    return synthetic.template_data()
+
+
+@pytest.fixture(scope="session")
+def mucken_poll_id(synthetic: SyntheticData) -> int:
+    return next(poll["id"] for poll in synthetic.polls() if synthetic.is_mucken_poll(poll["id"]))
+
+
+@pytest.fixture
+def faults() -> FaultSettings:
+    """The faults injected by :func:`server`. Override this fixture, e.g. with a parametrized
+    one, to benchmark other conditions than an ideal server.
+    """
+    return FaultSettings()
+
+
+@pytest.fixture
+def server(
+    synthetic: SyntheticData, faults: FaultSettings, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[FakeOCSServer]:
+    server = FakeOCSServer(SyntheticResponses(synthetic), faults)
+    with server.run_in_thread() as url:
+        monkeypatch.setenv("NC_BASE_URL", url)
+        monkeypatch.setenv("NC_USERNAME", "user")
+        monkeypatch.setenv("NC_PASSWORD", "password")
+        yield server
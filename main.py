@@ -1,71 +1,374 @@
+import argparse
 import asyncio
 import datetime as dtm
 import logging
 import os
+import sys
+from contextlib import ExitStack
 from pathlib import Path
 
 from dotenv import load_dotenv
-from jinja2 import FileSystemLoader, StrictUndefined
 
-from akalisten.crawl import get_template_data
-from akalisten.datetime import TZ_INFO, strftime
-from akalisten.jinja2 import RelImportEnvironment
+from akalisten.clients._context import ClientContext
+from akalisten.clients._hedging import HedgingSettings
+from akalisten.crawl import (
+    SourceDeadlines,
+    SourcesUnavailableError,
+    add_local_data,
+    crawl,
+    get_template_data,
+)
+from akalisten.datetime import TZ_INFO
+from akalisten.feed import load_feed
+from akalisten.models.template import TemplateData
+from akalisten.output import write_pages
+from akalisten.profiling import Profiler, profile_phase
+from akalisten.render import FEED_FILE, create_environment, iter_pages
+from akalisten.snapshot import load_snapshot, save_snapshot
+from akalisten.timeseries import append_vote_counts, load_vote_series
+from akalisten.tracing import Tracer
 
 load_dotenv(override=True)
 
 ROOT = Path(__file__).parent
 OUTPUT_DIR = ROOT / "output"
 OUTPUT_DIR.mkdir(exist_ok=True)
-DUMMY_DATA_PATH = OUTPUT_DIR / "dummy_data.json"
-INDEX_PATH = OUTPUT_DIR / "index.html"
+CACHE_DIR = ROOT / ".cache"
+FORMS_CACHE_PATH = CACHE_DIR / "forms.json"
+SNAPSHOT_PATH = CACHE_DIR / "snapshot.json"
+NEXT_EXPIRY_PATH = CACHE_DIR / "next_expiry.txt"
+VOTE_SERIES_DIR = CACHE_DIR / "vote_series"
 WP_INDEX_PATH = OUTPUT_DIR / "wordpress.html"
 DATA_PATH = ROOT / "data"
 LINKS_PATH = DATA_PATH / "links.json"
 LISTS_PATH = DATA_PATH / "lists.json"
 CHAT_GROUPS_PATH = DATA_PATH / "chat_groups.json"
 DEBUG_MODE = os.getenv("DEBUG") is not None
+HEDGING = os.getenv("HEDGING") is not None
+STRICT_MODELS = os.getenv("STRICT_MODELS") is not None
+CLIENT_RENDERING = os.getenv("CLIENT_RENDERING") is not None
+REPORTS_DIR = ROOT / "reports"
+PROFILE_DIR = REPORTS_DIR / "profile"
+TRACES_DIR = REPORTS_DIR / "traces"
+METRICS_DIR = Path(os.getenv("METRICS_DIR", REPORTS_DIR))
+SOURCE_DEADLINES = SourceDeadlines.model_validate_json(os.getenv("SOURCE_DEADLINES") or "{}")
+VOTE_STORE_PATH = Path(path) if (path := os.getenv("VOTE_STORE")) else None
 
 logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.WARNING
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=logging.INFO if DEBUG_MODE else logging.WARNING,
 )
+_LOGGER = logging.getLogger(__name__)
 
 
-async def main() -> None:
+def create_context() -> ClientContext:
+    return ClientContext(
+        hedging_settings=HedgingSettings(enabled=HEDGING), strict_models=STRICT_MODELS
+    )
+
+
+def write_output(template_data: TemplateData) -> None:
+    """Render and write the pages and the feed of the changes of the Muckenlisten. Items that
+    expired since the data was fetched are left out. The pages are minified and precompressed
+    while the next one is rendered. The next time at which a shown item expires is written to
+    :data:`NEXT_EXPIRY_PATH`, such that a re-render with ``render`` can be scheduled for exactly
+    then.
+    """
+    template_data.remove_expired()
+    with profile_phase("vote_series.load"):
+        vote_series = load_vote_series(VOTE_SERIES_DIR, template_data.mucken_listen.polls)
+    with profile_phase("feed"):
+        feed = load_feed(OUTPUT_DIR / FEED_FILE).next(template_data.mucken_listen)
+    # Both in one phase, since the pages are written in a worker thread during the rendering
+    with profile_phase("render_and_write"):
+        pages = iter_pages(
+            create_environment(),
+            template_data,
+            vote_series=vote_series,
+            client_rendering=CLIENT_RENDERING,
+            feed=feed,
+        )
+        write_pages(pages, OUTPUT_DIR)
+    next_expiry = template_data.next_expiry(dtm.datetime.now(TZ_INFO))
+    NEXT_EXPIRY_PATH.parent.mkdir(parents=True, exist_ok=True)
+    NEXT_EXPIRY_PATH.write_text(next_expiry.isoformat() if next_expiry else "", encoding="utf-8")
+
+
+def record_history(template_data: TemplateData) -> None:
+    """Append the vote counts of the Muckenlisten to their time series and record the crawled
+    data in the vote store, if :data:`VOTE_STORE_PATH` is set. Failures of the store are only
+    logged, since the store is not needed for the pages.
+    """
+    with profile_phase("vote_series.append"):
+        append_vote_counts(VOTE_SERIES_DIR, template_data.mucken_listen.poll_votes)
+    if VOTE_STORE_PATH is None:
+        return
+
+    import sqlite3
+
+    from akalisten.store import VoteStore
+
+    try:
+        with profile_phase("store.record"), VoteStore(VOTE_STORE_PATH) as store:
+            store.record(template_data)
+    except (sqlite3.Error, RuntimeError):
+        logging.exception("Could not record the crawl in %s", VOTE_STORE_PATH)
+
+
+async def run_crawl() -> None:
+    """Crawl the data and store it as snapshot for the render command. The previous snapshot
+    serves as fallback for the sources that can't be fetched in time.
+    """
+    context = create_context()
+    with profile_phase("snapshot.load"):
+        fallback = load_snapshot(SNAPSHOT_PATH)
+    template_data = await crawl(
+        context=context,
+        forms_cache_path=FORMS_CACHE_PATH,
+        deadlines=SOURCE_DEADLINES,
+        fallback=fallback,
+        vote_store_path=VOTE_STORE_PATH,
+    )
+    with profile_phase("snapshot.save"):
+        save_snapshot(SNAPSHOT_PATH, template_data)
+    record_history(template_data)
+    # Export the request metrics, e.g. for the textfile collector of the Prometheus node exporter
+    context.metrics.write(METRICS_DIR)
+
+
+def run_render() -> None:
+    """Render the pages from the snapshot stored by the crawl command."""
+    with profile_phase("snapshot.load"):
+        template_data = load_snapshot(SNAPSHOT_PATH)
+    if template_data is None:
+        sys.exit(f"No usable snapshot at {SNAPSHOT_PATH}. Run the `crawl` command first.")
+    with profile_phase("local_data"):
+        add_local_data(template_data, LINKS_PATH, LISTS_PATH, CHAT_GROUPS_PATH)
+    write_output(template_data)
+
+
+async def run_publish() -> None:
+    """Upload the rendered WordPress page."""
+    from akalisten.clients.wordpress import WordPressAPI
+
+    async with WordPressAPI() as client:
+        await client.edit_page(
+            int(os.environ["WP_PAGE_ID"]), WP_INDEX_PATH.read_text(encoding="utf-8")
+        )
+
+
+async def run_serve(host: str, port: int, debounce: float, crawl_interval: float) -> None:
+    """Keep the pages up to date by refetching the polls and forms that NextCloud reports as
+    changed via webhooks, with a periodic full crawl as safety net.
+    """
+    from akalisten.refresh import PageRefresher, WebhookReceiver
+
+    context = create_context()
+
+    async def full_crawl(fallback: TemplateData) -> TemplateData:
+        template_data = await crawl(
+            context=context,
+            forms_cache_path=FORMS_CACHE_PATH,
+            deadlines=SOURCE_DEADLINES,
+            fallback=fallback,
+            vote_store_path=VOTE_STORE_PATH,
+        )
+        save_snapshot(SNAPSHOT_PATH, template_data)
+        context.metrics.write(METRICS_DIR)
+        return add_local_data(template_data, LINKS_PATH, LISTS_PATH, CHAT_GROUPS_PATH)
+
+    def record_and_write(template_data: TemplateData) -> None:
+        # Also called for the polls refreshed on webhooks, which refines the recorded history
+        record_history(template_data)
+        write_output(template_data)
+
     template_data = await get_template_data(
         debug=DEBUG_MODE,
-        dummy_data_path=DUMMY_DATA_PATH,
+        snapshot_path=SNAPSHOT_PATH,
         links_path=LINKS_PATH,
         lists_path=LISTS_PATH,
         chat_groups_path=CHAT_GROUPS_PATH,
+        forms_cache_path=FORMS_CACHE_PATH,
+        context=context,
+        deadlines=SOURCE_DEADLINES,
+        vote_store_path=VOTE_STORE_PATH,
+    )
+    record_and_write(template_data)
+
+    refresher = PageRefresher(
+        template_data,
+        render=record_and_write,
+        full_crawl=full_crawl,
+        context=context,
+        debounce=debounce,
+        crawl_interval=crawl_interval,
     )
+    async with WebhookReceiver(
+        refresher, secret=os.getenv("WEBHOOK_SECRET"), host=host, port=port
+    ) as receiver:
+        _LOGGER.info("Listening for webhooks on %s%s", receiver.url, receiver.PATH)
+        await refresher.run()
 
-    environment = RelImportEnvironment(
-        loader=FileSystemLoader(ROOT / Path("akalisten/template")),
-        lstrip_blocks=True,
-        trim_blocks=True,
-        undefined=StrictUndefined,
+
+def run_history(min_polls: int, top: int) -> None:
+    """Print the users that typically answer the polls late, according to the vote store."""
+    from akalisten.store import VoteStore
+
+    if VOTE_STORE_PATH is None or not VOTE_STORE_PATH.exists():
+        sys.exit("No vote store. Set VOTE_STORE and crawl at least twice first.")
+    with VoteStore(VOTE_STORE_PATH) as store:
+        answer_delays = store.answer_delays(min_polls=min_polls)
+    if not answer_delays:
+        sys.exit(f"No user answered at least {min_polls} polls while they were recorded.")
+    print(f"{'User':<40} {'Polls':>5} {'Median delay':>14}")
+    for answer_delay in answer_delays[:top]:
+        hours = answer_delay.median_delay.total_seconds() / 3600
+        print(f"{answer_delay.user.name:<40} {answer_delay.polls:>5} {hours:>12.1f} h")
+
+
+def run_bench(snapshot_path: Path, iterations: int) -> None:
+    """Render the snapshot repeatedly and print the timings of the phases."""
+    from akalisten.bench import run_benchmark
+
+    result = run_benchmark(
+        snapshot_path=snapshot_path,
+        iterations=iterations,
+        links_path=LINKS_PATH,
+        lists_path=LISTS_PATH,
+        chat_groups_path=CHAT_GROUPS_PATH,
     )
-    environment.globals["strftime"] = strftime
-    kwargs = {
-        "links": template_data.links,
-        "lists": template_data.lists,
-        "mucken_listen": template_data.mucken_listen,
-        "polls": template_data.polls,
-        "forms": template_data.forms,
-        "chat_groups": template_data.chat_groups,
-        "now": dtm.datetime.now(TZ_INFO),
-    }
+    print(f"Rendered {snapshot_path} {result.iterations} times, timings in ms:")
+    print(result.format_table())
+
 
-    # Write to file
-    INDEX_PATH.write_text(
-        environment.get_template("index.j2").render(wordpress=False, **kwargs), encoding="utf-8"
+async def main() -> None:
+    """Crawl the data and render the pages in one go. The crawled data is stored as snapshot,
+    which serves as fallback for the next crawl. In debug mode, the snapshot is reused instead of
+    crawling again.
+    """
+    context = create_context()
+    template_data = await get_template_data(
+        debug=DEBUG_MODE,
+        snapshot_path=SNAPSHOT_PATH,
+        links_path=LINKS_PATH,
+        lists_path=LISTS_PATH,
+        chat_groups_path=CHAT_GROUPS_PATH,
+        forms_cache_path=FORMS_CACHE_PATH,
+        context=context,
+        deadlines=SOURCE_DEADLINES,
+        vote_store_path=VOTE_STORE_PATH,
     )
+    if not DEBUG_MODE:
+        record_history(template_data)
+    write_output(template_data)
+
+    # In debug mode, the data is usually taken from the snapshot and the metrics would overwrite
+    # those of the last real run with zeros
+    if not DEBUG_MODE:
+        # Export the request metrics, e.g. for the textfile collector of the Prometheus node
+        # exporter
+        context.metrics.write(METRICS_DIR)
+
 
-    # Write to wordpress file
-    WP_INDEX_PATH.write_text(
-        environment.get_template("wordpress.j2").render(wordpress=True, **kwargs), encoding="utf-8"
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Crawl the data from NextCloud and render the pages. Without a command, the "
+        "data is crawled and rendered in one go."
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        type=Path,
+        const=PROFILE_DIR,
+        metavar="DIR",
+        help="Profile each phase of the run with cProfile and tracemalloc and write the reports "
+        f"to DIR. Defaults to {PROFILE_DIR.relative_to(ROOT)}.",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=25,
+        metavar="N",
+        help="Number of source lines in the allocation reports. Defaults to 25.",
+    )
+    parser.add_argument(
+        "--trace",
+        nargs="?",
+        type=Path,
+        const=TRACES_DIR,
+        metavar="DIR",
+        help="Record a trace of the run and write it to DIR in the Chrome trace format, e.g. for "
+        f"https://ui.perfetto.dev. Defaults to {TRACES_DIR.relative_to(ROOT)}.",
+    )
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("crawl", help=run_crawl.__doc__)
+    commands.add_parser("render", help=run_render.__doc__)
+    commands.add_parser("publish", help=run_publish.__doc__)
+    serve = commands.add_parser("serve", help=run_serve.__doc__)
+    serve.add_argument("--host", default="127.0.0.1", help="Defaults to 127.0.0.1.")
+    serve.add_argument("--port", type=int, default=8081, help="Defaults to 8081.")
+    serve.add_argument(
+        "--debounce",
+        type=float,
+        default=2,
+        help="Seconds to collect further notifications before refreshing. Defaults to 2.",
+    )
+    serve.add_argument(
+        "--crawl-interval",
+        type=float,
+        default=3600,
+        help="Seconds between full crawls. Defaults to 3600.",
+    )
+    history = commands.add_parser("history", help=run_history.__doc__)
+    history.add_argument(
+        "--min-polls",
+        type=int,
+        default=3,
+        help="Leave out users that answered fewer polls. Defaults to 3.",
+    )
+    history.add_argument(
+        "--top", type=int, default=20, help="Number of users to print. Defaults to 20."
+    )
+    bench = commands.add_parser("bench", help=run_bench.__doc__)
+    bench.add_argument(
+        "--snapshot",
+        type=Path,
+        default=SNAPSHOT_PATH,
+        help="The snapshot to render. Defaults to the one stored by `crawl`.",
+    )
+    bench.add_argument(
+        "-n", "--iterations", type=int, default=10, help="Number of renders. Defaults to 10."
     )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    with ExitStack() as stack:
+        if args.profile:
+            stack.enter_context(Profiler(args.profile, args.profile_top).activate())
+        if args.trace:
+            trace_name = f"trace-{dtm.datetime.now(TZ_INFO):%Y%m%d-%H%M%S}.json"
+            stack.enter_context(Tracer().activate(args.trace / trace_name))
+        try:
+            match args.command:
+                case "crawl":
+                    asyncio.run(run_crawl())
+                case "render":
+                    run_render()
+                case "publish":
+                    asyncio.run(run_publish())
+                case "serve":
+                    asyncio.run(
+                        run_serve(args.host, args.port, args.debounce, args.crawl_interval)
+                    )
+                case "history":
+                    run_history(args.min_polls, args.top)
+                case "bench":
+                    run_bench(args.snapshot, args.iterations)
+                case _:
+                    asyncio.run(main())
+        except SourcesUnavailableError as exc:
+            # Exit non-zero without writing anything, such that the deploy step doesn't replace
+            # the last published pages with empty ones
+            sys.exit(f"Crawl failed. {exc}")